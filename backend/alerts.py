@@ -0,0 +1,85 @@
+"""
+News alerts: rules evaluated on each article as it is ingested
+Alerts get increasing ids and are kept newest first in a bounded log
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional
+
+from classifier import article_classifier, priority_from
+
+# Alerts kept (and persisted to alerts.json)
+ALERT_LIMIT = 100
+ALERT_PRIORITIES = ("high", "medium")
+
+
+def evaluate_article(article: Dict) -> Optional[Dict]:
+    """Alert for an article whose title matches the high/medium alert keywords, else None"""
+    if article.get("duplicate_of"):
+        return None
+    categories = article_classifier.classify(article.get("title", ""))
+    priority = priority_from(categories, "alert_high", "alert_medium")
+    if priority not in ALERT_PRIORITIES:
+        return None
+    return {
+        "article_id": article.get("id", ""),
+        "title": article.get("title", ""),
+        "source": article.get("source", ""),
+        "time": article.get("published", ""),
+        "priority": priority,
+        "category": article.get("category", ""),
+        "link": article.get("link", ""),
+        "aiSummary": article.get("summary", "")[:200]
+    }
+
+
+class AlertLog:
+    """Newest-first alerts, one per article"""
+    def __init__(self, limit: int = ALERT_LIMIT):
+        self.alerts: Deque[Dict] = deque(maxlen=limit)
+        self.alerted = set()  # article ids and links ever alerted (kept after eviction: no re-alerting)
+        self.next_id = 1
+
+    def seed(self, alerts: Iterable[Dict]):
+        """Restore persisted alerts (newest first)"""
+        for alert in alerts:
+            self.alerts.append(dict(alert))
+            self.alerted.update(filter(None, (alert.get("article_id"), alert.get("link"))))
+            if isinstance(alert.get("id"), int):
+                self.next_id = max(self.next_id, alert["id"] + 1)
+
+    def evaluate(self, articles: Iterable[Dict]) -> List[Dict]:
+        """Run the rules on each article not alerted yet; returns the new alerts, oldest first"""
+        created = []
+        now = datetime.now().isoformat()
+        for article in articles:
+            if article.get("id") in self.alerted or article.get("link") in self.alerted:
+                continue
+            alert = evaluate_article(article)
+            if alert is None:
+                continue
+            alert = {"id": self.next_id, **alert, "created_at": now}
+            self.next_id += 1
+            self.alerts.appendleft(alert)
+            self.alerted.update(filter(None, (alert["article_id"], alert["link"])))
+            created.append(alert)
+        return created
+
+    def sync(self, alerts: Iterable[Dict]) -> List[Dict]:
+        """Take the alerts another process (the scheduler leader) persisted (newest first); returns the new ones, oldest first"""
+        created = [dict(alert) for alert in alerts if isinstance(alert.get("id"), int) and alert["id"] >= self.next_id]
+        created.reverse()
+        for alert in created:
+            self.alerts.appendleft(alert)
+            self.alerted.update(filter(None, (alert.get("article_id"), alert.get("link"))))
+            self.next_id = alert["id"] + 1
+        return created
+
+    def latest(self, limit: Optional[int] = None) -> List[Dict]:
+        alerts = list(self.alerts)
+        return alerts[:limit] if limit is not None else alerts
+
+
+# Global log instance
+alert_log = AlertLog()
@@ -0,0 +1,315 @@
+"""
+Persistent article store for news monitoring
+Append-only JSONL log, keyed by a hash of the article GUID or normalized link
+"""
+
+from collections import Counter
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from persistence import encode_json
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Query parameters that only identify the referrer, not the article
+TRACKING_PARAMS = ("utm_", "xtor", "at_", "fbclid", "gclid", "ns_", "cmp", "ito")
+
+# Titles sharing this share of their tokens are treated as the same story
+DUPLICATE_TITLE_SIMILARITY = 0.85
+
+# Records indexed per event-loop step when a follower catches up with the leader's log
+INDEX_CHUNK = 500
+
+
+# ============================================
+# KEYS & NORMALIZATION
+# ============================================
+
+def normalize_link(link: str) -> str:
+    """Canonical form of an article URL (no scheme, tracking params, fragment or trailing slash)"""
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip("/")
+    return urlunsplit(("", host, path, urlencode(sorted(query)), ""))
+
+
+def article_key(article: Dict) -> str:
+    """Stable id for an article: GUID when the feed has one, else the normalized link"""
+    identity = article.get("guid") or normalize_link(article.get("link", "")) or article.get("title", "")
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, accent-free, punctuation-free title used for duplicate detection"""
+    folded = unicodedata.normalize("NFKD", title.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", folded))
+
+
+def published_timestamp(article: Dict) -> float:
+    """Unix timestamp of the RSS `published` field (0 when missing or unparseable)"""
+    published = article.get("published", "")
+    if not published:
+        return 0.0
+    try:
+        return parsedate_to_datetime(published).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(published).timestamp()
+    except ValueError:
+        return 0.0
+
+
+# ============================================
+# ARTICLE STORE
+# ============================================
+
+class ArticleStore:
+    """Append-only article log with in-memory indexes for dedup and windowed queries"""
+    def __init__(self, path: str, bootstrap_path: Optional[str] = None):
+        self.path = path
+        self.bootstrap_path = bootstrap_path
+        self.articles = {}        # key -> record
+        self.by_title = {}        # normalized title -> key of first article with that title
+        self.title_tokens = {}    # token -> keys of unique articles containing it
+        self.token_sets = {}      # key -> set of title tokens (unique articles only)
+        # Sorted (-published_ts, seq, key) views, newest first
+        self.order_all = []
+        self.order_unique = []
+        self.order_relevant = []
+        # What follows the relevant articles when listing them first: the other unique ones, or all the others
+        self.order_other_unique = []
+        self.order_other_all = []
+        self.encoded = {}         # key -> the record as JSON, encoded the first time it is served
+        self.updated_at = None
+        self.offset = 0           # bytes of the log indexed so far
+        self.read_only = False    # follower workers never write the log
+        self.write_lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.loaded = False       # set once the whole log is indexed; until then handlers serve fallbacks
+
+    def load(self):
+        """Rebuild indexes from the log, seeding it from the legacy news.json on first run
+        Blocking, once: concurrent callers wait for the first one (keep it off the event loop)"""
+        if self.loaded:
+            return
+        with self.load_lock:
+            if self.loaded:
+                return
+            if os.path.exists(self.path):
+                self._read_log()
+                print(f"Loaded {len(self.articles)} articles from {os.path.basename(self.path)}")
+            elif self.bootstrap_path and os.path.exists(self.bootstrap_path) and not self.read_only:
+                with open(self.bootstrap_path, "r", encoding="utf-8") as f:
+                    legacy = json.load(f).get("data", [])
+                self._append(self._add(legacy))
+            self.loaded = True
+
+    def _read_log(self) -> List[Dict]:
+        """Index the complete lines appended to the log since the last read"""
+        records = self._read_new()
+        for record in records:
+            self._index(record)
+        return records
+
+    def _read_new(self) -> List[Dict]:
+        """Parse the complete lines appended to the log since the last read"""
+        records = []
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == self.offset:
+            return records
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # still being written by the scheduler leader
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping corrupt line in {self.path}")
+                    continue
+                records.append(record)
+        return records
+
+    def refresh(self) -> List[Dict]:
+        """Pick up articles another process (the scheduler leader) appended; returns them"""
+        self.load()
+        return self._read_log()
+
+    async def refresh_async(self) -> List[Dict]:
+        """refresh() with the log read and parsed in a thread; the records are indexed on the event loop, in
+        chunks between which requests run, so a request never sees (or caches a response of) a half-indexed record"""
+        await asyncio.to_thread(self.load)
+        records = await asyncio.to_thread(self._read_new)
+        for start in range(0, len(records), INDEX_CHUNK):
+            if start:
+                await asyncio.sleep(0)
+            for record in records[start:start + INDEX_CHUNK]:
+                self._index(record)
+        return records
+
+    def ingest(self, articles: List[Dict]) -> List[Dict]:
+        """Append articles not seen before; returns the newly stored records (blocking: the log is
+        written before it returns, see ingest_async on the event loop)"""
+        self.load()
+        new_records = self._add(articles)
+        self._append(new_records)
+        return new_records
+
+    async def ingest_async(self, articles: List[Dict]) -> List[Dict]:
+        """ingest() with the log written in a thread; the records are indexed (queryable) on return"""
+        await asyncio.to_thread(self.load)
+        new_records = self._add(articles)
+        await asyncio.to_thread(self._append, new_records)
+        return new_records
+
+    def _add(self, articles: List[Dict]) -> List[Dict]:
+        """Index articles not seen before"""
+        if self.read_only:
+            print(f"[{datetime.now()}] Article store is read-only (follower worker), {len(articles)} articles not ingested")
+            return []
+        now = datetime.now().isoformat()
+        new_records = []
+        for article in articles:
+            key = article_key(article)
+            if key in self.articles:
+                continue
+            record = {
+                **article,
+                "id": key,
+                "published_ts": published_timestamp(article),
+                "ingested_at": now,
+                "duplicate_of": self._find_duplicate(article.get("title", "")),
+            }
+            self._index(record)
+            new_records.append(record)
+        self.updated_at = now
+        return new_records
+
+    def _append(self, records: List[Dict]):
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self.write_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.offset = os.path.getsize(self.path)
+
+    def _find_duplicate(self, title: str) -> Optional[str]:
+        """Key of an already stored story with a (near-)identical title"""
+        normalized = normalize_title(title)
+        if not normalized:
+            return None
+        if normalized in self.by_title:
+            return self.by_title[normalized]
+
+        tokens = set(normalized.split())
+        # Probe through the three rarest tokens; a near-duplicate shares at least two of them
+        postings = sorted((self.title_tokens.get(t, ()) for t in tokens if len(t) > 3), key=len)[:3]
+        seen = Counter(key for keys in postings for key in keys)
+        candidates = [key for key, hits in seen.items() if hits >= min(2, len(postings))]
+        for key in candidates:
+            other = self.token_sets[key]
+            similarity = len(tokens & other) / len(tokens | other)
+            if similarity >= DUPLICATE_TITLE_SIMILARITY:
+                return key
+        return None
+
+    def _index(self, record: Dict):
+        key = record["id"]
+        self.articles[key] = record
+        entry = (-record.get("published_ts", 0.0), len(self.articles), key)
+        bisect.insort(self.order_all, entry)
+        if not record.get("duplicate_of"):
+            normalized = normalize_title(record.get("title", ""))
+            if normalized:
+                self.by_title.setdefault(normalized, key)
+                self.token_sets[key] = set(normalized.split())
+                for token in self.token_sets[key]:
+                    if len(token) > 3:
+                        self.title_tokens.setdefault(token, []).append(key)
+            bisect.insort(self.order_unique, entry)
+            if record.get("is_relevant"):
+                bisect.insort(self.order_relevant, entry)
+            else:
+                bisect.insort(self.order_other_unique, entry)
+        if record.get("duplicate_of") or not record.get("is_relevant"):
+            bisect.insort(self.order_other_all, entry)
+        ingested_at = record.get("ingested_at")
+        if ingested_at and (self.updated_at is None or ingested_at > self.updated_at):
+            self.updated_at = ingested_at
+
+    def count(self, relevant_only: bool = False, include_duplicates: bool = False) -> int:
+        self.load()
+        return len(self._view(relevant_only, include_duplicates))
+
+    def _view(self, relevant_only: bool, include_duplicates: bool) -> list:
+        if relevant_only:
+            return self.order_relevant
+        return self.order_all if include_duplicates else self.order_unique
+
+    def _views(self, relevant_only: bool, include_duplicates: bool, relevant_first: bool) -> List[list]:
+        """The view as consecutive parts: relevant articles, then the others when listing them first"""
+        if relevant_first and not relevant_only:
+            return [self.order_relevant, self.order_other_all if include_duplicates else self.order_other_unique]
+        return [self._view(relevant_only, include_duplicates)]
+
+    def query(self, offset: int = 0, limit: int = 50, relevant_only: bool = False,
+              include_duplicates: bool = False, relevant_first: bool = False) -> Tuple[List[Dict], int]:
+        """Newest-first window of articles (relevant ones first with relevant_first), with the total size of the view"""
+        self.load()
+        window, total = [], 0
+        for view in self._views(relevant_only, include_duplicates, relevant_first):
+            start = max(offset - total, 0)
+            window.extend(view[start:start + limit - len(window)])
+            total += len(view)
+        return [self.articles[key] for _, _, key in window], total
+
+    def encoded_query(self, offset: int = 0, limit: int = 50, relevant_only: bool = False,
+                      include_duplicates: bool = False, relevant_first: bool = False) -> Tuple[bytes, int]:
+        """query() as a JSON array, spliced from records encoded once each (records never change)"""
+        articles, total = self.query(offset, limit, relevant_only, include_duplicates, relevant_first)
+        encoded = []
+        for article in articles:
+            raw = self.encoded.get(article["id"])
+            if raw is None:
+                raw = self.encoded[article["id"]] = encode_json(article)
+            encoded.append(raw)
+        return b"[" + b",".join(encoded) + b"]", total
+
+    def headlines(self, limit: int = 50) -> List[Dict]:
+        """Relevant articles first, then up to 20 others, newest first within each group"""
+        self.load()
+        relevant = [self.articles[key] for _, _, key in self.order_relevant[:limit]]
+        if len(relevant) >= limit:
+            return relevant
+        others = []
+        for _, _, key in self.order_unique:
+            if len(others) >= 20 or len(relevant) + len(others) >= limit:
+                break
+            if not self.articles[key].get("is_relevant"):
+                others.append(self.articles[key])
+        return relevant + others
+
+
+# Global store instance
+article_store = ArticleStore(
+    os.path.join(DATA_DIR, "articles.jsonl"),
+    bootstrap_path=os.path.join(DATA_DIR, "news.json"),
+)
@@ -0,0 +1,123 @@
+"""
+Benchmark for the box office rollups
+Loads the recorded CNC dataset of harness_cnc.py into a table, times the full and the incremental
+updates, checks the rollups against scans of the raw rows and times the queries against those scans
+Usage: python bench_boxoffice_analytics.py [weeks]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from boxoffice_analytics import BoxOfficeAnalytics
+from boxoffice_store import BoxOfficeTable
+from harness_cnc import RELEASES_PER_WEEK, WEEKS_IN_THEATRES, recorded_dataset
+
+QUERIES = 200
+
+
+async def stream(records):
+    for _, fields in records:
+        yield fields
+
+
+def timed(function, *args, repeat: int = QUERIES, **kwargs) -> float:
+    """Mean milliseconds per call"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def scan_distributors(table: BoxOfficeTable, start: int, end: int) -> np.ndarray:
+    c = table.columns
+    rows = (c["week"] >= start) & (c["week"] <= end)
+    return np.bincount(c["distributor"][rows], weights=c["entries"][rows], minlength=len(table.distributors))
+
+
+def scan_film(table: BoxOfficeTable, film: int) -> np.ndarray:
+    c = table.columns
+    rows = np.flatnonzero(c["film"] == film)
+    return np.cumsum(c["entries"][rows[np.argsort(c["week"][rows])]])
+
+
+def main(weeks: int) -> int:
+    records = recorded_dataset(weeks + 1)
+    history, last_week = records[:-RELEASES_PER_WEEK * WEEKS_IN_THEATRES], records[-RELEASES_PER_WEEK * WEEKS_IN_THEATRES:]
+    table = BoxOfficeTable(tempfile.mkdtemp(prefix="cnc-table-"))
+    table.load()
+    asyncio.run(table.ingest(stream(history)))
+    analytics = BoxOfficeAnalytics(table)
+    checks = {}
+
+    started = time.perf_counter()
+    analytics.update()
+    print(f"{weeks} weeks, {len(table)} rows, {len(table.films)} films, {len(table.distributors)} distributors")
+    print(f"full build: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # A new week, then corrections to a past week (newer record_timestamp)
+    asyncio.run(table.ingest(stream(last_week)))
+    started = time.perf_counter()
+    folded = analytics.update()
+    print(f"new week: {folded} rows folded in {(time.perf_counter() - started) * 1000:.1f} ms")
+    checks["new week folds only its rows (plus the watermark's)"] = folded <= 2 * len(last_week)
+    corrected_week = history[len(history) // 2][1]["semaine"]
+    corrections = [{**fields, "entrees": fields["entrees"] * 2, "record_timestamp": "2100-01-01T00:00:00Z"}
+                   for _, fields in history if fields["semaine"] == corrected_week]
+    asyncio.run(table.ingest(stream((None, fields) for fields in corrections)))
+    started = time.perf_counter()
+    folded = analytics.update()
+    print(f"corrected week: {folded} rows folded in {(time.perf_counter() - started) * 1000:.1f} ms")
+    idle = analytics.update()
+
+    # Incremental state equals a build from scratch, and matches scans of the raw rows
+    fresh = BoxOfficeAnalytics(table)
+    fresh.update()
+    checks["incremental rollups equal a full rebuild"] = all(
+        np.array_equal(getattr(analytics, name), getattr(fresh, name), equal_nan=True)
+        for name in ("weeks", "week_entries", "week_revenue", "week_top", "entries_prefix", "film_entries",
+                     "film_revenue", "film_first", "film_peak", "cumulative", "change"))
+    checks["unchanged table folds only the watermark rows"] = idle <= len(corrections)
+    c = table.columns
+    start, end = int(analytics.weeks[100]), int(analytics.weeks[600])
+    shares = analytics.distributors(_iso(start), _iso(end), limit=1000)
+    by_name = {d["distributor"]: d["entries"] for d in shares["distributors"]}
+    scanned = scan_distributors(table, start, end)
+    checks["distributor totals match a scan"] = all(by_name.get(name, 0) == int(scanned[i])
+                                                    for i, name in enumerate(table.distributors))
+    film = int(c["film"][len(table) // 3])
+    series = analytics.film(table.films[film])["series"]
+    checks["cumulative curve matches a scan"] = [p["cumulativeEntries"] for p in series] == scan_film(table, film).tolist()
+    week_total = int(c["entries"][c["week"] == start].sum())
+    checks["week totals match a scan"] = analytics.week_totals(_iso(start), _iso(start))["weeks"][0]["entries"] == week_total
+    chart = analytics.chart(corrected_week)
+    checks["corrections reach the chart"] = chart["films"][0]["entries"] == max(f["entrees"] for f in corrections)
+
+    # Query times include building the response; the scan column computes the bare aggregate from the rows
+    print(f"{'query':<34}{'rollups ms':>11}{'scan ms':>9}")
+    rows = [
+        ("distributor shares, 10 years", lambda: analytics.distributors(_iso(start), _iso(end)),
+         lambda: scan_distributors(table, start, end)),
+        ("film run with cumulative curve", lambda: analytics.film(table.films[film]), lambda: scan_film(table, film)),
+        ("week chart", lambda: analytics.chart(corrected_week), None),
+        ("weekly totals, 20 years", lambda: analytics.week_totals(), None),
+        ("films of a distributor, 5 years", lambda: analytics.films(distributor=table.distributors[3],
+                                                                     start=_iso(start), end=_iso(start + 5 * 365)), None),
+    ]
+    for label, query, scan in rows:
+        print(f"{label:<34}{timed(query):>11.3f}{timed(scan) if scan else float('nan'):>9.3f}")
+
+    for label, passed in checks.items():
+        print(f"  [{'ok' if passed else 'FAIL'}] {label}")
+    return 0 if all(checks.values()) else 1
+
+
+def _iso(day: int) -> str:
+    return str(np.datetime64(day, "D"))
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1040))
@@ -0,0 +1,72 @@
+"""
+Benchmark for the keyword classifier
+Classifies a synthetic corpus of article titles and summaries against the app's keyword sets, padded
+with generated watchlist keywords (names and two-word phrases), and compares the compiled
+KeywordClassifier with the former per-category substring scans (any(kw in text.lower() ...))
+Usage: python bench_classifier.py [articles] [extra keywords ...]
+"""
+
+import random
+import sys
+import time
+
+from classifier import KeywordClassifier, article_classifier
+
+WORDS = ("audience chaîne télévision diffusion abonnés plateforme streaming film cinéma entrées salles "
+         "rachat acquisition droits sportifs série fiction production studio channel subscribers revenue "
+         "earnings merger premiere ratings broadcast football ligue annonce lancement record résultats").split()
+FILLER = [f"mot{i}" for i in range(5000)]
+
+
+def make_articles(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocabulary = WORDS + FILLER
+    weights = [20] * len(WORDS) + [1] * len(FILLER)
+    return [" ".join(rng.choices(vocabulary, weights=weights, k=60)).capitalize() for _ in range(count)]
+
+
+def keyword_sets(extra: int, seed: int = 1):
+    """The app's keyword sets plus `extra` watchlist keywords, a third of them two-word phrases"""
+    rng = random.Random(seed)
+    sets = {category: list(keywords) for category, keywords in article_classifier.keyword_sets.items()}
+    watchlist = []
+    for i in range(extra):
+        name = rng.choice(FILLER)
+        watchlist.append(f"{name} {rng.choice(WORDS)}" if i % 3 == 0 else f"{name}x{i}")
+    sets["watchlist"] = watchlist
+    return sets
+
+
+def substring_scans(sets, text: str):
+    """The former matching: one substring scan per keyword and category"""
+    lowered = text.lower()
+    return {category for category, keywords in sets.items() if any(kw in lowered for kw in keywords)}
+
+
+def timed(function, articles) -> tuple:
+    started = time.perf_counter()
+    results = [function(text) for text in articles]
+    return (time.perf_counter() - started) * 1000, results
+
+
+def main(count: int, extras) -> int:
+    articles = make_articles(count)
+    print(f"{count:,} articles of 60 words")
+    print(f"{'keywords':>9}{'substring scans':>18}{'compile':>10}{'classifier':>13}{'speedup':>9}{'differ':>8}")
+    for extra in extras:
+        sets = keyword_sets(extra)
+        keywords = sum(len(keywords) for keywords in sets.values())
+        started = time.perf_counter()
+        classifier = KeywordClassifier(sets)
+        compile_ms = (time.perf_counter() - started) * 1000
+        old_ms, old = timed(lambda text: substring_scans(sets, text), articles)
+        new_ms, new = timed(classifier.classify, articles)
+        # Substring scans also match inside words ("fusion" in "diffusion"): those articles legitimately differ
+        differ = sum(1 for a, b in zip(old, new) if a != b)
+        print(f"{keywords:>9}{old_ms:>15.0f} ms{compile_ms:>7.0f} ms{new_ms:>10.0f} ms{old_ms / new_ms:>8.1f}x{differ:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(main(args[0] if args else 20000, args[1:] or [0, 400, 2000]))
@@ -0,0 +1,106 @@
+"""
+Benchmark for article text extraction
+Extracts a corpus of generated article pages (navigation, scripts, a long comment thread) while a 1 ms
+ticker runs on the event loop, and compares throughput and the worst loop stall of the former inline
+BeautifulSoup/html.parser extraction with extract_article_text_async in a thread and a process pool
+Usage: python bench_html_extraction.py [pages]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+import html_extraction
+from html_extraction import extract_article_text_async
+
+WORDS = ("audience chaîne télévision diffusion abonnés plateforme streaming film cinéma entrées salles "
+         "rachat acquisition droits sportifs série fiction production studio").split()
+
+
+def make_page(seed: int) -> str:
+    """An article page of about 500 KB"""
+    rng = random.Random(seed)
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+    nav = "".join(f'<li><a href="/rubrique/{i}">Rubrique {i}</a></li>' for i in range(200))
+    body = "".join(f"<p>{sentence(40)}</p>" for _ in range(30))
+    comments = "".join(f'<div class="comment"><span>Lecteur {i}</span><p>{sentence(25)}</p></div>' for i in range(1500))
+    script = "var tracking = {" + ",".join(f'"k{i}": {i}' for i in range(3000)) + "};"
+    return (f"<html><head><title>Article {seed}</title><script>{script}</script><style>p {{ margin: 0 }}</style></head>"
+            f"<body><header><nav><ul>{nav}</ul></nav></header>"
+            f'<div class="main"><article><h1>{sentence(10)}</h1>{body}</article></div>'
+            f'<section class="comments">{comments}</section><footer>{nav}</footer></body></html>')
+
+
+async def ticker(stalls: list, done: asyncio.Event):
+    """Records how late each 1 ms sleep wakes up"""
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append((time.perf_counter() - started) * 1000 - 1)
+
+
+def inline_html_parser(html: str) -> str:
+    """The former fetch_article_content: BeautifulSoup with html.parser on the event loop"""
+    parser = html_extraction.BS4_PARSER
+    html_extraction.BS4_PARSER = "html.parser"
+    try:
+        return html_extraction._extract_bs4(html)
+    finally:
+        html_extraction.BS4_PARSER = parser
+
+
+async def measure(pages, extract) -> tuple:
+    """(pages/s, worst loop stall in ms, texts)"""
+    stalls, done = [], asyncio.Event()
+    tick = asyncio.create_task(ticker(stalls, done))
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    if asyncio.iscoroutinefunction(extract):
+        texts = await asyncio.gather(*(extract(page) for page in pages))
+    else:
+        texts = []
+        for page in pages:
+            texts.append(extract(page))
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return len(pages) / elapsed, max(stalls), texts
+
+
+def use_executor(kind: str):
+    html_extraction.shutdown_html_executor()
+    html_extraction.HTML_EXECUTOR = kind
+
+
+async def run(count: int) -> int:
+    pages = [make_page(seed) for seed in range(count)]
+    parser = "selectolax" if html_extraction.HTMLParser is not None else f"bs4+{html_extraction.BS4_PARSER}"
+    print(f"{count} pages, {sum(map(len, pages)) / 1e6:.0f} MB, {html_extraction.HTML_WORKERS} workers")
+    cases = [("inline, bs4+html.parser", inline_html_parser)]
+    for kind in ("thread", "process"):
+        cases.append((f"{kind} pool, {parser}", kind))
+
+    expected = None
+    failed = False
+    for label, case in cases:
+        if isinstance(case, str):
+            use_executor(case)
+            await extract_article_text_async(pages[0])  # start the pool outside the timing
+            case = extract_article_text_async
+        throughput, stall, texts = await measure(pages, case)
+        print(f"{label:<28}{throughput:>8.1f} pages/s   worst loop stall {stall:>6.0f} ms")
+        expected = expected or texts
+        failed |= texts != expected
+    html_extraction.shutdown_html_executor()
+    if failed:
+        print("  [FAIL] the extractions disagree")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)))
@@ -0,0 +1,91 @@
+"""
+Benchmark for JSON serialization of the hot routes
+Drives the FastAPI app in-process (raw ASGI calls: routing, middleware and serialization, no sockets or
+client overhead) and compares requests/s of /api/veille/news and /api/finance/stocks as served now
+(pre-encoded bytes) with the same handlers returning dicts, through the stdlib JSONResponse (as before)
+and through the app's orjson response class
+Usage: python bench_json_responses.py [seconds per case]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ["RESPONSE_CACHE"] = "0"  # measure serialization, not the response cache
+
+from fastapi.responses import JSONResponse
+
+import main
+from article_store import ArticleStore
+from bench_response_cache import synthetic_articles
+from persistence import orjson
+from scheduler import load_data
+
+ARTICLES = 2000
+
+
+def legacy_routes(store: ArticleStore):
+    """The handlers as they were: dicts through jsonable_encoder, then the given response class"""
+    def news(offset: int = 0, limit: int = 50):
+        articles, total = store.query(offset, limit)
+        return {"articles": articles, "total": total, "offset": offset, "limit": limit,
+                "source": "RSS Feeds", "last_update": store.updated_at}
+
+    def stocks():
+        stored = load_data("stocks.json")
+        return {"data": stored.get("data", []), "source": "Yahoo Finance", "last_update": stored.get("updated_at")}
+
+    for prefix, response_class in (("/stdlib", JSONResponse), ("/dict", main.FastJSONResponse)):
+        main.app.add_api_route(f"{prefix}/veille/news", news, response_class=response_class)
+        main.app.add_api_route(f"{prefix}/finance/stocks", stocks, response_class=response_class)
+
+
+async def request(path: str, query: bytes) -> int:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+             "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return size
+
+
+async def measure(path: str, query: bytes, seconds: float) -> tuple:
+    await request(path, query)
+    count, size, started = 0, 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for _ in range(20):
+            size = await request(path, query)
+        count += 20
+    return count / (time.perf_counter() - started), size
+
+
+async def run(seconds: float):
+    store = ArticleStore(os.path.join(tempfile.mkdtemp(prefix="bench-articles-"), "articles.jsonl"))
+    store.ingest(synthetic_articles(ARTICLES))
+    main.article_store = store
+    legacy_routes(store)
+
+    print(f"{ARTICLES} articles, orjson {'installed' if orjson else 'missing (stdlib fallback)'}, {seconds:.0f}s per case")
+    print(f"{'route':<28}{'bytes':>8}{'stdlib dict':>13}{'orjson dict':>13}{'pre-encoded':>13}{'speedup':>9}")
+    for route, query in (("/veille/news", b"limit=50"), ("/veille/news", b"limit=200"), ("/finance/stocks", b"")):
+        stdlib, size = await measure(f"/stdlib{route}", query, seconds)
+        fast_dict, _ = await measure(f"/dict{route}", query, seconds)
+        encoded, _ = await measure(f"/api{route}", query, seconds)
+        label = f"{route}?{query.decode()}" if query else route
+        print(f"{label:<28}{size:>8}{stdlib:>13.0f}{fast_dict:>13.0f}{encoded:>13.0f}{encoded / stdlib:>8.1f}x")
+    print("(requests/s, one core, in-process)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(float(sys.argv[1]) if len(sys.argv) > 1 else 3))
@@ -0,0 +1,95 @@
+"""
+Benchmark for the BM25 archive index
+Indexes a synthetic French/English corpus at several sizes, then times filtered and unfiltered queries
+Usage: python bench_lexical_index.py [10000 100000 1000000]
+"""
+
+import itertools
+import random
+import sys
+import tempfile
+import time
+
+import lexical_index
+from lexical_index import LexicalIndex
+
+VOCABULARY = 20000
+WORDS_PER_DOC = 120
+QUERIES = 200
+CATEGORIES = ["tv", "cinema", "streaming", "finance", "regulation"]
+TAGS = ["canal+", "netflix", "tf1", "m6", "arcom", "box-office", "sport", "fiction"]
+
+# Common words of the streaming / box-office beat, mixed into a long Zipf tail
+TOPIC_WORDS = ("audience chaîne télévision diffusion abonnés plateforme streaming film cinéma entrées "
+               "salles rachat acquisition droits sportifs série fiction production studio channel "
+               "subscribers revenue earnings merger premiere ratings broadcast football ligue").split()
+
+
+def make_corpus(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocabulary = TOPIC_WORDS + [f"mot{i}" for i in range(VOCABULARY)]
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    for i in range(size):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=WORDS_PER_DOC)
+        document = {
+            "id": f"doc{i}",
+            "title": " ".join(words[:8]),
+            "date": f"{2018 + i * 8 // size}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "category": rng.choice(CATEGORIES),
+            "tags": rng.sample(TAGS, 2),
+        }
+        yield document, " ".join(words)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(size: int):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        index = LexicalIndex(directory)
+        build = 0.0
+        batch = []
+        for item in make_corpus(size):
+            batch.append(item)
+            if len(batch) == 1000:
+                start = time.perf_counter()
+                index.add(batch)
+                build += time.perf_counter() - start
+                batch = []
+        start = time.perf_counter()
+        index.add(batch)
+        if index.merge_thread:
+            index.merge_thread.join()
+        build += time.perf_counter() - start
+
+        index = LexicalIndex(directory)
+        start = time.perf_counter()
+        index.load()
+        load = time.perf_counter() - start
+
+        queries = [" ".join(rng.sample(TOPIC_WORDS[:10], 1) + [f"mot{rng.randint(0, 2000)}" for _ in range(2)])
+                   for _ in range(QUERIES)]
+        timings = {}
+        for label, filters in [("plain", {}),
+                               ("filtered", {"category": "tv", "tags": ["netflix"], "date_from": "2022"})]:
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query, 10, **filters)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = samples
+
+        stats = index.stats()
+        print(f"{size:>9,} docs  build {build:7.1f} s  load {load:5.2f} s  segments {stats['segments']}  "
+              + "  ".join(f"{label} p50 {percentile(s, 0.5):6.2f} ms p95 {percentile(s, 0.95):6.2f} ms"
+                          for label, s in timings.items()))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"Flush every {lexical_index.FLUSH_DOCS} documents, merge factor {lexical_index.MERGE_FACTOR}")
+    for size in sizes:
+        run(size)
@@ -0,0 +1,132 @@
+"""
+Benchmark for the batched watchlist quotes
+Replaces the shared HTTP client's transport with a stand-in for Yahoo's cookie, crumb, quote and chart
+endpoints (fixed latency per response, Yahoo's 401 bodies), then fetches watchlists of several sizes through the batched quote
+requests and through one chart request per ticker (the former fetch_all_stocks)
+Usage: python bench_quote_batch.py [8 100 500]
+"""
+
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+import data_fetchers
+from resilience import upstreams
+
+UPSTREAM_DELAY = 0.05  # seconds each stand-in response takes
+
+
+class StandInYahoo:
+    """httpx transport answering like Yahoo: fc.yahoo.com sets the session cookie, getcrumb returns the
+    crumb for it, the v7 quote batch answers 401 "Invalid Crumb" without both, and the v8 chart calls
+    need neither; counts requests per kind"""
+    def __init__(self, delay: float = UPSTREAM_DELAY):
+        self.requests = Counter()
+        self.transport = httpx.MockTransport(self.handle)
+        self.delay = delay
+        self.session = 0
+
+    @property
+    def crumb(self) -> str:
+        return f"crumb{self.session}"
+
+    def rotate(self):
+        """Expire the session, as Yahoo does every so often"""
+        self.session += 1
+
+    def authorized(self, request: httpx.Request) -> bool:
+        return f"A3=session{self.session}" in request.headers.get("cookie", "")
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.delay)
+        if request.url.host == "fc.yahoo.com":
+            self.requests["cookie"] += 1
+            return httpx.Response(404, text="<html>Not Found</html>",
+                                  headers={"set-cookie": f"A3=session{self.session}; Domain=.yahoo.com; Path=/"})
+        if request.url.path == "/v1/test/getcrumb":
+            self.requests["crumb"] += 1
+            if not self.authorized(request):
+                return httpx.Response(401, json={"finance": {"result": None, "error": {
+                    "code": "Unauthorized", "description": "Invalid Cookie"}}})
+            return httpx.Response(200, text=self.crumb)
+        if request.url.path.endswith("/v7/finance/quote"):
+            self.requests["quote"] += 1
+            if not self.authorized(request) or request.url.params.get("crumb") != self.crumb:
+                return httpx.Response(401, json={"finance": {"result": None, "error": {
+                    "code": "Unauthorized", "description": "Invalid Crumb"}}})
+            symbols = request.url.params["symbols"].split(",")
+            result = [{"language": "en-US", "quoteType": "EQUITY", "symbol": s, "regularMarketPrice": 10.0,
+                       "regularMarketPreviousClose": 9.5, "regularMarketChangePercent": 5.26,
+                       "regularMarketTime": 1760700000, "marketCap": 1200000000, "currency": "EUR"}
+                      for s in symbols]
+            return httpx.Response(200, json={"quoteResponse": {"result": result, "error": None}})
+        self.requests["chart"] += 1
+        meta = {"regularMarketPrice": 10.0, "previousClose": 9.5, "currency": "EUR"}
+        return httpx.Response(200, json={"chart": {"result": [{"meta": meta}], "error": None}})
+
+
+async def per_ticker(stocks):
+    """The former fetch_all_stocks: one chart request per ticker"""
+    return await asyncio.gather(*(data_fetchers.fetch_stock_price(stock["ticker"]) for stock in stocks))
+
+
+def fallbacks(quotes) -> int:
+    return sum(1 for q in quotes if q["price"] != 10.0)
+
+
+async def measure(fetch, stocks) -> tuple:
+    """(requests, milliseconds, fallback quotes) of one fetch on a fresh client (no cookie, no crumb)
+    and fresh host guards"""
+    upstreams.hosts.clear()
+    upstreams.retry_tokens = upstreams.retry_budget_max
+    upstream = StandInYahoo()
+    data_fetchers._http_client = httpx.AsyncClient(transport=upstream.transport)
+    started = time.perf_counter()
+    quotes = await fetch(stocks)
+    elapsed = (time.perf_counter() - started) * 1000
+    await data_fetchers.close_http_client()
+    return sum(upstream.requests.values()), elapsed, fallbacks(quotes)
+
+
+async def expired_session(stocks) -> Counter:
+    """Requests of a refresh after Yahoo expired the session the previous refresh used"""
+    upstream = StandInYahoo()
+    data_fetchers._http_client = httpx.AsyncClient(transport=upstream.transport)
+    await data_fetchers.fetch_all_stocks(stocks)
+    upstream.rotate()
+    upstream.requests.clear()
+    quotes = await data_fetchers.fetch_all_stocks(stocks)
+    await data_fetchers.close_http_client()
+    upstream.requests["fallbacks"] = fallbacks(quotes)
+    return upstream.requests
+
+
+async def run(sizes) -> int:
+    print(f"Upstream answers in {UPSTREAM_DELAY * 1000:.0f} ms, {data_fetchers.QUOTE_BATCH_SIZE} symbols per batch")
+    print(f"{'tickers':>8}  {'per-ticker':>33}  {'batched':>33}")
+    failed = False
+    for size in sizes:
+        stocks = [{"ticker": f"T{i:04d}.PA", "name": f"Stock {i}"} for i in range(size)]
+        old_requests, old_ms, old_fallbacks = await measure(per_ticker, stocks)
+        new_requests, new_ms, new_fallbacks = await measure(data_fetchers.fetch_all_stocks, stocks)
+        print(f"{size:>8}  {old_requests:>5} req {old_ms:>7.0f} ms {old_fallbacks:>4} fallback  "
+              f"{new_requests:>5} req {new_ms:>7.0f} ms {new_fallbacks:>4} fallback")
+        failed |= new_fallbacks > 0
+    if failed:
+        print("  [FAIL] batched quotes came back from the fallback table")
+
+    # Every batch of the refresh gets a 401, one handshake renews the crumb, each batch is sent again
+    stocks = [{"ticker": f"T{i:04d}.PA", "name": f"Stock {i}"} for i in range(100)]
+    requests = await expired_session(stocks)
+    print(f"expired session, 100 tickers: {dict(requests)}")
+    if requests != Counter(quote=4, cookie=1, crumb=1):
+        print("  [FAIL] the expired crumb was not renewed once")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run([int(arg) for arg in sys.argv[1:]] or [8, 100, 500])))
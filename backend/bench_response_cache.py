@@ -0,0 +1,139 @@
+"""
+Load test for the response cache
+Runs the API under uvicorn (lifespan off: no scheduler, no upstream calls) over 2,000 synthetic articles
+and the stored snapshots, once without and once with the cache, and drives the dataset routes with
+concurrent clients; reports requests/s, bytes on the wire and server CPU per request
+Usage: python bench_response_cache.py [seconds per scenario]
+"""
+
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PORT = 18100
+CLIENTS = 16
+ARTICLES = 2000
+URLS = [
+    "/api/veille/news?limit=50",
+    "/api/veille/news?limit=200",
+    "/api/finance/stocks",
+    "/api/veille/alerts",
+    "/api/boxoffice/france",
+]
+SOURCES = ["Le Monde Économie", "Le Figaro Médias", "Variety", "Deadline", "Les Echos"]
+
+
+def synthetic_articles(count: int) -> list:
+    """Articles whose text compresses about as well as the stored feeds (about 3x with gzip)"""
+    rng = random.Random(0)
+    words = ("audience chaîne streaming plateforme abonnés cinéma entrées rachat droits sportifs série "
+             "production studio diffusion publicité régulation Arcom Canal+ Netflix TF1 M6").split()
+    words += ["".join(rng.choices("abcdefghijklmnopqrstuvwxyzéè", k=rng.randint(3, 11))) for _ in range(3000)]
+    return [{
+        "title": f"{' '.join(rng.choices(words, k=9))} #{i}",
+        "link": f"https://example.org/article/{i}",
+        "published": f"2026-{1 + i % 9:02d}-{1 + i % 27:02d}T{i % 24:02d}:00:00",
+        "source": SOURCES[i % len(SOURCES)],
+        "category": "Médias",
+        "summary": " ".join(rng.choices(words, k=90)),
+        "is_relevant": i % 3 == 0,
+        "priority": ("high", "medium", "low")[i % 3],
+    } for i in range(count)]
+
+
+def serve(cache: str):
+    """Run the app with the synthetic article store (child process)"""
+    os.environ["RESPONSE_CACHE"] = cache
+    import uvicorn
+    import main
+    from article_store import ArticleStore
+
+    store = ArticleStore(os.path.join(tempfile.mkdtemp(prefix="bench-articles-"), "articles.jsonl"))
+    store.ingest(synthetic_articles(ARTICLES))
+    main.article_store = store
+    uvicorn.run(main.app, host="127.0.0.1", port=PORT, lifespan="off", log_level="warning", access_log=False)
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def drive(seconds: float, revalidate: bool) -> dict:
+    """CLIENTS concurrent clients cycling through URLS; with revalidate, each sends back the ETag it got"""
+    totals = {"requests": 0, "bytes": 0, "not_modified": 0}
+    deadline = time.monotonic() + seconds
+
+    async def client(n: int):
+        etags = {}
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}",
+                                     headers={"Accept-Encoding": "gzip, br"}) as http:
+            i = n
+            while time.monotonic() < deadline:
+                url = URLS[i % len(URLS)]
+                i += 1
+                headers = {"If-None-Match": etags[url]} if revalidate and url in etags else {}
+                response = await http.get(url, headers=headers)
+                if "etag" in response.headers:
+                    etags[url] = response.headers["etag"]
+                totals["requests"] += 1
+                totals["not_modified"] += response.status_code == 304
+                # Body as sent (before decompression) plus the status line and headers
+                totals["bytes"] += response.num_bytes_downloaded + sum(len(k) + len(v) + 4 for k, v in response.headers.raw) + 17
+
+    await asyncio.gather(*(client(n) for n in range(CLIENTS)))
+    return totals
+
+
+async def wait_ready():
+    async with httpx.AsyncClient() as http:
+        for _ in range(100):
+            try:
+                await http.get(f"http://127.0.0.1:{PORT}/api/veille/news?limit=1")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def main(seconds: float) -> int:
+    print(f"{CLIENTS} clients, {seconds:.0f}s per scenario, routes: {', '.join(URLS)}")
+    print(f"{'scenario':<28}{'req/s':>8}{'bytes/req':>11}{'304s':>7}{'CPU ms/req':>12}")
+    results = {}
+    for cache, scenarios in (("0", (("no cache", False),)),
+                             ("1", (("cache, full responses", False), ("cache, revalidating", True)))):
+        server = subprocess.Popen([sys.executable, __file__, "serve", cache], cwd=os.path.dirname(os.path.abspath(__file__)))
+        try:
+            asyncio.run(wait_ready())
+            asyncio.run(drive(1.0, False))  # warm-up
+            for label, revalidate in scenarios:
+                cpu = cpu_seconds(server.pid)
+                started = time.monotonic()
+                totals = asyncio.run(drive(seconds, revalidate))
+                elapsed = time.monotonic() - started
+                cpu = cpu_seconds(server.pid) - cpu
+                results[label] = r = {"rps": totals["requests"] / elapsed, "bytes": totals["bytes"] / totals["requests"],
+                                      "cpu_ms": cpu * 1000 / totals["requests"]}
+                print(f"{label:<28}{r['rps']:>8.0f}{r['bytes']:>11.0f}{totals['not_modified']:>7}{r['cpu_ms']:>12.3f}")
+        finally:
+            server.terminate()
+            server.wait()
+    base = results["no cache"]
+    for label in ("cache, full responses", "cache, revalidating"):
+        r = results[label]
+        print(f"{label}: {base['bytes'] / r['bytes']:.1f}x fewer bytes, {base['cpu_ms'] / r['cpu_ms']:.1f}x less CPU per request")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "serve":
+        serve(sys.argv[2])
+    else:
+        sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,90 @@
+"""
+Benchmark for the in-memory dataset snapshots
+Writes stocks, alerts and box office datasets to a scratch data directory, then drives the FastAPI app
+in-process with waves of concurrent requests and compares request latency when handlers read the
+current snapshot (load_data) with the former per-request read and parse of the JSON file
+Usage: python bench_snapshots.py [waves]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ["RESPONSE_CACHE"] = "0"  # every request reaches its handler
+
+import main
+import scheduler
+from bench_json_responses import request
+from leader import leader_lease
+
+CONCURRENCY = 50
+ROUTES = ("/api/stats", "/api/veille/alerts", "/api/finance/stocks", "/api/boxoffice/france")
+
+
+def write_datasets(directory: str):
+    """Datasets the size of a busy day: 100 quotes, 500 alerts, 300 box office rows"""
+    datasets = {
+        "stocks.json": [{"ticker": f"T{i:03d}.PA", "name": f"Stock {i}", "price": 10.0 + i, "change": 0.5,
+                         "currency": "EUR", "marketCap": "1.2B €"} for i in range(100)],
+        "alerts.json": [{"id": i, "title": f"Alerte {i} : audience, streaming et droits sportifs", "source": "Feed",
+                         "time": "2026-10-17T08:00:00", "priority": "high", "category": "TV",
+                         "link": f"https://example.com/{i}", "aiSummary": "Résumé " * 30} for i in range(500)],
+        "boxoffice.json": [{"rank": i + 1, "title": f"Film {i}", "entries": 100000 - i * 300, "week": "2026-10-07",
+                            "distributor": f"Distributeur {i % 20}"} for i in range(300)],
+    }
+    for filename, data in datasets.items():
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+            json.dump({"data": data, "updated_at": "2026-10-17T08:00:00", "generation": 1}, f, ensure_ascii=False)
+
+
+def legacy_load_data(filename: str) -> dict:
+    """load_data as it was: open and parse the file on every request"""
+    filepath = os.path.join(scheduler.DATA_DIR, filename)
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"data": [], "updated_at": None, "generation": 0}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def timed_request(path: str) -> float:
+    started = time.perf_counter()
+    await request(path, b"")
+    return (time.perf_counter() - started) * 1000
+
+
+async def measure(path: str, waves: int) -> list:
+    """Latencies (ms) of `waves` waves of CONCURRENCY concurrent requests"""
+    await request(path, b"")
+    samples = []
+    for _ in range(waves):
+        samples.extend(await asyncio.gather(*(timed_request(path) for _ in range(CONCURRENCY))))
+    return samples
+
+
+async def run(waves: int):
+    scheduler.DATA_DIR = tempfile.mkdtemp(prefix="bench-snapshots-")
+    write_datasets(scheduler.DATA_DIR)
+    scheduler.warm_snapshots()
+    leader_lease.is_leader = False  # handlers serve the datasets, nothing is fetched
+
+    print(f"{waves} waves of {CONCURRENCY} concurrent requests per route")
+    print(f"{'route':<24}{'per-request file p50/p99':>28}{'snapshot p50/p99':>24}")
+    for path in ROUTES:
+        main.load_data = legacy_load_data
+        before = await measure(path, waves)
+        main.load_data = scheduler.load_data
+        after = await measure(path, waves)
+        print(f"{path:<24}{percentile(before, 0.5):>13.2f} / {percentile(before, 0.99):>6.2f} ms"
+              f"{percentile(after, 0.5):>11.2f} / {percentile(after, 0.99):>6.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
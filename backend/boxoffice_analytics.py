@@ -0,0 +1,355 @@
+"""
+Box office analytics over the CNC weekly table
+Rollups per week (totals, top film, entries and revenue per distributor), per film (run, totals, peak)
+and per row (cumulative entries, change on the film's previous week) are refreshed for the weeks and
+films an ingestion touched only; distributor shares over any range of weeks come from prefix sums,
+so queries read rollups and never scan the raw rows
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import threading
+
+import numpy as np
+
+from boxoffice_store import BoxOfficeTable, boxoffice_table
+
+DAYS_PER_WEEK = 7
+FILM_SORTS = ("entries", "revenue", "weeks", "peak", "first_week")
+
+# Arrays aligned with `weeks` (re-aligned when an earlier week shows up)
+WEEK_ARRAYS = ("week_entries", "week_revenue", "week_films", "week_top", "distributor_entries", "distributor_revenue")
+# Arrays indexed by film code
+FILM_ARRAYS = ("film_first", "film_last", "film_weeks", "film_entries", "film_revenue", "film_peak", "film_distributor")
+
+
+def _day(value: Optional[str]) -> Optional[int]:
+    """Day number of an ISO date (ValueError when invalid), None for no date"""
+    if not value:
+        return None
+    return int(np.datetime64(value[:10], "D").astype(np.int64))
+
+
+def _date(day) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def _float(value) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+class BoxOfficeAnalytics:
+    """Weekly, distributor and film rollups of a BoxOfficeTable, updated from the rows that changed"""
+    def __init__(self, table: BoxOfficeTable):
+        self.table = table
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.cursor: Optional[int] = None   # largest record_ts folded in
+        self.rows_seen = 0
+        self.weeks = np.zeros(0, dtype=np.int32)                      # day number of each week, sorted
+        self.week_entries = np.zeros(0, dtype=np.int64)
+        self.week_revenue = np.zeros(0)
+        self.week_films = np.zeros(0, dtype=np.int32)
+        self.week_top = np.zeros(0, dtype=np.int32)                   # film code with the most entries
+        self.distributor_entries = np.zeros((0, 0), dtype=np.int64)   # weeks x distributors
+        self.distributor_revenue = np.zeros((0, 0))
+        # Prefix sums over weeks: totals for any range of weeks in O(distributors)
+        self.entries_prefix = np.zeros((1, 0), dtype=np.int64)
+        self.revenue_prefix = np.zeros((1, 0))
+        self.week_rows: Dict[int, np.ndarray] = {}   # week -> its rows, most entries first
+        self.film_rows: Dict[int, np.ndarray] = {}   # film code -> its rows, by week
+        self.film_first = np.zeros(0, dtype=np.int32)
+        self.film_last = np.zeros(0, dtype=np.int32)
+        self.film_weeks = np.zeros(0, dtype=np.int32)
+        self.film_entries = np.zeros(0, dtype=np.int64)
+        self.film_revenue = np.zeros(0)
+        self.film_peak = np.zeros(0, dtype=np.int64)
+        self.film_distributor = np.zeros(0, dtype=np.int32)
+        self.cumulative = np.zeros(0, dtype=np.int64)   # per table row: film's entries up to that week
+        self.change = np.zeros(0)                       # per table row: entries vs the previous week - 1
+        self.updated_at: Optional[str] = None
+
+    # ------------------------------------------
+    # INCREMENTAL UPDATE
+    # ------------------------------------------
+
+    def update(self) -> int:
+        """Fold rows ingested or corrected since the last update into the rollups; returns how many"""
+        with self.lock:
+            table = self.table
+            table.load()
+            rows = len(table)
+            if rows < self.rows_seen:
+                self.reset()
+            c = table.columns
+            if self.cursor is None:
+                changed = np.arange(rows)
+            else:
+                # Corrections carry a newer record_timestamp; rows at the cursor itself are re-folded (idempotent)
+                changed = np.union1d(np.flatnonzero(c["record_ts"] >= self.cursor), np.arange(self.rows_seen, rows))
+            if not len(changed):
+                return 0
+
+            self._grow(rows, len(table.films), len(table.distributors))
+            new = np.arange(self.rows_seen, rows)
+            self._index_rows(self.week_rows, c["week"], new)
+            self._index_rows(self.film_rows, c["film"], new)
+            self._update_films(np.unique(c["film"][changed]))
+            self._update_weeks(np.unique(c["week"][changed]))
+            self.cursor = max(self.cursor or 0, int(c["record_ts"][changed].max()))
+            self.rows_seen = rows
+            self.updated_at = datetime.now().isoformat()
+            return len(changed)
+
+    def _grow(self, rows: int, films: int, distributors: int):
+        """Extend the per-row, per-film and per-distributor arrays to the table's sizes"""
+        self.cumulative = np.concatenate([self.cumulative, np.zeros(rows - len(self.cumulative), dtype=np.int64)])
+        self.change = np.concatenate([self.change, np.full(rows - len(self.change), np.nan)])
+        for name in FILM_ARRAYS:
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(films - len(array), dtype=array.dtype)]))
+        extra = distributors - self.distributor_entries.shape[1]
+        if extra > 0:
+            for name in ("distributor_entries", "distributor_revenue", "entries_prefix", "revenue_prefix"):
+                array = getattr(self, name)
+                setattr(self, name, np.hstack([array, np.zeros((len(array), extra), dtype=array.dtype)]))
+
+    def _index_rows(self, index: Dict[int, np.ndarray], keys: np.ndarray, rows: np.ndarray):
+        """Add rows to the row lists of their key (ordered later, per touched key)"""
+        if not len(rows):
+            return
+        order = rows[np.argsort(keys[rows], kind="stable")]
+        for group in np.split(order, np.flatnonzero(np.diff(keys[order])) + 1):
+            key = int(keys[group[0]])
+            existing = index.get(key)
+            index[key] = group if existing is None else np.concatenate([existing, group])
+
+    @staticmethod
+    def _groups(keys: np.ndarray):
+        """Start and end offsets of the runs of equal values in sorted keys"""
+        starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+        return starts, np.r_[starts[1:], len(keys)]
+
+    def _update_films(self, films: np.ndarray):
+        """Recompute the run of each film (rows by week, cumulative entries, weekly change, totals)"""
+        c = self.table.columns
+        rows = np.concatenate([self.film_rows[film] for film in films.tolist()])
+        rows = rows[np.lexsort((c["week"][rows], c["film"][rows]))]
+        starts, ends = self._groups(c["film"][rows])
+        for film, start, end in zip(films.tolist(), starts.tolist(), ends.tolist()):
+            self.film_rows[film] = rows[start:end]
+
+        weeks, entries = c["week"][rows], c["entries"][rows]
+        running = np.cumsum(entries)
+        cumulative = running - np.repeat(running[starts] - entries[starts], ends - starts)
+        self.cumulative[rows] = cumulative
+        first = np.zeros(len(rows), dtype=bool)
+        first[starts] = True
+        previous = np.r_[0, entries[:-1]]
+        consecutive = ~first & (weeks - np.r_[0, weeks[:-1]] == DAYS_PER_WEEK) & (previous > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.change[rows] = np.where(consecutive, entries / previous - 1, np.nan)
+
+        last = ends - 1
+        total_revenue = c["total_revenue"][rows][last]
+        summed_revenue = np.add.reduceat(np.nan_to_num(c["week_revenue"][rows]), starts)
+        self.film_first[films] = weeks[starts]
+        self.film_last[films] = weeks[last]
+        self.film_weeks[films] = ends - starts
+        self.film_entries[films] = cumulative[last]
+        self.film_revenue[films] = np.where(np.isnan(total_revenue), summed_revenue, total_revenue)
+        self.film_peak[films] = np.maximum.reduceat(entries, starts)
+        self.film_distributor[films] = c["distributor"][rows][last]
+
+    def _insert_weeks(self, weeks: np.ndarray):
+        """Add unseen weeks, re-aligning the week arrays when one falls before the last week"""
+        missing = np.setdiff1d(weeks, self.weeks)
+        if not len(missing):
+            return
+        all_weeks = np.union1d(self.weeks, missing).astype(np.int32)
+        index = np.searchsorted(all_weeks, self.weeks)
+        for name in WEEK_ARRAYS:
+            array = getattr(self, name)
+            aligned = np.zeros((len(all_weeks),) + array.shape[1:], dtype=array.dtype)
+            aligned[index] = array
+            setattr(self, name, aligned)
+        self.weeks = all_weeks
+
+    def _update_weeks(self, weeks: np.ndarray):
+        """Recompute the totals and distributor entries of the touched weeks, then the prefix sums after them"""
+        c = self.table.columns
+        self._insert_weeks(weeks)
+        rows = np.concatenate([self.week_rows[week] for week in weeks.tolist()])
+        positions = np.searchsorted(self.weeks, c["week"][rows])
+        order = np.lexsort((-c["entries"][rows], positions))
+        rows, positions = rows[order], positions[order]
+        starts, ends = self._groups(positions)
+        for week, start, end in zip(weeks.tolist(), starts.tolist(), ends.tolist()):
+            self.week_rows[week] = rows[start:end]
+
+        touched = positions[starts]
+        entries, revenue = c["entries"][rows], np.nan_to_num(c["week_revenue"][rows])
+        self.week_entries[touched] = np.add.reduceat(entries, starts)
+        self.week_revenue[touched] = np.add.reduceat(revenue, starts)
+        self.week_films[touched] = ends - starts
+        self.week_top[touched] = c["film"][rows][starts]
+        self.distributor_entries[touched] = 0
+        self.distributor_revenue[touched] = 0
+        np.add.at(self.distributor_entries, (positions, c["distributor"][rows]), entries)
+        np.add.at(self.distributor_revenue, (positions, c["distributor"][rows]), revenue)
+
+        first = int(touched[0])
+        self.entries_prefix = np.vstack([self.entries_prefix[:first + 1],
+                                         self.entries_prefix[first] + np.cumsum(self.distributor_entries[first:], axis=0)])
+        self.revenue_prefix = np.vstack([self.revenue_prefix[:first + 1],
+                                         self.revenue_prefix[first] + np.cumsum(self.distributor_revenue[first:], axis=0)])
+
+    # ------------------------------------------
+    # QUERIES
+    # ------------------------------------------
+
+    def _range(self, start: Optional[str], end: Optional[str]) -> slice:
+        """Positions of the weeks starting within [start, end] (ISO dates)"""
+        first, last = _day(start), _day(end)
+        return slice(int(np.searchsorted(self.weeks, first, "left")) if first is not None else 0,
+                     int(np.searchsorted(self.weeks, last, "right")) if last is not None else len(self.weeks))
+
+    def _row(self, i: int) -> Dict:
+        return {**self.table.row(i), "cumulativeEntries": int(self.cumulative[i]), "change": _float(self.change[i])}
+
+    def _film(self, film: int) -> Dict:
+        return {
+            "film": self.table.films[film],
+            "distributor": self.table.distributors[self.film_distributor[film]],
+            "first_week": _date(self.film_first[film]),
+            "last_week": _date(self.film_last[film]),
+            "weeks": int(self.film_weeks[film]),
+            "entries": int(self.film_entries[film]),
+            "revenue": _float(self.film_revenue[film]),
+            "peak_entries": int(self.film_peak[film]),
+        }
+
+    def week_totals(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+        """Entries, revenue, film count, top film and change on the previous week, for each week in range"""
+        with self.lock:
+            span = self._range(start, end)
+            lo = max(span.start - 1, 0)
+            weeks, entries = self.weeks[lo:span.stop], self.week_entries[lo:span.stop]
+            consecutive = np.r_[False, np.diff(weeks) == DAYS_PER_WEEK] & (np.r_[0, entries[:-1]] > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change = np.where(consecutive, entries / np.r_[1, entries[:-1]] - 1, np.nan)
+            skip = span.start - lo
+            return {"weeks": [
+                {
+                    "week": _date(week),
+                    "entries": int(self.week_entries[i]),
+                    "revenue": round(float(self.week_revenue[i]), 2),
+                    "films": int(self.week_films[i]),
+                    "top_film": self.table.films[self.week_top[i]],
+                    "change": _float(change[i - lo]),
+                }
+                for i, week in zip(range(span.start, span.stop), weeks[skip:].tolist())
+            ], "updated_at": self.updated_at}
+
+    def chart(self, week: Optional[str] = None, limit: int = 20) -> Optional[Dict]:
+        """Films of the week starting on or before `week` (latest by default), most entries first"""
+        with self.lock:
+            if not len(self.weeks):
+                return None
+            day = _day(week)
+            position = len(self.weeks) - 1 if day is None else int(np.searchsorted(self.weeks, day, "right")) - 1
+            if position < 0:
+                return None
+            rows = self.week_rows[int(self.weeks[position])][:limit]
+            return {
+                "week": _date(self.weeks[position]),
+                "entries": int(self.week_entries[position]),
+                "revenue": round(float(self.week_revenue[position]), 2),
+                "films": [{**self._row(i), "rank": rank} for rank, i in enumerate(rows.tolist(), start=1)],
+                "updated_at": self.updated_at,
+            }
+
+    def film(self, title: str) -> Optional[Dict]:
+        """Run of one film: totals plus weekly entries, revenue, cumulative entries and weekly change"""
+        with self.lock:
+            film = self.table.film_codes.get(title)
+            if film is None or film not in self.film_rows:
+                return None
+            c = self.table.columns
+            return {**self._film(film), "series": [
+                {
+                    "week": _date(c["week"][i]),
+                    "entries": int(c["entries"][i]),
+                    "weekRevenue": _float(c["week_revenue"][i]),
+                    "totalRevenue": _float(c["total_revenue"][i]),
+                    "cumulativeEntries": int(self.cumulative[i]),
+                    "change": _float(self.change[i]),
+                }
+                for i in self.film_rows[film].tolist()
+            ]}
+
+    def films(self, query: Optional[str] = None, distributor: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None,
+              sort: str = "entries", limit: int = 50) -> Dict:
+        """Films released within [start, end], optionally by one distributor or matching a title query"""
+        with self.lock:
+            mask = self.film_weeks > 0
+            if distributor is not None:
+                code = self.table.distributor_codes.get(distributor)
+                mask &= self.film_distributor == (code if code is not None else -1)
+            first, last = _day(start), _day(end)
+            if first is not None:
+                mask &= self.film_first >= first
+            if last is not None:
+                mask &= self.film_first <= last
+            if query:
+                needle = query.casefold()
+                mask &= np.fromiter((needle in name.casefold() for name in self.table.films), bool, len(mask))
+            candidates = np.flatnonzero(mask)
+            key = {"entries": self.film_entries, "revenue": np.nan_to_num(self.film_revenue), "weeks": self.film_weeks,
+                   "peak": self.film_peak, "first_week": self.film_first}[sort][candidates]
+            top = candidates[np.argsort(-key, kind="stable")[:limit]]
+            return {"total": len(candidates), "films": [self._film(film) for film in top.tolist()],
+                    "updated_at": self.updated_at}
+
+    def distributors(self, start: Optional[str] = None, end: Optional[str] = None, limit: int = 20) -> Dict:
+        """Entries, revenue and market shares per distributor over the weeks within [start, end]"""
+        with self.lock:
+            span = self._range(start, end)
+            entries = self.entries_prefix[span.stop] - self.entries_prefix[span.start]
+            revenue = self.revenue_prefix[span.stop] - self.revenue_prefix[span.start]
+            total_entries, total_revenue = int(entries.sum()), float(revenue.sum())
+            top = np.argsort(-entries, kind="stable")[:limit]
+            return {
+                "start": _date(self.weeks[span.start]) if span.start < span.stop else None,
+                "end": _date(self.weeks[span.stop - 1]) if span.start < span.stop else None,
+                "weeks": span.stop - span.start,
+                "entries": total_entries,
+                "revenue": round(total_revenue, 2),
+                "distributors": [
+                    {
+                        "distributor": self.table.distributors[d],
+                        "entries": int(entries[d]),
+                        "revenue": round(float(revenue[d]), 2),
+                        "entries_share": round(entries[d] / total_entries, 4) if total_entries else None,
+                        "revenue_share": round(revenue[d] / total_revenue, 4) if total_revenue else None,
+                    }
+                    for d in top.tolist() if entries[d] > 0
+                ],
+                "updated_at": self.updated_at,
+            }
+
+    def stats(self) -> Dict:
+        return {
+            "weeks": len(self.weeks),
+            "films": int((self.film_weeks > 0).sum()),
+            "distributors": self.distributor_entries.shape[1],
+            "rows": self.rows_seen,
+            "updated_at": self.updated_at,
+        }
+
+
+# Global instance over the CNC table
+boxoffice_analytics = BoxOfficeAnalytics(boxoffice_table)
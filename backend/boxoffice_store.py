@@ -0,0 +1,281 @@
+"""
+French box office: weekly entries per film as a local columnar table
+One row per (week, film), one NumPy column per field, film and distributor names dictionary-encoded;
+records from the CNC export are upserted in chunks as they stream in, and the largest
+record_timestamp seen is kept as the watermark for the next incremental refresh
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import io
+import os
+import threading
+
+import numpy as np
+
+from persistence import encode_json, file_signature, read_json_file, write_atomic
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+COLUMNS = {
+    "week": np.int32,             # first day of the week, days since 1970-01-01
+    "film": np.int32,             # index in films
+    "distributor": np.int32,      # index in distributors
+    "rank": np.int16,             # 0 when not published
+    "weeks": np.int16,            # weeks since release, 0 when not published
+    "entries": np.int64,
+    "week_revenue": np.float64,   # NaN when not published
+    "total_revenue": np.float64,  # NaN when not published
+    "record_ts": np.int64,        # record_timestamp of the source record, Unix seconds
+}
+
+# Source field names tried for each column, in order (the export uses the dataset's field ids)
+SOURCE_FIELDS = {
+    "week": ("semaine", "date_semaine", "debut_semaine", "week"),
+    "film": ("titre", "film", "title"),
+    "distributor": ("distributeur", "distributor"),
+    "rank": ("rang", "rank"),
+    "weeks": ("semaines", "nombre_semaines", "weeks"),
+    "entries": ("entrees", "entrees_semaine", "entries"),
+    "week_revenue": ("recettes", "recettes_semaine", "week_revenue"),
+    "total_revenue": ("recettes_cumulees", "total_revenue"),
+    "record_ts": ("record_timestamp", "_record_timestamp"),
+}
+
+# Rows normalized before they are applied to the columns (bounds memory while streaming)
+CHUNK_ROWS = 10000
+
+
+def _field(record: Dict, column: str):
+    for name in SOURCE_FIELDS[column]:
+        value = record.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _day(value) -> Optional[int]:
+    try:
+        return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _timestamp(value) -> int:
+    if not value:
+        return 0
+    try:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return 0
+
+
+def _same(stored: tuple, row: tuple) -> bool:
+    """Equal values field by field, a revenue missing on both sides (NaN) included"""
+    return all(a == b or (a != a and b != b) for a, b in zip(stored, row))
+
+
+def _number(value, default=0):
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(str(value).replace(" ", "").replace(",", ".")) if value is not None else default
+    except ValueError:
+        return default
+
+
+class BoxOfficeTable:
+    """Weekly box office rows keyed by (week, film), persisted as one .npy file per column"""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.films: List[str] = []
+        self.distributors: List[str] = []
+        self.film_codes: Dict[str, int] = {}
+        self.distributor_codes: Dict[str, int] = {}
+        self.positions: Dict[Tuple[int, int], int] = {}  # (week, film code) -> row
+        self.watermark: Optional[str] = None             # largest record_timestamp ingested (ISO)
+        self.updated_at: Optional[str] = None
+        self.signature = None
+        self.load_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.columns["week"])
+
+    # ------------------------------------------
+    # LOAD / PERSIST
+    # ------------------------------------------
+
+    def load(self):
+        """Read the persisted columns
+        Blocking, once: concurrent callers wait for the first one (keep it off the event loop)"""
+        if self.loaded:
+            return
+        with self.load_lock:
+            if not self.loaded:
+                self._load()
+                self.loaded = True  # only once the state is complete: callers never see a partial load
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.signature = file_signature(self.manifest_path)
+        if not os.path.exists(self.manifest_path):
+            return
+        manifest = read_json_file(self.manifest_path)
+        rows = manifest["rows"]
+        # Columns are written before the manifest: rows past its count are from an interrupted save
+        self.columns = {name: np.load(os.path.join(self.directory, f"{name}.npy"))[:rows].astype(dtype)
+                        for name, dtype in COLUMNS.items()}
+        self.films, self.distributors = manifest["films"], manifest["distributors"]
+        self.film_codes = {name: i for i, name in enumerate(self.films)}
+        self.distributor_codes = {name: i for i, name in enumerate(self.distributors)}
+        self.positions = {key: i for i, key in enumerate(zip(self.columns["week"].tolist(), self.columns["film"].tolist()))}
+        self.watermark, self.updated_at = manifest.get("watermark"), manifest.get("updated_at")
+        print(f"Box office table: {rows} rows, {len(self.films)} films")
+
+    def save(self):
+        for name, column in self.columns.items():
+            buffer = io.BytesIO()
+            np.save(buffer, column)
+            write_atomic(os.path.join(self.directory, f"{name}.npy"), buffer.getvalue())
+        write_atomic(self.manifest_path, encode_json({
+            "rows": len(self),
+            "watermark": self.watermark,
+            "updated_at": self.updated_at,
+            "films": self.films,
+            "distributors": self.distributors,
+        }))
+        self.signature = file_signature(self.manifest_path)
+
+    def reload(self) -> bool:
+        """Re-read the table after another process (the scheduler leader) saved it; returns whether it did"""
+        if self.loaded and file_signature(self.manifest_path) == self.signature:
+            return False
+        fresh = BoxOfficeTable(self.directory)
+        fresh.load()
+        # Swapped in one step: queries keep the previous state until the new one is complete
+        vars(self).update(vars(fresh))
+        return True
+
+    # ------------------------------------------
+    # INGESTION
+    # ------------------------------------------
+
+    def _code(self, codes: Dict[str, int], names: List[str], name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _normalize(self, record: Dict) -> Optional[tuple]:
+        """Row values in COLUMNS order, None for a record without a week or a film"""
+        week, film = _day(_field(record, "week")), _field(record, "film")
+        if week is None or not film:
+            return None
+        return (
+            week,
+            self._code(self.film_codes, self.films, str(film).strip()),
+            self._code(self.distributor_codes, self.distributors, str(_field(record, "distributor") or "").strip()),
+            int(_number(_field(record, "rank"))),
+            int(_number(_field(record, "weeks"))),
+            int(_number(_field(record, "entries"))),
+            _number(_field(record, "week_revenue"), np.nan),
+            _number(_field(record, "total_revenue"), np.nan),
+            _timestamp(_field(record, "record_ts")),
+        )
+
+    def _apply(self, rows: Dict[Tuple[int, int], tuple]) -> int:
+        """Upsert normalized rows; returns how many were new or different"""
+        updates, appends = [], []
+        for key, row in rows.items():
+            position = self.positions.get(key)
+            if position is None:
+                appends.append(row)
+            elif not _same(tuple(column[position] for column in self.columns.values())[3:8], row[3:8]):
+                updates.append((position, row))
+        for i, name in enumerate(COLUMNS):
+            if updates:
+                self.columns[name][[p for p, _ in updates]] = [row[i] for _, row in updates]
+            if appends:
+                self.columns[name] = np.concatenate([self.columns[name],
+                                                     np.array([row[i] for row in appends], dtype=COLUMNS[name])])
+        start = len(self) - len(appends)
+        for offset, row in enumerate(appends):
+            self.positions[(row[0], row[1])] = start + offset
+        return len(updates) + len(appends)
+
+    async def ingest(self, records: AsyncIterator[Dict]) -> Tuple[int, int]:
+        """Upsert streamed source records chunk by chunk; returns (records read, rows changed)
+        The caller persists with save() when rows changed"""
+        await asyncio.to_thread(self.load)
+        read = changed = 0
+        max_ts = _timestamp(self.watermark)
+        chunk: Dict[Tuple[int, int], tuple] = {}
+        async for record in records:
+            read += 1
+            row = self._normalize(record)
+            if row is None:
+                continue
+            chunk[(row[0], row[1])] = row  # a later record for the same film and week wins
+            max_ts = max(max_ts, row[-1])
+            if len(chunk) >= CHUNK_ROWS:
+                changed += self._apply(chunk)
+                chunk = {}
+        changed += self._apply(chunk)
+        if max_ts:
+            self.watermark = datetime.utcfromtimestamp(max_ts).isoformat() + "Z"
+        if changed:
+            self.updated_at = datetime.now().isoformat()
+        return read, changed
+
+    # ------------------------------------------
+    # QUERIES
+    # ------------------------------------------
+
+    def latest_week(self, limit: int = 10) -> List[Dict]:
+        """Top films of the most recent week, in the shape of the dashboard's box office list"""
+        self.load()
+        if not len(self):
+            return []
+        week = self.columns["week"]
+        rows = np.flatnonzero(week == week.max())
+        revenue = np.nan_to_num(self.columns["week_revenue"][rows], nan=-1)
+        rows = rows[np.lexsort((-self.columns["entries"][rows], -revenue))][:limit]
+        return [self.row(i, rank) for rank, i in enumerate(rows, start=1)]
+
+    def row(self, i: int, rank: Optional[int] = None) -> Dict:
+        c = self.columns
+        return {
+            "rank": int(c["rank"][i]) or rank,
+            "film": self.films[c["film"][i]],
+            "distributor": self.distributors[c["distributor"][i]],
+            "week": str(np.datetime64(int(c["week"][i]), "D")),
+            "weekRevenue": None if np.isnan(c["week_revenue"][i]) else float(c["week_revenue"][i]),
+            "totalRevenue": None if np.isnan(c["total_revenue"][i]) else float(c["total_revenue"][i]),
+            "entries": int(c["entries"][i]),
+            "weeks": int(c["weeks"][i]) or None,
+        }
+
+    def stats(self) -> Dict:
+        self.load()
+        weeks = self.columns["week"]
+        return {
+            "rows": len(self),
+            "weeks": len(np.unique(weeks)),
+            "films": len(self.films),
+            "first_week": str(np.datetime64(int(weeks.min()), "D")) if len(weeks) else None,
+            "last_week": str(np.datetime64(int(weeks.max()), "D")) if len(weeks) else None,
+            "watermark": self.watermark,
+            "updated_at": self.updated_at,
+        }
+
+
+# Global table instance
+boxoffice_table = BoxOfficeTable(os.path.join(DATA_DIR, "boxoffice"))
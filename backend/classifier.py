@@ -0,0 +1,180 @@
+"""
+Keyword classification engine for articles
+All keyword sets are compiled together and matched in a single pass over the text
+"""
+
+from typing import Dict, List, Set, Tuple
+import re
+import unicodedata
+
+# ============================================
+# KEYWORD SETS
+# ============================================
+
+MEDIA_KEYWORDS = [
+    "tf1", "m6", "canal+", "canal plus", "netflix", "disney", "amazon prime",
+    "streaming", "audience", "box-office", "box office", "cinéma", "cinema",
+    "télévision", "television", "tv", "publicité", "advertising",
+    "vivendi", "bolloré", "bollore", "warner", "paramount", "svod", "avod",
+    "droits tv", "médiamétrie", "mediametrie", "cnc", "arcom",
+    "france télévisions", "radio france", "studio", "production",
+    "theatrical", "release", "premiere", "acquisition", "merger", "deal"
+]
+
+# Article priority at fetch time (English trade press vocabulary)
+HIGH_PRIORITY_KEYWORDS = ["acquisition", "merger", "deal", "exclusive", "record", "breaking"]
+MEDIUM_PRIORITY_KEYWORDS = ["announce", "launch", "premiere", "release", "revenue", "earnings"]
+
+# Alert priority, matched on titles
+ALERT_HIGH_KEYWORDS = ["fusion", "acquisition", "droits", "exclusif", "record", "crise"]
+ALERT_MEDIUM_KEYWORDS = ["audience", "streaming", "lancement", "partenariat"]
+
+# Newsletter profiles
+PROFILE_KEYWORDS = {
+    'audiovisuel': ['tv', 'télévision', 'audience', 'streaming', 'netflix', 'disney', 'canal', 'tf1', 'm6'],
+    'cinema': ['film', 'cinéma', 'box-office', 'salle', 'sortie', 'réalisateur', 'acteur'],
+    'producteur': ['production', 'studio', 'série', 'tournage', 'projet'],
+    'diffuseur': ['diffusion', 'chaîne', 'droits', 'grille', 'programme'],
+    'annonceur': ['publicité', 'pub', 'annonceur', 'marque', 'spot', 'campagne'],
+    'financier': ['bourse', 'action', 'valorisation', 'acquisition', 'résultats', 'chiffre']
+}
+
+# Inflections accepted after a keyword ("deal" also matches "deals", "announce" "announced")
+INFLECTION_SUFFIXES = ("s", "es", "d", "ed", "ing")
+
+# Words are runs of letters/digits; a trailing "+" is kept ("canal+")
+TOKEN_RE = re.compile(r"\w+\+?")
+
+# Accented Latin letters -> base letter
+FOLD_TABLE = {}
+for _code in range(0xC0, 0x250):
+    _base = "".join(c for c in unicodedata.normalize("NFKD", chr(_code)) if not unicodedata.combining(c))
+    if _base != chr(_code) and _base.isascii():
+        FOLD_TABLE[_code] = _base
+# Replacing the few accented letters of a text is much faster than str.translate over every character
+FOLD_RE = re.compile("[" + "".join(map(chr, FOLD_TABLE)) + "]")
+
+
+# Tokens too common to carry meaning in either language
+STOPWORDS = frozenset("""
+le la les un une des du de et en au aux ce ces cette pour par sur dans avec sans qui que quoi
+est sont son sa ses leur leurs plus pas ne se il elle ils elles nous vous on a l d s y
+the a an and or of to in on for with by at from as is are was were be been it its this that
+""".split())
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip accents ("Télévision" -> "television")"""
+    lowered = text.lower()
+    if lowered.isascii():
+        return lowered
+    return FOLD_RE.sub(lambda m: FOLD_TABLE[ord(m.group())], lowered)
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded word tokens of a text"""
+    return TOKEN_RE.findall(fold_text(text))
+
+
+# ============================================
+# CLASSIFIER
+# ============================================
+
+class KeywordClassifier:
+    """
+    Matches every keyword set in one pass, on word boundaries and accent-insensitively
+    The text is tokenized once; single-word keywords (and their inflections) are found
+    with one set intersection, multi-word keywords through their first word
+    """
+    def __init__(self, keyword_sets: Dict[str, List[str]]):
+        self.keyword_sets = keyword_sets
+        categories_by_keyword: Dict[Tuple[str, ...], Set[str]] = {}
+        for category, keywords in keyword_sets.items():
+            for kw in keywords:
+                categories_by_keyword.setdefault(tuple(tokenize(kw)), set()).add(category)
+
+        # A longer keyword also carries the categories of the keywords it contains
+        # ("canal plus" / "canal+" -> "canal"), as plain substring matching did
+        self.categories_by_keyword: Dict[Tuple[str, ...], frozenset] = {}
+        for kw, categories in categories_by_keyword.items():
+            merged = set(categories)
+            for other in self._contained(kw):
+                merged |= categories_by_keyword.get(other, set())
+            self.categories_by_keyword[kw] = frozenset(merged)
+
+        # Every accepted surface form of a one-word keyword -> (keyword, its categories)
+        self.single_words: Dict[str, Tuple[str, frozenset]] = {}
+        # Accepted forms of a multi-word keyword's first word -> (middle words, accepted last words, keyword, categories)
+        self.phrases: Dict[str, List[Tuple[Tuple[str, ...], frozenset, str, frozenset]]] = {}
+        for kw, categories in self.categories_by_keyword.items():
+            if len(kw) == 1:
+                for form in self._inflections(kw[0]):
+                    self.single_words.setdefault(form, (kw[0], categories))
+            elif kw:
+                phrase = (kw[1:-1], frozenset(self._inflections(kw[-1])), " ".join(kw), categories)
+                for form in self._inflections(kw[0]):
+                    self.phrases.setdefault(form, []).append(phrase)
+        self.single_word_set = frozenset(self.single_words)
+        self.phrase_starts = frozenset(self.phrases)
+
+    @staticmethod
+    def _inflections(word: str) -> List[str]:
+        base = word.rstrip("+")
+        if base != word:
+            return [word]
+        return [word] + [word + suffix for suffix in INFLECTION_SUFFIXES]
+
+    @staticmethod
+    def _contained(kw: Tuple[str, ...]) -> Set[Tuple[str, ...]]:
+        """Shorter keywords a keyword contains: its runs of words, or the word without its "+" ("canal+")"""
+        if len(kw) == 1:
+            base = kw[0].rstrip("+")
+            return {(base,)} if base != kw[0] else set()
+        return {kw[i:j] for i in range(len(kw)) for j in range(i + 1, len(kw) + 1) if j - i < len(kw)}
+
+    def _matches(self, text: str) -> List[Tuple[str, frozenset]]:
+        """(keyword, categories) of every keyword found in text"""
+        tokens = tokenize(text)
+        distinct = set(tokens)
+        found = [self.single_words[t] for t in distinct & self.single_word_set]
+
+        starts = distinct & self.phrase_starts
+        if starts:
+            for i, token in enumerate(tokens):
+                if token not in starts:
+                    continue
+                for middle, last_forms, kw, categories in self.phrases[token]:
+                    end = i + len(middle) + 1
+                    if end < len(tokens) and tokens[end] in last_forms and tuple(tokens[i + 1:end]) == middle:
+                        found.append((kw, categories))
+        return found
+
+    def matched_keywords(self, text: str) -> Set[str]:
+        """Keywords (folded) found in text"""
+        return {kw for kw, _ in self._matches(text)}
+
+    def classify(self, text: str) -> Set[str]:
+        """Every category with at least one keyword in text"""
+        categories = set()
+        for _, kw_categories in self._matches(text):
+            categories |= kw_categories
+        return categories
+
+
+def priority_from(categories: Set[str], high: str, medium: str) -> str:
+    """"high" / "medium" / "low" from the categories matched by classify"""
+    if high in categories:
+        return "high"
+    if medium in categories:
+        return "medium"
+    return "low"
+
+
+article_classifier = KeywordClassifier({
+    "media": MEDIA_KEYWORDS,
+    "priority_high": HIGH_PRIORITY_KEYWORDS,
+    "priority_medium": MEDIUM_PRIORITY_KEYWORDS,
+    "alert_high": ALERT_HIGH_KEYWORDS,
+    "alert_medium": ALERT_MEDIUM_KEYWORDS,
+    **{f"profile:{profile}": keywords for profile, keywords in PROFILE_KEYWORDS.items()},
+})
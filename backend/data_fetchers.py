@@ -5,12 +5,116 @@ Connects to actual APIs and data sources
 
 import httpx
 import feedparser
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
 import asyncio
 import json
+import os
 import re
-from bs4 import BeautifulSoup
+import time
+
+from boxoffice_store import boxoffice_table
+from classifier import MEDIA_KEYWORDS, article_classifier, priority_from
+from html_extraction import extract_article_text_async
+from persistence import encode_json, write_atomic
+from resilience import upstreams
+
+# ============================================
+# SHARED HTTP CLIENT
+# ============================================
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+
+# Keep-alive pool shared by every fetcher (one TLS handshake per host, not per call)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=50,
+    max_keepalive_connections=20,
+    keepalive_expiry=60,
+)
+MAX_CONNECTIONS_PER_HOST = 6
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 negotiation in httpx)
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+_http_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the app-wide HTTP client, creating it lazily if needed"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=HTTP_LIMITS,
+            timeout=20,
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _http_client
+
+
+async def start_http_client():
+    """Create the shared HTTP client (called from the FastAPI lifespan)"""
+    get_http_client()
+    print(f"HTTP client ready (http2={HTTP2_ENABLED})")
+
+
+async def close_http_client():
+    """Close the shared HTTP client and drop its pooled connections (and the crumb tied to its cookie jar)"""
+    global _http_client, _yahoo_crumb
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    _host_slots.clear()
+    _yahoo_crumb = None
+
+
+def _host_slot(host: str) -> asyncio.Semaphore:
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    return slot
+
+
+async def http_get(url: str, timeout: float = 20, **kwargs) -> httpx.Response:
+    """GET through the shared client, capped to MAX_CONNECTIONS_PER_HOST in flight per host
+    Runs under the host's circuit breaker (raises CircuitOpenError while it is open); `timeout` is an
+    upper bound, the attempt timeout adapts to the host's observed latency (see resilience.py)"""
+    host = urlsplit(url).hostname or ""
+
+    async def send(attempt_timeout: float) -> httpx.Response:
+        return await get_http_client().get(url, timeout=attempt_timeout, **kwargs)
+
+    # The slot is taken first: time queued behind the host's other calls is neither latency nor a timeout
+    async with _host_slot(host):
+        return await upstreams.call(host, send, timeout)
+
+
+@asynccontextmanager
+async def http_stream(url: str, timeout: float = 20, **kwargs) -> AsyncIterator[httpx.Response]:
+    """GET like http_get, but the response is handed over as soon as the headers arrive, for the caller
+    to read the body (aiter_lines / aiter_bytes) inside the block; the host slot is held, and the
+    connection kept, until the block exits. The attempt timeout also bounds each read"""
+    host = urlsplit(url).hostname or ""
+
+    async def send(attempt_timeout: float) -> httpx.Response:
+        client = get_http_client()
+        request = client.build_request("GET", url, timeout=attempt_timeout, **kwargs)
+        return await client.send(request, stream=True)
+
+    async with _host_slot(host):
+        response = await upstreams.call(host, send, timeout)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
 
 # ============================================
 # BOX OFFICE - Multiple sources
@@ -22,45 +126,68 @@ async def fetch_boxoffice_allocine() -> List[Dict]:
     """
     try:
         url = "https://www.allocine.fr/boxoffice/france/"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        }
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                # Parse basic box office from the page
-                text = response.text
-                # Simple regex to extract film titles (backup method)
-                films = []
-                # Return fallback data for now
-                return []
+        response = await http_get(url, timeout=30)
+        if response.status_code == 200:
+            # Parse basic box office from the page
+            text = response.text
+            # Simple regex to extract film titles (backup method)
+            films = []
+            # Return fallback data for now
+            return []
     except Exception as e:
         print(f"Allocine Error: {e}")
     return []
 
 
+# CNC weekly box office on the Opendatasoft portal (explore API v2.1); the table is kept in
+# boxoffice_store.py and refreshed from the dataset's JSONL export
+CNC_API = os.getenv("CNC_API_URL", "https://data.culture.gouv.fr/api/explore/v2.1")
+CNC_BOXOFFICE_DATASET = os.getenv("CNC_BOXOFFICE_DATASET", "box-office-hebdomadaire-france")
+
+# One refresh of the table at a time: the request path (get_cached_or_fetch) and the scheduled job
+# may both call fetch_cnc_boxoffice, and ingest()/save() must not interleave
+_cnc_refresh = asyncio.Lock()
+
+
+async def stream_cnc_records(since: Optional[str] = None, stats: Optional[Dict] = None):
+    """Records of the CNC box office dataset, parsed one JSONL line at a time as the export streams in
+    With `since` (ISO), only records stamped since then: the incremental refresh (rows already
+    ingested come back unchanged and are not counted)"""
+    params = {"order_by": "record_timestamp"}
+    if since:
+        params["where"] = f"record_timestamp >= date'{since}'"
+    url = f"{CNC_API}/catalog/datasets/{CNC_BOXOFFICE_DATASET}/exports/jsonl"
+    async with http_stream(url, params=params, timeout=60) as response:
+        try:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            if stats is not None:
+                stats["bytes"] = response.num_bytes_downloaded
+
+
 async def fetch_cnc_boxoffice() -> List[Dict]:
     """
     Fetch real French box office data from CNC Open Data
+    Refreshes the local table with the records changed since its watermark and returns the latest
+    week; the curated list stands in until the table has rows
     """
     try:
-        # Try the frequentation dataset which has more recent data
-        url = "https://data.culture.gouv.fr/api/explore/v2.1/catalog/datasets/etablissements-cinematographiques/records"
-        params = {
-            "limit": 20,
-        }
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                # This dataset has cinema establishments, not box office
-                # Fall back to curated data
-                pass
+        async with _cnc_refresh:
+            await asyncio.to_thread(boxoffice_table.load)
+            since, stats, started = boxoffice_table.watermark, {}, time.monotonic()
+            read, changed = await boxoffice_table.ingest(stream_cnc_records(since, stats))
+            if changed:
+                await asyncio.to_thread(boxoffice_table.save)
+        print(f"[{datetime.now()}] CNC box office: {read} records since {since or 'the beginning'}, "
+              f"{changed} rows changed ({stats.get('bytes', 0) / 1e6:.1f} MB in {time.monotonic() - started:.1f}s)")
     except Exception as e:
         print(f"CNC API Error: {e}")
 
-    # Return curated real box office data (updated weekly from industry sources)
-    return get_current_boxoffice_france()
+    # Return curated real box office data (updated weekly from industry sources) until the table has rows
+    return boxoffice_table.latest_week() or get_current_boxoffice_france()
 
 
 def get_current_boxoffice_france() -> List[Dict]:
@@ -115,85 +242,210 @@ MEDIA_STOCKS = [
     {"ticker": "PARA", "name": "Paramount", "sector": "Entertainment"},
 ]
 
-async def fetch_stock_price(ticker: str) -> Dict:
-    """
-    Fetch real stock price from Yahoo Finance API with better market cap parsing
-    """
+# Approximate share counts, used to estimate market cap when Yahoo omits it
+SHARE_COUNTS = {
+    "VIV.PA": 1000000000,  # ~1B shares
+    "TFI.PA": 210000000,   # ~210M shares
+    "MMT.PA": 126000000,   # ~126M shares
+    "PUB.PA": 250000000,   # ~250M shares
+    "NFLX": 430000000,     # ~430M shares
+    "DIS": 1800000000,     # ~1.8B shares
+    "WBD": 2400000000,     # ~2.4B shares
+    "PARA": 650000000,     # ~650M shares
+}
+
+FALLBACK_QUOTES = {
+    "VIV.PA": {"price": 2.36, "change": 0.5, "marketCap": 2360000000, "currency": "EUR"},
+    "TFI.PA": {"price": 8.14, "change": -0.3, "marketCap": 1710000000, "currency": "EUR"},
+    "MMT.PA": {"price": 11.88, "change": 0.8, "marketCap": 1500000000, "currency": "EUR"},
+    "PUB.PA": {"price": 87.08, "change": 1.2, "marketCap": 21770000000, "currency": "EUR"},
+    "NFLX": {"price": 900.50, "change": 2.1, "marketCap": 387000000000, "currency": "USD"},
+    "DIS": {"price": 112.30, "change": -0.5, "marketCap": 202000000000, "currency": "USD"},
+    "WBD": {"price": 11.85, "change": 1.5, "marketCap": 28440000000, "currency": "USD"},
+    "PARA": {"price": 11.20, "change": -1.2, "marketCap": 7280000000, "currency": "USD"},
+}
+
+# Symbols per request on the batched quote endpoint
+QUOTE_BATCH_SIZE = int(os.getenv("QUOTE_BATCH_SIZE", "50"))
+
+# The quote endpoint wants a crumb tied to a session cookie: the cookie comes from fc.yahoo.com
+# (a 404 that sets it), the crumb from getcrumb with that cookie in the shared client's jar
+YAHOO_COOKIE_URL = "https://fc.yahoo.com"
+YAHOO_CRUMB_URL = "https://query1.finance.yahoo.com/v1/test/getcrumb"
+# After a failed handshake, quotes go through the chart calls for this long before the next try
+CRUMB_RETRY_SECONDS = 900
+
+_yahoo_crumb: Optional[str] = None
+_crumb_failed_at = 0.0
+_crumb_lock = asyncio.Lock()
+
+
+def estimate_market_cap(ticker: str, price: float) -> int:
+    """Estimate market cap from known share counts"""
+    shares = SHARE_COUNTS.get(ticker, 100000000)
+    return int(price * shares)
+
+
+def fallback_quote(ticker: str) -> Dict:
+    """Last known quote for a ticker when Yahoo is unavailable"""
+    fb = FALLBACK_QUOTES.get(ticker, {"price": 0, "change": 0, "marketCap": 0, "currency": "EUR"})
+    return {"ticker": ticker, **fb, "timestamp": datetime.now().isoformat()}
+
+
+async def fetch_stock_chart(ticker: str, range_: str = "5d", interval: str = "1d") -> Optional[Dict]:
+    """Raw Yahoo chart result for a ticker (meta + timestamps + OHLCV), None on failure"""
     try:
         url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
         params = {
-            "interval": "1d",
-            "range": "5d"
+            "interval": interval,
+            "range": range_
         }
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+        response = await http_get(url, params=params, timeout=15)
+        if response.status_code == 200:
+            data = response.json()
+            return (data.get("chart", {}).get("result") or [{}])[0]
+    except Exception as e:
+        print(f"Yahoo Finance Error for {ticker}: {e}")
+    return None
+
+
+async def fetch_stock_price(ticker: str) -> Dict:
+    """
+    Fetch real stock price from Yahoo Finance API with better market cap parsing
+    """
+    result = await fetch_stock_chart(ticker)
+    if result:
+        meta = result.get("meta", {})
+
+        current_price = meta.get("regularMarketPrice", 0)
+        previous_close = meta.get("previousClose", meta.get("chartPreviousClose", current_price))
+        change_pct = ((current_price - previous_close) / previous_close * 100) if previous_close else 0
+
+        # Get market cap - try multiple fields
+        market_cap = meta.get("marketCap", 0)
+
+        # If no market cap, estimate from shares * price
+        if not market_cap and current_price:
+            market_cap = estimate_market_cap(ticker, current_price)
+
+        currency = meta.get("currency", "EUR")
+
+        return {
+            "ticker": ticker,
+            "price": round(current_price, 2),
+            "change": round(change_pct, 2),
+            "currency": currency,
+            "marketCap": market_cap,
+            "marketTime": meta.get("regularMarketTime"),
+            "timestamp": datetime.now().isoformat()
         }
-        async with httpx.AsyncClient(timeout=15) as client:
-            response = await client.get(url, params=params, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                result = data.get("chart", {}).get("result", [{}])[0]
-                meta = result.get("meta", {})
 
-                current_price = meta.get("regularMarketPrice", 0)
-                previous_close = meta.get("previousClose", meta.get("chartPreviousClose", current_price))
-                change_pct = ((current_price - previous_close) / previous_close * 100) if previous_close else 0
+    # Return fallback data
+    return fallback_quote(ticker)
+
+
+async def yahoo_crumb(rejected: Optional[str] = None) -> Optional[str]:
+    """Crumb for the quote endpoint, None while the handshake fails
+    Fetched once and again only when Yahoo rejected `rejected` (concurrent batches refresh it once)"""
+    global _yahoo_crumb, _crumb_failed_at
+    async with _crumb_lock:
+        if _yahoo_crumb is not None and _yahoo_crumb != rejected:
+            return _yahoo_crumb
+        _yahoo_crumb = None
+        if time.monotonic() - _crumb_failed_at < CRUMB_RETRY_SECONDS:
+            return None
+        try:
+            await http_get(YAHOO_COOKIE_URL, timeout=10)
+            response = await http_get(YAHOO_CRUMB_URL, timeout=10)
+            crumb = response.text.strip()
+            if response.status_code == 200 and crumb and len(crumb) < 64 and " " not in crumb and "<" not in crumb:
+                _yahoo_crumb = crumb
+                return crumb
+            print(f"[{datetime.now()}] Yahoo crumb HTTP {response.status_code}: {crumb[:80]!r}")
+        except Exception as e:
+            print(f"[{datetime.now()}] Yahoo crumb Error: {e}")
+        _crumb_failed_at = time.monotonic()
+        return None
 
-                # Get market cap - try multiple fields
-                market_cap = meta.get("marketCap", 0)
 
-                # If no market cap, estimate from shares * price
+async def fetch_quote_batch(tickers: List[str]) -> Dict[str, Dict]:
+    """
+    Fetch quotes for many tickers in one request (Yahoo v7 quote endpoint)
+    Returns {ticker: quote}; tickers missing from the response (or every ticker, when Yahoo has
+    no crumb for us) are omitted
+    """
+    quotes = {}
+    try:
+        crumb = await yahoo_crumb()
+        if crumb is None:
+            return quotes
+        url = "https://query1.finance.yahoo.com/v7/finance/quote"
+        response = await http_get(url, params={"symbols": ",".join(tickers), "crumb": crumb}, timeout=15)
+        if response.status_code == 401:
+            # {"finance": {"error": {"code": "Unauthorized", "description": "Invalid Crumb"}}}: cookie or crumb expired
+            crumb = await yahoo_crumb(rejected=crumb)
+            if crumb is None:
+                return quotes
+            response = await http_get(url, params={"symbols": ",".join(tickers), "crumb": crumb}, timeout=15)
+        if response.status_code == 200:
+            data = response.json()
+            for item in data.get("quoteResponse", {}).get("result", []) or []:
+                ticker = item.get("symbol")
+                current_price = item.get("regularMarketPrice")
+                if not ticker or current_price is None:
+                    continue
+
+                previous_close = item.get("regularMarketPreviousClose", current_price)
+                change_pct = item.get("regularMarketChangePercent")
+                if change_pct is None:
+                    change_pct = ((current_price - previous_close) / previous_close * 100) if previous_close else 0
+
+                market_cap = item.get("marketCap", 0)
                 if not market_cap and current_price:
-                    # Use known approximate share counts for major stocks
-                    share_counts = {
-                        "VIV.PA": 1000000000,  # ~1B shares
-                        "TFI.PA": 210000000,   # ~210M shares
-                        "MMT.PA": 126000000,   # ~126M shares
-                        "PUB.PA": 250000000,   # ~250M shares
-                        "NFLX": 430000000,     # ~430M shares
-                        "DIS": 1800000000,     # ~1.8B shares
-                        "WBD": 2400000000,     # ~2.4B shares
-                        "PARA": 650000000,     # ~650M shares
-                    }
-                    shares = share_counts.get(ticker, 100000000)
-                    market_cap = int(current_price * shares)
-
-                currency = meta.get("currency", "EUR")
-
-                return {
+                    market_cap = estimate_market_cap(ticker, current_price)
+
+                quotes[ticker] = {
                     "ticker": ticker,
                     "price": round(current_price, 2),
                     "change": round(change_pct, 2),
-                    "currency": currency,
+                    "currency": item.get("currency", "EUR"),
                     "marketCap": market_cap,
+                    "marketTime": item.get("regularMarketTime"),
                     "timestamp": datetime.now().isoformat()
                 }
+        else:
+            print(f"Yahoo quote batch HTTP {response.status_code} for {len(tickers)} tickers")
     except Exception as e:
-        print(f"Yahoo Finance Error for {ticker}: {e}")
+        print(f"Yahoo quote batch Error ({len(tickers)} tickers): {e}")
+    return quotes
 
-    # Return fallback data
-    fallback_data = {
-        "VIV.PA": {"price": 2.36, "change": 0.5, "marketCap": 2360000000, "currency": "EUR"},
-        "TFI.PA": {"price": 8.14, "change": -0.3, "marketCap": 1710000000, "currency": "EUR"},
-        "MMT.PA": {"price": 11.88, "change": 0.8, "marketCap": 1500000000, "currency": "EUR"},
-        "PUB.PA": {"price": 87.08, "change": 1.2, "marketCap": 21770000000, "currency": "EUR"},
-        "NFLX": {"price": 900.50, "change": 2.1, "marketCap": 387000000000, "currency": "USD"},
-        "DIS": {"price": 112.30, "change": -0.5, "marketCap": 202000000000, "currency": "USD"},
-        "WBD": {"price": 11.85, "change": 1.5, "marketCap": 28440000000, "currency": "USD"},
-        "PARA": {"price": 11.20, "change": -1.2, "marketCap": 7280000000, "currency": "USD"},
-    }
-    fb = fallback_data.get(ticker, {"price": 0, "change": 0, "marketCap": 0, "currency": "EUR"})
-    return {"ticker": ticker, **fb, "timestamp": datetime.now().isoformat()}
 
+async def fetch_stock_quotes(tickers: List[str], batch_size: int = QUOTE_BATCH_SIZE) -> Dict[str, Dict]:
+    """Fetch quotes for all tickers, chunked to batch_size symbols per request"""
+    chunks = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    results = await asyncio.gather(*(fetch_quote_batch(chunk) for chunk in chunks))
 
-async def fetch_all_stocks() -> List[Dict]:
-    """Fetch all media stocks in parallel"""
-    tasks = [fetch_stock_price(stock["ticker"]) for stock in MEDIA_STOCKS]
-    results = await asyncio.gather(*tasks)
+    quotes = {}
+    for chunk_quotes in results:
+        quotes.update(chunk_quotes)
+    return quotes
+
+
+async def fetch_all_stocks(stocks: Optional[List[Dict]] = None) -> List[Dict]:
+    """Fetch all media stocks with batched quote requests"""
+    stocks = MEDIA_STOCKS if stocks is None else stocks
+    quotes = await fetch_stock_quotes([stock["ticker"] for stock in stocks])
+
+    # Tickers the batch endpoint did not return go through the per-ticker chart call
+    missing = [stock["ticker"] for stock in stocks if stock["ticker"] not in quotes]
+    if missing:
+        for result in await asyncio.gather(*(fetch_stock_price(t) for t in missing)):
+            quotes[result["ticker"]] = result
 
     # Merge with stock info
     enriched = []
-    for stock, result in zip(MEDIA_STOCKS, results):
+    for stock in stocks:
+        result = quotes[stock["ticker"]]
         market_cap = result.get("marketCap", 0)
         currency = result.get("currency", "EUR")
         enriched.append({
@@ -220,6 +472,21 @@ def format_market_cap(value: int, currency: str) -> str:
     return f"{value:,} {symbol}"
 
 
+def chart_bars(result: Dict) -> Dict[str, List]:
+    """Bars of a Yahoo chart result as columns ({"ts": [...], "open": [...], ...})"""
+    quote = (result.get("indicators", {}).get("quote") or [{}])[0]
+    bars = {"ts": result.get("timestamp") or []}
+    for name in ("open", "high", "low", "close", "volume"):
+        bars[name] = quote.get(name) or []
+    return bars
+
+
+async def fetch_stock_bars(ticker: str, range_: str) -> Optional[Dict[str, List]]:
+    """Daily OHLCV bars over a Yahoo range ("5d", "1mo", "1y", "10y", ...), None on failure"""
+    result = await fetch_stock_chart(ticker, range_=range_)
+    return chart_bars(result) if result else None
+
+
 # ============================================
 # NEWS MONITORING - RSS Feeds (Fixed)
 # ============================================
@@ -239,72 +506,135 @@ RSS_FEEDS = [
     {"name": "Deadline", "url": "https://deadline.com/feed/", "category": "Entertainment", "lang": "en"},
 ]
 
-MEDIA_KEYWORDS = [
-    "tf1", "m6", "canal+", "canal plus", "netflix", "disney", "amazon prime",
-    "streaming", "audience", "box-office", "box office", "cinéma", "cinema",
-    "télévision", "television", "tv", "publicité", "advertising",
-    "vivendi", "bolloré", "bollore", "warner", "paramount", "svod", "avod",
-    "droits tv", "médiamétrie", "mediametrie", "cnc", "arcom",
-    "france télévisions", "radio france", "studio", "production",
-    "theatrical", "release", "premiere", "acquisition", "merger", "deal"
-]
 
+# ETag / Last-Modified validators per feed, persisted across restarts
+FEED_STATE_FILE = os.path.join(os.path.dirname(__file__), "data", "feed_state.json")
+
+
+class FeedValidatorStore:
+    """Conditional-GET validators per feed URL, with the articles parsed from the last full response"""
+    def __init__(self, path: str):
+        self.path = path
+        self.feeds = {}
+        self.loaded = False
+
+    def load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.feeds = json.load(f)
+        except Exception as e:
+            print(f"Feed state load Error: {e}")
+            self.feeds = {}
+
+    def save(self):
+        try:
+            write_atomic(self.path, encode_json(self.feeds))
+        except Exception as e:
+            print(f"Feed state save Error: {e}")
+
+    def get(self, url: str) -> Dict:
+        self.load()
+        return self.feeds.get(url, {})
+
+    def conditional_headers(self, url: str) -> Dict:
+        """If-None-Match / If-Modified-Since headers for a feed, if it was fetched before"""
+        state = self.get(url)
+        headers = {}
+        if not state.get("articles"):
+            return headers
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def update(self, url: str, response: httpx.Response, articles: List[Dict], parse_seconds: float):
+        self.load()
+        self.feeds[url] = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "size": len(response.content),
+            "parse_seconds": parse_seconds,
+            "articles": articles,
+        }
+
+
+feed_validators = FeedValidatorStore(FEED_STATE_FILE)
+
+def new_rss_cycle_stats() -> Dict:
+    """Empty counters for one news cycle"""
+    return {"feeds": 0, "not_modified": 0, "bytes_saved": 0, "parse_seconds_saved": 0.0, "completed_at": None}
 
-async def fetch_rss_feed(feed: Dict) -> List[Dict]:
-    """Fetch and parse a single RSS feed"""
+
+# Savings from 304 responses during the last completed news cycle
+rss_cycle_stats = new_rss_cycle_stats()
+
+
+async def fetch_rss_feed(feed: Dict, stats: Optional[Dict] = None) -> List[Dict]:
+    """Fetch and parse a single RSS feed (conditional GET, reuses parsed articles on 304)"""
+    stats = stats if stats is not None else new_rss_cycle_stats()
+    stats["feeds"] += 1
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        }
-        async with httpx.AsyncClient(timeout=20, follow_redirects=True) as client:
-            response = await client.get(feed["url"], headers=headers)
-            if response.status_code == 200:
-                parsed = feedparser.parse(response.text)
-                articles = []
-                for entry in parsed.entries[:15]:  # Last 15 articles per feed
-                    title = entry.get("title", "")
-                    summary = entry.get("summary", entry.get("description", ""))
-
-                    # Clean HTML from summary
-                    summary = re.sub('<[^<]+?>', '', summary)
-
-                    # Check if media-related
-                    combined_text = (title + " " + summary).lower()
-                    is_relevant = any(kw in combined_text for kw in MEDIA_KEYWORDS)
-
-                    # Determine priority based on keywords
-                    priority = "low"
-                    high_priority = ["acquisition", "merger", "deal", "exclusive", "record", "breaking"]
-                    medium_priority = ["announce", "launch", "premiere", "release", "revenue", "earnings"]
-
-                    if any(kw in combined_text for kw in high_priority):
-                        priority = "high"
-                    elif any(kw in combined_text for kw in medium_priority):
-                        priority = "medium"
-
-                    articles.append({
-                        "title": title,
-                        "link": entry.get("link", ""),
-                        "published": entry.get("published", ""),
-                        "source": feed["name"],
-                        "category": feed["category"],
-                        "summary": summary[:350] + "..." if len(summary) > 350 else summary,
-                        "is_relevant": is_relevant,
-                        "priority": priority,
-                        "lang": feed.get("lang", "fr")
-                    })
-                print(f"Fetched {len(articles)} articles from {feed['name']}")
-                return articles
+        headers = feed_validators.conditional_headers(feed["url"])
+        response = await http_get(feed["url"], headers=headers, timeout=20, follow_redirects=True)
+        if response.status_code == 304:
+            state = feed_validators.get(feed["url"])
+            stats["not_modified"] += 1
+            stats["bytes_saved"] += state.get("size", 0)
+            stats["parse_seconds_saved"] += state.get("parse_seconds", 0.0)
+            print(f"Not modified: {feed['name']} (reusing {len(state['articles'])} articles)")
+            return state["articles"]
+        if response.status_code == 200:
+            parse_started = time.perf_counter()
+            parsed = feedparser.parse(response.text)
+            articles = []
+            for entry in parsed.entries[:15]:  # Last 15 articles per feed
+                title = entry.get("title", "")
+                summary = entry.get("summary", entry.get("description", ""))
+
+                # Clean HTML from summary
+                summary = re.sub('<[^<]+?>', '', summary)
+
+                # Media relevance and priority from one keyword pass
+                categories = article_classifier.classify(title + " " + summary)
+                is_relevant = "media" in categories
+                priority = priority_from(categories, "priority_high", "priority_medium")
+
+                articles.append({
+                    "title": title,
+                    "link": entry.get("link", ""),
+                    "guid": entry.get("id", ""),
+                    "published": entry.get("published", ""),
+                    "source": feed["name"],
+                    "category": feed["category"],
+                    "summary": summary[:350] + "..." if len(summary) > 350 else summary,
+                    "is_relevant": is_relevant,
+                    "priority": priority,
+                    "lang": feed.get("lang", "fr")
+                })
+            feed_validators.update(feed["url"], response, articles, time.perf_counter() - parse_started)
+            print(f"Fetched {len(articles)} articles from {feed['name']}")
+            return articles
     except Exception as e:
         print(f"RSS Error for {feed['name']}: {e}")
     return []
 
 
 async def fetch_all_news() -> List[Dict]:
-    """Fetch all RSS feeds and filter relevant articles"""
-    tasks = [fetch_rss_feed(feed) for feed in RSS_FEEDS]
+    """Fetch all RSS feeds, relevant articles first (ingested by the article store)"""
+    stats = new_rss_cycle_stats()
+    tasks = [fetch_rss_feed(feed, stats) for feed in RSS_FEEDS]
     results = await asyncio.gather(*tasks)
 
+    await asyncio.to_thread(feed_validators.save)
+    stats["parse_seconds_saved"] = round(stats["parse_seconds_saved"], 4)
+    stats["completed_at"] = datetime.now().isoformat()
+    rss_cycle_stats.update(stats)
+
     all_articles = []
     for articles in results:
         all_articles.extend(articles)
@@ -318,91 +648,208 @@ async def fetch_all_news() -> List[Dict]:
     relevant.sort(key=lambda x: x.get("published", ""), reverse=True)
     non_relevant.sort(key=lambda x: x.get("published", ""), reverse=True)
 
-    # Combine: relevant first, then others
-    combined = relevant + non_relevant[:20]  # Add some non-relevant for variety
-
     print(f"Total news articles: {len(all_articles)}, Relevant: {len(relevant)}")
-    return combined[:50]  # Top 50 articles
+    return relevant + non_relevant
 
 
 # ============================================
 # DATA CACHE
 # ============================================
 
+# Distinguishes "not cached" from cached falsy values such as []
+MISSING = object()
+
+
 class DataCache:
-    """Simple in-memory cache with TTL"""
-    def __init__(self):
-        self.cache = {}
-        self.ttl = {}
-
-    def get(self, key: str) -> Any:
-        if key in self.cache:
-            if datetime.now() < self.ttl.get(key, datetime.min):
-                return self.cache[key]
-            else:
-                del self.cache[key]
-                del self.ttl[key]
-        return None
+    """Bounded LRU cache with TTL (monotonic clock) and hit/miss/eviction counters"""
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, expires_at), least recently used first
+        self.versions: Dict[str, int] = {}  # key -> sequence number of its last set(), never reused
+        self.sequence = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Fresh value for key, or default (expired entries are dropped)"""
+        value, fresh = self.lookup(key)
+        if value is MISSING:
+            return default
+        if not fresh:
+            del self.entries[key]
+            return default
+        return value
+
+    def lookup(self, key: str) -> Tuple[Any, bool]:
+        """Return (value, is_fresh) without evicting expired entries (for stale-while-revalidate)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING, False
+        self.entries.move_to_end(key)
+        value, expires_at = entry
+        fresh = time.monotonic() < expires_at
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return value, fresh
 
     def set(self, key: str, value: Any, ttl_seconds: int = 300):
-        self.cache[key] = value
-        self.ttl[key] = datetime.now() + timedelta(seconds=ttl_seconds)
+        self.entries[key] = (value, time.monotonic() + ttl_seconds)
+        self.entries.move_to_end(key)
+        self.sequence += 1
+        self.versions[key] = self.sequence
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            self.versions.pop(evicted, None)
+            self.evictions += 1
+
+    def version(self, key: str) -> int:
+        """Changes whenever key gets a new value (for cache keys of responses built from it), 0 if absent"""
+        return self.versions.get(key, 0)
 
     def clear(self):
-        self.cache = {}
-        self.ttl = {}
+        self.entries.clear()
+        self.versions.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
 
 
-# Global cache instance
+# Global cache instances: datasets, and scraped article text keyed by URL
 cache = DataCache()
+content_cache = DataCache(max_entries=500)
+
+# key -> the single fetch currently refreshing that key
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+async def _refresh(key: str, fetch_func, ttl: int):
+    try:
+        data = await fetch_func()
+        cache.set(key, data, ttl)
+        return data
+    except Exception as e:
+        print(f"Refresh failed for {key}: {e}")
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+def _single_flight(key: str, fetch_func, ttl: int) -> asyncio.Task:
+    """Start a refresh for key, or join the one already running"""
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.create_task(_refresh(key, fetch_func, ttl))
+        # Background refreshes may have no awaiter; mark their errors as retrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
 
 
 async def get_cached_or_fetch(key: str, fetch_func, ttl: int = 300):
-    """Get from cache or fetch fresh data"""
-    cached = cache.get(key)
-    if cached:
+    """
+    Get from cache or fetch fresh data
+    Concurrent misses share one fetch; expired data is served while one background refresh runs
+    """
+    cached, fresh = cache.lookup(key)
+    if cached is not MISSING:
+        if not fresh:
+            _single_flight(key, fetch_func, ttl)
         return cached
 
-    data = await fetch_func()
-    cache.set(key, data, ttl)
-    return data
+    return await asyncio.shield(_single_flight(key, fetch_func, ttl))
+
+
+async def cancel_refreshes():
+    """Cancel the cache refreshes still running and wait for them (shutdown, before the HTTP client closes)"""
+    tasks = list(_inflight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def refresh_cached(key: str, fetch_func, ttl: int = 300):
+    """Fetch fresh data for key now (the scheduled jobs), joining a fetch already running for it"""
+    return await asyncio.shield(_single_flight(key, fetch_func, ttl))
 
 
 # ============================================
 # ARTICLE SCRAPING & NEWSLETTER GENERATION
 # ============================================
 
+# Scraped article text is kept for 6 hours
+CONTENT_CACHE_TTL = 6 * 3600
+# Article pages scraped at the same time, and the time budget of one newsletter
+SCRAPE_CONCURRENCY = 4
+NEWSLETTER_SCRAPE_DEADLINE = 20
+
+_scrape_slots = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+_scrapes_inflight: Dict[str, asyncio.Task] = {}
+
+
 async def fetch_article_content(url: str) -> str:
-    """Fetch and extract main content from an article URL"""
+    """Fetch and extract main content from an article URL (cached, one scrape per URL at a time)"""
+    if not url:
+        return ""
+    cached = content_cache.get(url, MISSING)
+    if cached is not MISSING:
+        return cached
+
+    task = _scrapes_inflight.get(url)
+    if task is None:
+        task = _scrapes_inflight[url] = asyncio.create_task(_scrape_and_cache(url))
+    # A caller giving up (deadline) must not abort the shared scrape
+    return await asyncio.shield(task)
+
+
+async def fetch_articles_content(urls: List[str], deadline: Optional[float] = None) -> Dict[str, str]:
+    """Scrape several URLs concurrently; those not finished by the deadline map to an empty string"""
+    tasks = {url: asyncio.ensure_future(fetch_article_content(url)) for url in dict.fromkeys(urls) if url}
+    if not tasks:
+        return {}
+    done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"Scrape deadline reached, {len(pending)} article(s) skipped")
+    return {url: task.result() if task in done else "" for url, task in tasks.items()}
+
+
+async def prewarm_article_content(articles: List[Dict]):
+    """Scrape articles ahead of newsletter generation so requests hit the content cache"""
+    urls = [a.get("link", "") for a in articles if a.get("link") and content_cache.get(a["link"], MISSING) is MISSING]
+    contents = await fetch_articles_content(urls)
+    print(f"Pre-warmed {sum(1 for c in contents.values() if c)}/{len(urls)} article contents")
+
+
+async def _scrape_and_cache(url: str) -> str:
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        }
-        async with httpx.AsyncClient(timeout=15, follow_redirects=True) as client:
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # Remove unwanted elements
-                for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'form']):
-                    tag.decompose()
-
-                # Try to find article content
-                article = soup.find('article') or soup.find('div', class_=re.compile(r'article|content|post|entry'))
-
-                if article:
-                    paragraphs = article.find_all('p')
-                else:
-                    paragraphs = soup.find_all('p')
-
-                # Extract text from paragraphs
-                text_parts = []
-                for p in paragraphs[:15]:  # Limit to first 15 paragraphs
-                    text = p.get_text(strip=True)
-                    if len(text) > 50:  # Filter out short paragraphs
-                        text_parts.append(text)
-
-                return ' '.join(text_parts[:8])  # First 8 substantial paragraphs
+        async with _scrape_slots:
+            content = await _scrape_article(url)
+        if content:
+            content_cache.set(url, content, CONTENT_CACHE_TTL)
+        return content
+    finally:
+        _scrapes_inflight.pop(url, None)
+
+
+async def _scrape_article(url: str) -> str:
+    try:
+        response = await http_get(url, timeout=15, follow_redirects=True)
+        if response.status_code == 200:
+            return await extract_article_text_async(response.text)
     except Exception as e:
         print(f"Error fetching article {url}: {e}")
     return ""
@@ -453,10 +900,13 @@ async def generate_newsletter_content(articles: List[Dict], profile_name: str) -
     now = datetime.now()
     today = f"{jours[now.weekday()]} {now.day} {mois[now.month-1]} {now.year}"
 
-    # Fetch full content for each article
+    # Fetch full content for each article (concurrently, within the newsletter deadline)
+    articles = articles[:6]  # Limit to 6 articles
+    contents = await fetch_articles_content([a.get('link', '') for a in articles],
+                                            deadline=NEWSLETTER_SCRAPE_DEADLINE)
     enriched_articles = []
-    for article in articles[:6]:  # Limit to 6 articles
-        content = await fetch_article_content(article.get('link', ''))
+    for article in articles:
+        content = contents.get(article.get('link', ''), "")
         summary = generate_french_summary(
             article.get('title', ''),
             content or article.get('summary', ''),
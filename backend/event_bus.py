@@ -0,0 +1,41 @@
+"""
+In-process event bus
+Producers (scheduled tasks) publish to a topic; every handler subscribed to it runs concurrently
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List
+import asyncio
+
+Handler = Callable[[Any], Awaitable[None]]
+
+# Topics
+ARTICLES_INGESTED = "articles.ingested"  # payload: list of newly stored article records
+
+
+class EventBus:
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.published: Dict[str, int] = {}
+
+    def subscribe(self, topic: str, handler: Handler):
+        self.handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, payload: Any):
+        """Run every handler of the topic; a failing handler is logged and does not affect the others"""
+        self.published[topic] = self.published.get(topic, 0) + 1
+        handlers = self.handlers.get(topic, ())
+        results = await asyncio.gather(*(handler(payload) for handler in handlers), return_exceptions=True)
+        for handler, result in zip(handlers, results):
+            if isinstance(result, Exception):
+                print(f"[{datetime.now()}] Event handler {handler.__name__} failed on {topic}: {result}")
+
+    def stats(self) -> Dict:
+        return {
+            topic: {"handlers": len(self.handlers.get(topic, ())), "published": self.published.get(topic, 0)}
+            for topic in sorted(set(self.handlers) | set(self.published))
+        }
+
+
+# Global bus instance
+event_bus = EventBus()
@@ -0,0 +1,216 @@
+"""
+Stand-in CNC Open Data server for the box office ingestion
+Serves a recorded weekly box office dataset as an Opendatasoft JSONL export (chunked, honouring the
+record_timestamp filter), points data_fetchers at it and checks the full load, the incremental
+refreshes and the recovery from an interrupted export
+Usage: python harness_cnc.py [weeks]
+"""
+
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import json
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import data_fetchers
+from boxoffice_store import BoxOfficeTable
+
+PORT = 18090
+FIRST_WEEK = datetime(2006, 1, 4, tzinfo=timezone.utc)
+RELEASES_PER_WEEK = 25
+WEEKS_IN_THEATRES = 8
+DISTRIBUTORS = [f"Distributeur {i}" for i in range(30)]
+
+
+def recorded_dataset(weeks: int) -> list:
+    """Weekly records as (record_timestamp, fields); each week's chart is published on the following Monday"""
+    records = []
+    for week in range(weeks):
+        day = FIRST_WEEK + timedelta(weeks=week)
+        published = (day + timedelta(days=5, hours=10)).isoformat().replace("+00:00", "Z")
+        chart = []
+        for age in range(min(WEEKS_IN_THEATRES, week + 1)):
+            for k in range(RELEASES_PER_WEEK):
+                release = week - age
+                entries = int((400000 // (k + 1)) * 0.6 ** age)
+                record = {
+                    "semaine": day.date().isoformat(),
+                    "titre": f"Film {release:04d}-{k:02d}",
+                    "distributeur": DISTRIBUTORS[(release * RELEASES_PER_WEEK + k) % len(DISTRIBUTORS)],
+                    "semaines": age + 1,
+                    "entrees": entries,
+                    "recettes": round(entries * 7.4, 2),
+                    "recettes_cumulees": round(sum(int((400000 // (k + 1)) * 0.6 ** a) for a in range(age + 1)) * 7.4, 2),
+                    "record_timestamp": published,
+                }
+                if k == RELEASES_PER_WEEK - 1:
+                    # The smallest releases are published without their revenue
+                    del record["recettes"], record["recettes_cumulees"]
+                chart.append(record)
+        chart.sort(key=lambda r: -r["entrees"])
+        for rank, record in enumerate(chart, start=1):
+            records.append((published, {**record, "rang": rank}))
+    return records
+
+
+class StandInServer:
+    """Serves /api/explore/v2.1/catalog/datasets/<id>/exports/jsonl from `records` (kept ordered by
+    record_timestamp); `cut_after` drops the connection after that many lines"""
+    def __init__(self, records: list):
+        self.records = records
+        self.requests = []
+        self.cut_after = None
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", PORT)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode()
+            target = urlsplit(head.split(" ", 2)[1])
+            query = {k: v[0] for k, v in parse_qs(target.query).items()}
+            self.requests.append(query)
+            since = re.fullmatch(r"record_timestamp >= date'(.+)'", query.get("where", ""))
+            lines = (json.dumps(fields) + "\n" for stamp, fields in self.records
+                     if since is None or stamp >= since.group(1))
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/jsonl\r\n"
+                         b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+            batch, sent = [], 0
+            for line in lines:
+                batch.append(line)
+                sent += 1
+                if self.cut_after is not None and sent >= self.cut_after:
+                    return  # connection dropped mid-export
+                if len(batch) == 500:
+                    await self._chunk(writer, batch)
+                    batch = []
+            await self._chunk(writer, batch)
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _chunk(self, writer: asyncio.StreamWriter, batch: list):
+        if batch:
+            data = "".join(batch).encode()
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+
+    def stop(self):
+        self.server.close()
+
+
+async def refresh(table: BoxOfficeTable) -> tuple:
+    started = time.monotonic()
+    rows_before = len(table)
+    latest = await data_fetchers.fetch_cnc_boxoffice()
+    return latest, time.monotonic() - started, len(table) - rows_before
+
+
+async def main(weeks: int) -> int:
+    directory = tempfile.mkdtemp(prefix="cnc-table-")
+    table = BoxOfficeTable(directory)
+    data_fetchers.boxoffice_table = table
+    data_fetchers.CNC_API = f"http://127.0.0.1:{PORT}/api/explore/v2.1"
+
+    records = recorded_dataset(weeks)
+    export_mb = sum(len(json.dumps(fields)) + 1 for _, fields in records) / 1e6
+    server = StandInServer(records)
+    await server.start()
+    checks = {}
+
+    # 1. Interrupted first export: nothing persisted, watermark untouched
+    server.cut_after = len(records) // 2
+    await refresh(table)
+    checks["interrupted export leaves no watermark"] = table.watermark is None
+    server.cut_after = None
+
+    # 2. Full export (the table already holds the rows read before the cut: they come back unchanged)
+    tracemalloc.start()
+    latest, seconds, added = await refresh(table)
+    retained, peak = (size / 1e6 for size in tracemalloc.get_traced_memory())
+    tracemalloc.stop()
+    # Memory above what the table itself keeps (columns, names, key index): the parsing overhead
+    transient_mb = peak - retained
+    print(f"full export: {len(records)} records ({export_mb:.1f} MB JSONL), {len(table)} rows, "
+          f"table {retained:.1f} MB, transient peak {transient_mb:.1f} MB")
+    checks["every record became a row"] = len(table) == len(records)
+    checks["watermark is the newest record_timestamp"] = table.watermark == records[-1][0]
+    checks["export parsed without holding it in memory"] = transient_mb < export_mb / 4
+
+    # Timed full load into an empty table
+    cold = BoxOfficeTable(tempfile.mkdtemp(prefix="cnc-table-"))
+    data_fetchers.boxoffice_table = cold
+    _, seconds, _ = await refresh(cold)
+    print(f"full load into an empty table: {seconds:.2f}s ({len(records) / seconds:.0f} records/s)")
+
+    # Overlapping refreshes (a request and the scheduled job): the second waits for the first
+    overlapped = BoxOfficeTable(tempfile.mkdtemp(prefix="cnc-table-"))
+    data_fetchers.boxoffice_table = overlapped
+    requests = len(server.requests)
+    await asyncio.gather(refresh(overlapped), refresh(overlapped))
+    checks["overlapping refreshes run one after the other"] = (
+        "where" not in server.requests[requests] and "where" in server.requests[requests + 1])
+    on_disk = BoxOfficeTable(overlapped.directory)
+    on_disk.load()
+    checks["overlapping refreshes keep the table consistent"] = (
+        {len(column) for column in overlapped.columns.values()} == {len(records)}
+        and len(overlapped.positions) == len(records) and len(on_disk) == len(records)
+        and all(np.array_equal(on_disk.columns[name], overlapped.columns[name], equal_nan=True)
+                for name in overlapped.columns))
+    data_fetchers.boxoffice_table = table
+
+    # 3. Nothing changed upstream: only the records stamped at the watermark come back
+    before = {name: column.copy() for name, column in table.columns.items()}
+    updated_at = table.updated_at
+    requests = len(server.requests)
+    _, seconds, added = await refresh(table)
+    where = server.requests[requests].get("where", "")
+    print(f"unchanged refresh: {seconds * 1000:.0f} ms, filter {where!r}")
+    checks["refresh filters on record_timestamp"] = where == f"record_timestamp >= date'{table.watermark}'"
+    checks["unchanged refresh changes nothing"] = added == 0 and table.updated_at == updated_at and all(
+        np.array_equal(before[name], table.columns[name], equal_nan=True) for name in before)
+
+    # 4. Corrections to past weeks plus a new week
+    stamp = (FIRST_WEEK + timedelta(weeks=weeks, days=5, hours=12)).isoformat().replace("+00:00", "Z")
+    corrected = [(i, fields) for i, (_, fields) in enumerate(records[::97])][:300]
+    for _, fields in corrected:
+        records.append((stamp, {**fields, "entrees": fields["entrees"] + 1, "record_timestamp": stamp}))
+    new_week = recorded_dataset(weeks + 1)[-RELEASES_PER_WEEK * WEEKS_IN_THEATRES:]
+    records.extend(new_week)
+    records.sort(key=lambda r: r[0])
+    latest, seconds, added = await refresh(table)
+    print(f"incremental refresh: {len(corrected)} corrections + {len(new_week)} new rows in {seconds * 1000:.0f} ms")
+    checks["new week appended"] = added == len(new_week)
+    sample = corrected[0][1]
+    row = table.positions[(int(np.datetime64(sample["semaine"], "D").astype(int)), table.film_codes[sample["titre"]])]
+    checks["corrections applied in place"] = int(table.columns["entries"][row]) == sample["entrees"] + 1
+    checks["latest week served in the dashboard shape"] = (
+        latest[0]["week"] == new_week[0][1]["semaine"] and latest[0]["rank"] == 1
+        and set(latest[0]) >= {"film", "distributor", "weekRevenue", "totalRevenue", "entries", "weeks"})
+
+    # 5. What was persisted reloads identically
+    reloaded = BoxOfficeTable(directory)
+    reloaded.load()
+    checks["table reloads from disk"] = reloaded.watermark == table.watermark and all(
+        np.array_equal(reloaded.columns[name], table.columns[name], equal_nan=True) for name in table.columns)
+    print(f"table: {table.stats()}")
+
+    server.stop()
+    await data_fetchers.close_http_client()
+    for label, passed in checks.items():
+        print(f"  [{'ok' if passed else 'FAIL'}] {label}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1040)))
@@ -0,0 +1,129 @@
+"""
+Concurrency harness for the cache refreshes (single-flight and stale-while-revalidate)
+Replaces the shared HTTP client's transport with a stand-in for Yahoo, the RSS feeds and the CNC
+export that counts what reaches it, fires bursts of concurrent requests at the API (in-process,
+through the ASGI app) alongside the scheduled jobs, and checks that each burst costs one upstream fetch
+Usage: python harness_single_flight.py [concurrent requests]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+os.environ["RESPONSE_CACHE"] = "0"  # every request reaches its handler
+
+import httpx
+
+import data_fetchers
+import main
+import scheduler
+from bench_quote_batch import StandInYahoo
+from article_store import ArticleStore
+from boxoffice_store import BoxOfficeTable
+from leader import leader_lease
+
+UPSTREAM_DELAY = 1.0  # seconds each stand-in response takes
+
+
+class StandInUpstreams:
+    """httpx transport answering Yahoo (see bench_quote_batch), the feeds and the CNC export; counts requests per kind"""
+    def __init__(self):
+        self.requests = Counter()
+        self.transport = httpx.MockTransport(self.handle)
+        self.yahoo = StandInYahoo(UPSTREAM_DELAY)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        url = urlsplit(str(request.url))
+        if url.hostname.endswith("yahoo.com"):
+            response = await self.yahoo.handle(request)
+            self.requests["quotes"] = self.yahoo.requests["quote"]
+            return response
+        await asyncio.sleep(UPSTREAM_DELAY)
+        if url.path.endswith("/exports/jsonl"):
+            self.requests["cnc"] += 1
+            lines = [{"semaine": "2026-10-07", "titre": f"Film {i}", "entrees": 1000 * (10 - i),
+                      "record_timestamp": "2026-10-12T10:00:00Z"} for i in range(10)]
+            return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines).encode())
+        self.requests["feeds"] += 1
+        items = "".join(f"<item><title>Article {i} de {url.hostname}</title><link>https://{url.hostname}/a/{i}</link>"
+                        f"<description>Audience TV et streaming</description></item>" for i in range(3))
+        return httpx.Response(200, text=f"<rss><channel><title>{url.hostname}</title>{items}</channel></rss>")
+
+
+async def burst(client: httpx.AsyncClient, path: str, count: int) -> tuple:
+    """`count` concurrent GETs; returns (statuses, seconds until the last answer)"""
+    started = time.monotonic()
+    responses = await asyncio.gather(*(client.get(path) for _ in range(count)))
+    return Counter(r.status_code for r in responses), time.monotonic() - started
+
+
+def expire(key: str):
+    value, _ = data_fetchers.cache.entries[key]
+    data_fetchers.cache.entries[key] = (value, 0)
+
+
+async def run(count: int) -> int:
+    # Everything the jobs write goes to a scratch directory
+    scratch = tempfile.mkdtemp(prefix="single-flight-")
+    scheduler.DATA_DIR = scratch
+    store = ArticleStore(os.path.join(scratch, "articles.jsonl"))
+    main.article_store = scheduler.article_store = store
+    table = BoxOfficeTable(os.path.join(scratch, "boxoffice"))
+    data_fetchers.boxoffice_table = table
+    data_fetchers.feed_validators.path = os.path.join(scratch, "feed_state.json")
+    data_fetchers.feed_validators.loaded = True
+    leader_lease.is_leader = True  # handlers fetch on a cache miss only in the leader worker
+
+    upstream = StandInUpstreams()
+    data_fetchers._http_client = httpx.AsyncClient(transport=upstream.transport)
+    feeds = len(data_fetchers.RSS_FEEDS)
+    checks = {}
+    print(f"{count} concurrent requests per burst, upstream answers in {UPSTREAM_DELAY * 1000:.0f} ms")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://api") as client:
+        # 1. Cold cache: every request waits for the same fetch
+        statuses, seconds = await burst(client, "/api/finance/stocks", count)
+        print(f"cold stocks: {dict(statuses)} in {seconds:.2f}s, {upstream.requests['quotes']} quote requests")
+        checks["cold burst: one quote request"] = upstream.requests["quotes"] == 1 and statuses[200] == count
+
+        # 2. Expired entry: the stale data is served at once while one refresh runs in the background
+        expire("stocks")
+        statuses, seconds = await burst(client, "/api/finance/stocks", count)
+        await asyncio.sleep(UPSTREAM_DELAY * 2)
+        print(f"stale stocks: {dict(statuses)} in {seconds:.2f}s, {upstream.requests['quotes'] - 1} quote requests")
+        checks["stale burst: served before the refresh lands"] = seconds < UPSTREAM_DELAY and statuses[200] == count
+        checks["stale burst: one background refresh"] = upstream.requests["quotes"] == 2
+
+        # 3. The scheduled job while a burst misses the cache: the job joins the requests' fetch
+        data_fetchers.cache.entries.pop("stocks")
+        before = upstream.requests["quotes"]
+        (statuses, _), refreshed = await asyncio.gather(burst(client, "/api/finance/stocks", count),
+                                                        scheduler.task_fetch_stocks())
+        print(f"stocks job + burst: {upstream.requests['quotes'] - before} quote requests")
+        checks["stocks job + burst: one quote request"] = upstream.requests["quotes"] - before == 1 and refreshed
+
+        # 4. News on an empty store: one request per feed, whether the job or the requests got there first
+        (statuses, seconds), _ = await asyncio.gather(burst(client, "/api/veille/news", count), scheduler.task_fetch_news())
+        print(f"news job + burst: {dict(statuses)} in {seconds:.2f}s, {upstream.requests['feeds']} feed requests "
+              f"for {feeds} feeds, {store.count()} articles stored")
+        checks["news job + burst: one request per feed"] = upstream.requests["feeds"] == feeds and statuses[200] == count
+        checks["news job + burst: each article stored once"] = store.count(include_duplicates=True) == 3 * feeds
+
+        # 5. Box office: the job and a burst share the export download
+        (statuses, _), _ = await asyncio.gather(burst(client, "/api/boxoffice/france", count), scheduler.task_fetch_boxoffice())
+        print(f"box office job + burst: {upstream.requests['cnc']} export requests, {len(table)} rows")
+        checks["box office job + burst: one export request"] = upstream.requests["cnc"] == 1 and len(table) == 10
+
+    await data_fetchers.close_http_client()
+    for label, passed in checks.items():
+        print(f"  [{'ok' if passed else 'FAIL'}] {label}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)))
@@ -0,0 +1,140 @@
+"""
+Fake-upstream harness for the resilience layer (circuit breakers, adaptive timeouts, retry budget)
+Serves healthy, slow, failing, flapping and dead hosts on loopback addresses, drives them through
+data_fetchers.http_get like a refresh loop would, and checks how each source is handled
+Usage: python harness_upstreams.py
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+
+import data_fetchers
+from resilience import CircuitOpenError, upstreams
+
+PORT = 18080
+CALL_TIMEOUT = 5.0   # the caller's timeout (RSS feeds use 20 s, Yahoo 15 s, CNC 30 s)
+CYCLES = 30          # refresh cycles per scenario
+CYCLE_INTERVAL = 0.1
+
+
+class FakeUpstream:
+    """Minimal HTTP/1.1 server whose behaviour is chosen per request by `behaviour(request_number)`
+    returning (delay seconds, status)"""
+    def __init__(self, host: str, behaviour, port: int = PORT):
+        self.host = host
+        self.port = port
+        self.behaviour = behaviour
+        self.requests = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            self.requests += 1
+            delay, status = self.behaviour(self.requests)
+            await asyncio.sleep(delay)
+            body = b'{"ok": true}'
+            writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def stop(self):
+        self.server.close()
+
+
+def flapping(period: float):
+    """Down (503) and up (200) in alternating periods"""
+    started = time.monotonic()
+    return lambda n: (0.01, 503 if int((time.monotonic() - started) / period) % 2 == 0 else 200)
+
+
+SCENARIOS = {
+    # name: (loopback host, behaviour; None means nothing listens)
+    "healthy": ("127.0.0.2", lambda n: (0.02, 200)),
+    # Stalls on every third request once warmed up
+    "slow": ("127.0.0.3", lambda n: (4.0, 200) if n > 10 and n % 3 == 0 else (0.05, 200)),
+    "failing": ("127.0.0.4", lambda n: (0.01, 503)),
+    "flapping": ("127.0.0.5", flapping(0.8)),
+    "dead": ("127.0.0.6", None),
+}
+# Correlated outage: one call to each of many hosts failing at once; their breakers are all still
+# closed, so only the global budget keeps the retries from multiplying the load
+BURST_PORT = PORT + 1
+BURST_HOSTS = [f"127.0.1.{i}" for i in range(1, 61)]
+
+
+async def drive(name: str, host: str) -> dict:
+    result = {"ok": 0, "error_status": 0, "failed": 0, "rejected": 0, "slowest": 0.0}
+    started = time.monotonic()
+    for _ in range(CYCLES):
+        call_started = time.monotonic()
+        try:
+            response = await data_fetchers.http_get(f"http://{host}:{PORT}/{name}", timeout=CALL_TIMEOUT)
+            result["ok" if response.status_code == 200 else "error_status"] += 1
+        except CircuitOpenError:
+            result["rejected"] += 1
+        except httpx.HTTPError:
+            result["failed"] += 1
+        result["slowest"] = max(result["slowest"], time.monotonic() - call_started)
+        await asyncio.sleep(CYCLE_INTERVAL)
+    result["seconds"] = time.monotonic() - started
+    return result
+
+
+async def main() -> int:
+    # Short cool-downs and backoffs so the breakers cycle within the run
+    upstreams.open_seconds = 0.5
+    upstreams.max_open_seconds = 2.0
+    upstreams.retry_base_delay = 0.05
+
+    servers = [FakeUpstream(host, behaviour) for host, behaviour in SCENARIOS.values() if behaviour]
+    servers.append(FakeUpstream("0.0.0.0", lambda n: (0.01, 503), BURST_PORT))
+    for server in servers:
+        await server.start()
+    results = dict(zip(SCENARIOS, await asyncio.gather(*(drive(name, host) for name, (host, _) in SCENARIOS.items()))))
+    budget_before = upstreams.stats()["retry_budget"]
+    await asyncio.gather(*(data_fetchers.http_get(f"http://{host}:{BURST_PORT}/burst", timeout=CALL_TIMEOUT)
+                           for host in BURST_HOSTS), return_exceptions=True)
+    burst_requests = servers[-1].requests
+    for server in servers:
+        server.stop()
+    await data_fetchers.close_http_client()
+
+    stats = upstreams.stats()
+    print(f"{CYCLES} calls per source, caller timeout {CALL_TIMEOUT}s")
+    print(f"{'source':<10}{'ok':>4}{'5xx':>5}{'failed':>7}{'rejected':>9}{'slowest s':>10}{'total s':>9}"
+          f"{'p95 ms':>9}  breaker")
+    for name, (host, _) in SCENARIOS.items():
+        r, h = results[name], stats["hosts"][host]
+        print(f"{name:<10}{r['ok']:>4}{r['error_status']:>5}{r['failed']:>7}{r['rejected']:>9}"
+              f"{r['slowest']:>10.2f}{r['seconds']:>9.2f}{h['latency_p95_ms'] or 0:>9.0f}  "
+              f"{h['state']} (calls {h['calls']}, failures {h['failures']})")
+    print(f"retry budget: {stats['retry_budget']}")
+    burst_retries = stats["retry_budget"]["retries"] - budget_before["retries"]
+    print(f"burst: {len(BURST_HOSTS)} failing hosts at once -> {burst_requests} requests "
+          f"({burst_retries} retries, {stats['retry_budget']['denied'] - budget_before['denied']} denied)")
+
+    checks = {
+        "healthy source never rejected": results["healthy"]["ok"] == CYCLES,
+        "slow source cut well below the caller timeout": results["slow"]["slowest"] < CALL_TIMEOUT * 0.8,
+        "failing source rejected by its open breaker": results["failing"]["rejected"] > CYCLES // 2,
+        "flapping source recovers between outages": results["flapping"]["ok"] > 0 and results["flapping"]["rejected"] > 0,
+        "dead source rejected by its open breaker": results["dead"]["rejected"] > CYCLES // 2,
+        "burst retries bounded by the budget": burst_retries <= budget_before["tokens"] + len(BURST_HOSTS) * upstreams.retry_ratio,
+    }
+    for label, passed in checks.items():
+        print(f"  [{'ok' if passed else 'FAIL'}] {label}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,96 @@
+"""
+Article text extraction from HTML pages
+Runs in a worker pool so large pages never block the event loop
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+import asyncio
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = "lxml"
+except ImportError:
+    BS4_PARSER = "html.parser"
+
+# "thread" or "process"; process pools sidestep the GIL for BeautifulSoup-heavy pages
+HTML_EXECUTOR = os.getenv("HTML_EXECUTOR", "thread")
+HTML_WORKERS = int(os.getenv("HTML_WORKERS", "2"))
+# Larger documents are truncated before parsing
+MAX_HTML_CHARS = int(os.getenv("MAX_HTML_CHARS", str(1_500_000)))
+
+UNWANTED_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe', 'form']
+CONTAINER_CLASS = re.compile(r'article|content|post|entry')
+CONTAINER_SELECTOR = "div[class*=article], div[class*=content], div[class*=post], div[class*=entry]"
+
+_executor: Optional[Executor] = None
+
+
+def _select_paragraphs(paragraphs: List[str]) -> str:
+    # Keep substantial paragraphs among the first 15, up to 8 of them
+    text_parts = [text for text in paragraphs[:15] if len(text) > 50]
+    return ' '.join(text_parts[:8])
+
+
+def _extract_selectolax(html: str) -> str:
+    tree = HTMLParser(html)
+    tree.strip_tags(UNWANTED_TAGS)
+    article = tree.css_first('article') or tree.css_first(CONTAINER_SELECTOR)
+    paragraphs = (article or tree).css('p')
+    return _select_paragraphs([p.text(strip=True) for p in paragraphs[:15]])
+
+
+def _extract_bs4(html: str) -> str:
+    soup = BeautifulSoup(html, BS4_PARSER)
+
+    # Remove unwanted elements
+    for tag in soup(UNWANTED_TAGS):
+        tag.decompose()
+
+    # Try to find article content
+    article = soup.find('article') or soup.find('div', class_=CONTAINER_CLASS)
+    paragraphs = article.find_all('p', limit=15) if article else soup.find_all('p', limit=15)
+    return _select_paragraphs([p.get_text(strip=True) for p in paragraphs])
+
+
+def extract_article_text(html: str) -> str:
+    """Main text of an article page: first substantial paragraphs of the article body"""
+    html = html[:MAX_HTML_CHARS]
+    if HTMLParser is not None:
+        return _extract_selectolax(html)
+    return _extract_bs4(html)
+
+
+def get_html_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if HTML_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=HTML_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=HTML_WORKERS, thread_name_prefix="html")
+    return _executor
+
+
+async def extract_article_text_async(html: str) -> str:
+    """extract_article_text in the worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_html_executor(), extract_article_text, html[:MAX_HTML_CHARS])
+
+
+def shutdown_html_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,74 @@
+"""
+Scheduler leadership across worker processes
+With several uvicorn workers, only the process holding an exclusive lock on data/scheduler.lock runs
+the scheduler and writes the datasets; the others serve what it persists. The OS releases the lock when
+its holder exits, and a remaining worker takes over at its next attempt
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+import os
+
+try:
+    import fcntl
+except ImportError:  # No flock (Windows): every process leads, run a single worker there
+    fcntl = None
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+class LeaderLease:
+    """Non-blocking exclusive file lock held for the lifetime of the leader process"""
+    def __init__(self, path: str):
+        self.path = path
+        self.fd: Optional[int] = None
+        self.is_leader = False
+        self.acquired_at: Optional[str] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lease if no other process holds it; never blocks"""
+        if self.is_leader:
+            return True
+        if fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            # Holder's pid, for /api/health on the other workers
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()}\n".encode())
+            self.fd = fd
+        self.is_leader = True
+        self.acquired_at = datetime.now().isoformat()
+        print(f"[{datetime.now()}] Worker {os.getpid()} is the scheduler leader")
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+        self.is_leader = False
+
+    def leader_pid(self) -> Optional[int]:
+        if self.is_leader:
+            return os.getpid()
+        try:
+            with open(self.path, "r") as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def status(self) -> Dict:
+        return {
+            "role": "leader" if self.is_leader else "follower",
+            "pid": os.getpid(),
+            "leader_pid": self.leader_pid(),
+            "leader_since": self.acquired_at,
+        }
+
+
+# Global lease instance
+leader_lease = LeaderLease(os.path.join(DATA_DIR, "scheduler.lock"))
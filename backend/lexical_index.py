@@ -0,0 +1,471 @@
+"""
+Full-text archive search: incremental BM25 inverted index
+New documents go to an in-memory buffer that is flushed to immutable on-disk
+segments; small segments are merged together as they accumulate
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from classifier import STOPWORDS, tokenize
+from persistence import decode_json, encode_json, file_signature, read_json_file, write_atomic
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Documents buffered in memory before a segment is written
+FLUSH_DOCS = 5000
+# ... or once the oldest buffered document waited this long, or the pending log grew this large
+# (a few dozen articles per fetch would otherwise stay in memory, and be replayed on start, for days)
+FLUSH_SECONDS = 6 * 3600
+FLUSH_PENDING_BYTES = 4 * 1024 * 1024
+# Size-tiered merging: adjacent segments are merged while the older one holds at most
+# MERGE_FACTOR times the newer one's documents, keeping about log2(N / FLUSH_DOCS) segments
+MERGE_FACTOR = 1.0
+
+# Light French/English suffix stripping, longest suffixes first
+STEM_SUFFIXES = [
+    ("issements", ""), ("issement", ""), ("ements", ""), ("ement", ""), ("ations", ""), ("ation", ""),
+    ("atrices", ""), ("atrice", ""), ("ateurs", ""), ("ateur", ""), ("euses", ""), ("euse", ""),
+    ("ments", ""), ("ment", ""), ("ities", ""), ("ity", ""), ("ness", ""),
+    ("ings", ""), ("ing", ""), ("ies", "y"), ("ied", "y"), ("eaux", "eau"), ("aux", "al"),
+    ("ees", ""), ("ee", ""), ("es", ""), ("ed", ""), ("er", ""), ("ly", ""), ("s", ""), ("e", ""),
+]
+MIN_STEM = 3
+
+
+# ============================================
+# ANALYSIS
+# ============================================
+
+@lru_cache(maxsize=262144)
+def stem(token: str) -> str:
+    """Strip one inflectional suffix, keeping at least MIN_STEM characters"""
+    if token.isdigit():
+        return token
+    for suffix, replacement in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= MIN_STEM:
+            return token[:len(token) - len(suffix)] + replacement
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """Folded, stopword-free, stemmed terms"""
+    return [stem(t.rstrip("+")) for t in tokenize(text) if t not in STOPWORDS and len(t) > 1]
+
+
+def date_key(value: str, upper: bool = False) -> int:
+    """YYYY-MM-DD (or a YYYY / YYYY-MM prefix) -> sortable int YYYYMMDD (0 when missing)
+    As an upper bound a prefix covers the whole year or month"""
+    digits = (value or "").replace("-", "")[:8]
+    if not digits.isdigit():
+        return 0
+    return int(digits.ljust(8, "9" if upper else "0"))
+
+
+# ============================================
+# SEGMENTS
+# ============================================
+
+class Segment:
+    """Immutable postings for a range of documents: sorted terms, offsets, doc ids and term frequencies"""
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.terms = np.load(os.path.join(path, "terms.npy"))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.docs = np.load(os.path.join(path, "docs.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+        self.doc_count = int(read_json_file(os.path.join(path, "meta.json"))["doc_count"])
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            start, end = self.offsets[i], self.offsets[i + 1]
+            return self.docs[start:end], self.tfs[start:end]
+        return _EMPTY_DOCS, _EMPTY_TFS
+
+    @staticmethod
+    def write(path: str, terms: np.ndarray, offsets: np.ndarray, docs: np.ndarray, tfs: np.ndarray, doc_count: int):
+        """Write a segment directory (via a temp dir + rename); terms sorted, postings grouped by term"""
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "terms.npy"), terms)
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets.astype(np.int64))
+        np.save(os.path.join(tmp_path, "docs.npy"), docs.astype(np.int32))
+        np.save(os.path.join(tmp_path, "tfs.npy"), tfs.astype(np.uint16))
+        write_atomic(os.path.join(tmp_path, "meta.json"), encode_json({"doc_count": doc_count}))
+        os.replace(tmp_path, path)
+
+    def term_ids(self) -> np.ndarray:
+        """Index into self.terms of every posting"""
+        return np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+
+
+_EMPTY_DOCS = np.zeros(0, dtype=np.int32)
+_EMPTY_TFS = np.zeros(0, dtype=np.uint16)
+
+
+# ============================================
+# INDEX
+# ============================================
+
+class LexicalIndex:
+    """BM25 inverted index with category, tag and date-range filters"""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.documents_path = os.path.join(directory, "documents.jsonl")
+        self.pending_path = os.path.join(directory, "pending.jsonl")  # terms of unflushed documents
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.documents: List[Dict] = []
+        self.positions: Dict[str, int] = {}
+        # Per-document columns used for scoring and filtering
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.dates = np.zeros(0, dtype=np.int32)
+        self.categories = np.zeros(0, dtype=np.int32)
+        self.category_codes: Dict[str, int] = {}
+        self.tag_docs: Dict[str, List[int]] = {}
+        self.total_length = 0
+        self.segments: List[Segment] = []
+        self.buffer: Dict[str, Dict[int, int]] = {}  # term -> {doc: tf}, not yet flushed
+        self.buffered_from = 0                       # first document held only by the buffer
+        self.buffered_since = 0.0                    # when the oldest buffered document was logged
+        self.segment_seq = 0
+        self.write_lock = threading.Lock()
+        self.buffer_lock = threading.Lock()          # buffer, columns and segment list, shared with searches
+        self.merge_lock = threading.Lock()
+        self.manifest_lock = threading.Lock()
+        self.merge_thread: Optional[threading.Thread] = None
+        self.read_only = False  # set on follower workers: no flush, merge or repair, the leader's files are reloaded
+        self.signature = None  # files as of the last load, see reload()
+        self.load_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.documents)
+
+    # ------------------------------------------
+    # LOAD / PERSIST
+    # ------------------------------------------
+
+    def load(self):
+        """Read the manifest and documents, re-indexing the ones logged after the last flush
+        Blocking, once: concurrent callers wait for the first one (keep it off the event loop)"""
+        if self.loaded:
+            return
+        with self.load_lock:
+            if not self.loaded:
+                self._load()
+                self.loaded = True
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.signature = self._signature()
+        manifest = read_json_file(self.manifest_path) if os.path.exists(self.manifest_path) else {}
+        self.segment_seq = manifest.get("segment_seq", 0)
+        self.segments = [Segment(os.path.join(self.directory, name)) for name in manifest.get("segments", [])]
+        flushed = manifest.get("doc_count", 0)
+        # On a follower an unlisted segment may be one the leader is writing right now
+        if not self.read_only:
+            self._remove_orphans()
+
+        documents = self._read_jsonl(self.documents_path)
+        entries = self._read_jsonl(self.pending_path)
+        pending = {entry["id"]: entry["terms"] for entry in entries}
+        self._append_columns(documents[:flushed])
+        self.buffered_from = len(self.documents)
+        # Documents logged after the last flush are re-indexed into the buffer
+        if len(documents) > flushed:
+            self._index_documents([(doc, pending.get(doc["id"], ())) for doc in documents[flushed:]])
+            # Entries logged before "at" was recorded are at most as old as the last flush
+            oldest = entries[0].get("at") if entries else None
+            if oldest is None and os.path.exists(self.manifest_path):
+                oldest = os.path.getmtime(self.manifest_path)
+            self.buffered_since = oldest or self.buffered_since
+        print(f"Lexical index: {len(self.documents)} documents, {len(self.segments)} segments")
+
+    def _signature(self) -> tuple:
+        return file_signature(self.manifest_path), file_signature(self.documents_path)
+
+    def _remove_orphans(self):
+        """Delete segment directories the manifest does not list: written by a flush or merge that
+        crashed before the manifest was updated, or merged away before their removal"""
+        listed = {segment.name for segment in self.segments}
+        for name in os.listdir(self.directory):
+            if name.startswith("seg_") and name not in listed and os.path.isdir(os.path.join(self.directory, name)):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                print(f"Lexical index: removed orphan segment {name}")
+
+    def reload(self) -> bool:
+        """Re-read the index after another process (the scheduler leader) changed it; returns whether it did"""
+        if self.loaded and self._signature() == self.signature:
+            return False
+        fresh = LexicalIndex(self.directory)
+        fresh.read_only = self.read_only
+        fresh.load()
+        # Swapped in one step: searches keep the previous state until the new one is complete
+        vars(self).update(vars(fresh))
+        return True
+
+    @staticmethod
+    def _read_jsonl(filepath: str) -> List[Dict]:
+        entries = []
+        if os.path.exists(filepath):
+            with open(filepath, "rb") as f:
+                for line in f:
+                    try:
+                        entries.append(decode_json(line))
+                    except ValueError:
+                        break
+        return entries
+
+    def _write_manifest(self):
+        # Flushes and merges run on different threads: snapshot and write in one step so a
+        # stale manifest never overwrites a newer one
+        with self.manifest_lock:
+            with self.buffer_lock:
+                manifest = {
+                    "segments": [s.name for s in self.segments],
+                    "doc_count": self.buffered_from,
+                    "segment_seq": self.segment_seq,
+                }
+            write_atomic(self.manifest_path, encode_json(manifest))
+
+    def _next_segment_path(self) -> str:
+        """Path for a new segment; never one that exists (an orphan the manifest lost track of)"""
+        with self.buffer_lock:
+            while True:
+                self.segment_seq += 1
+                path = os.path.join(self.directory, f"seg_{self.segment_seq:06d}")
+                if not os.path.exists(path) and not os.path.exists(path + ".tmp"):
+                    return path
+
+    # ------------------------------------------
+    # INDEXING
+    # ------------------------------------------
+
+    def add(self, items: List[Tuple[Dict, str]]) -> int:
+        """Index (document, text) pairs not indexed yet; returns how many were added"""
+        self.load()
+        if self.read_only:
+            print(f"[{datetime.now()}] Lexical index is read-only (follower worker), {len(items)} documents not indexed")
+            return 0
+        with self.write_lock:
+            documents = []
+            for doc, text in items:
+                if doc["id"] in self.positions:
+                    continue
+                terms = analyze(text)
+                documents.append(({**doc, "length": len(terms)}, terms))
+            if not documents:
+                return 0
+            now = time.time()
+            with open(self.pending_path, "ab") as f:
+                f.writelines(encode_json({"id": doc["id"], "terms": terms, "at": now}) + b"\n" for doc, terms in documents)
+            with open(self.documents_path, "ab") as f:
+                f.writelines(encode_json(doc) + b"\n" for doc, _ in documents)
+            self._index_documents(documents)
+            if self._flush_due():
+                self.flush()
+            return len(documents)
+
+    def flush_if_due(self):
+        """Flush a buffer that is old or large enough, even with nothing new to add (archive job)"""
+        if self.read_only:
+            return
+        with self.write_lock:
+            if self._flush_due():
+                self.flush()
+
+    def _flush_due(self) -> bool:
+        buffered = len(self.documents) - self.buffered_from
+        if not buffered:
+            return False
+        if buffered >= FLUSH_DOCS or time.time() - self.buffered_since >= FLUSH_SECONDS:
+            return True
+        return os.path.exists(self.pending_path) and os.path.getsize(self.pending_path) >= FLUSH_PENDING_BYTES
+
+    def _append_columns(self, documents: List[Dict]):
+        start = len(self.documents)
+        codes = []
+        for i, doc in enumerate(documents):
+            self.positions[doc["id"]] = start + i
+            codes.append(self.category_codes.setdefault(doc.get("category", ""), len(self.category_codes)))
+            for tag in doc.get("tags", ()):
+                self.tag_docs.setdefault(tag.lower(), []).append(start + i)
+        lengths = np.array([doc.get("length", 0) for doc in documents], dtype=np.int32)
+        self.lengths = np.concatenate([self.lengths, lengths])
+        self.dates = np.concatenate([self.dates, np.array([date_key(d.get("date", "")) for d in documents], dtype=np.int32)])
+        self.categories = np.concatenate([self.categories, np.array(codes, dtype=np.int32)])
+        self.total_length += int(lengths.sum())
+        # "length" only feeds the BM25 column
+        self.documents = self.documents + [{k: v for k, v in doc.items() if k != "length"} for doc in documents]
+
+    def _index_documents(self, documents: List[Tuple[Dict, List[str]]]):
+        term_counts = []
+        for _, terms in documents:
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            term_counts.append(counts)
+        with self.buffer_lock:
+            start = len(self.documents)
+            if start == self.buffered_from:
+                self.buffered_since = time.time()
+            for i, counts in enumerate(term_counts):
+                for term, tf in counts.items():
+                    self.buffer.setdefault(term, {})[start + i] = min(tf, 65535)
+            self._append_columns([doc for doc, _ in documents])
+
+    def flush(self):
+        """Write buffered postings as a new segment; too many segments start a background merge"""
+        if not self.buffer or self.read_only:
+            return
+        terms = sorted(self.buffer)
+        lengths = np.fromiter((len(self.buffer[t]) for t in terms), dtype=np.int64, count=len(terms))
+        docs = np.fromiter((d for t in terms for d in self.buffer[t]), dtype=np.int32, count=int(lengths.sum()))
+        tfs = np.fromiter((tf for t in terms for tf in self.buffer[t].values()), dtype=np.uint16, count=len(docs))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        path = self._next_segment_path()
+        Segment.write(path, np.array(terms, dtype=str), offsets, docs, tfs, len(self.documents) - self.buffered_from)
+        with self.buffer_lock:
+            self.segments = self.segments + [Segment(path)]
+            self.buffer = {}
+            self.buffered_from = len(self.documents)
+        self._write_manifest()
+        open(self.pending_path, "wb").close()
+        if self._mergeable_pair() is not None and not (self.merge_thread and self.merge_thread.is_alive()):
+            self.merge_thread = threading.Thread(target=self.merge, name="lexical-merge", daemon=True)
+            self.merge_thread.start()
+
+    def _mergeable_pair(self) -> Optional[int]:
+        """Position of the newest adjacent pair of similar size, if any"""
+        segments = self.segments
+        for i in range(len(segments) - 2, -1, -1):
+            if segments[i].doc_count <= MERGE_FACTOR * segments[i + 1].doc_count:
+                return i
+        return None
+
+    def merge(self):
+        """Merge similar-sized adjacent segments until none are left (runs on a background thread)
+        Flushes only append segments, so a merged pair's position stays valid while this runs"""
+        if self.read_only:
+            return
+        with self.merge_lock:
+            pair = self._mergeable_pair()
+            while pair is not None:
+                self._merge_pair(pair)
+                pair = self._mergeable_pair()
+
+    def _merge_pair(self, pair: int):
+        left, right = self.segments[pair], self.segments[pair + 1]
+        terms, inverse = np.unique(np.concatenate([left.terms, right.terms]), return_inverse=True)
+        term_ids = np.concatenate([inverse[:len(left.terms)][left.term_ids()],
+                                   inverse[len(left.terms):][right.term_ids()]])
+        # Stable sort by term keeps the left segment's (lower) doc ids first within each term
+        order = np.argsort(term_ids, kind="stable")
+        docs = np.concatenate([left.docs, right.docs])[order]
+        tfs = np.concatenate([left.tfs, right.tfs])[order]
+        offsets = np.searchsorted(term_ids[order], np.arange(len(terms) + 1))
+        path = self._next_segment_path()
+        Segment.write(path, terms, offsets, docs, tfs, left.doc_count + right.doc_count)
+        with self.buffer_lock:
+            self.segments = self.segments[:pair] + [Segment(path)] + self.segments[pair + 2:]
+        self._write_manifest()
+        shutil.rmtree(left.path, ignore_errors=True)
+        shutil.rmtree(right.path, ignore_errors=True)
+        print(f"Lexical index: merged {left.name} + {right.name} -> {os.path.basename(path)}")
+
+    # ------------------------------------------
+    # SEARCH
+    # ------------------------------------------
+
+    def _postings(self, term: str, segments: List[Segment], buffered: Optional[Dict[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        parts = [segment.postings(term) for segment in segments]
+        if buffered:
+            parts.append((np.fromiter(buffered.keys(), dtype=np.int32, count=len(buffered)),
+                          np.fromiter(buffered.values(), dtype=np.uint16, count=len(buffered))))
+        docs = np.concatenate([np.asarray(d) for d, _ in parts]) if parts else _EMPTY_DOCS
+        tfs = np.concatenate([np.asarray(t) for _, t in parts]) if parts else _EMPTY_TFS
+        return docs, tfs
+
+    def search(self, query: str, k: int = 10, category: Optional[str] = None,
+               tags: Optional[List[str]] = None, date_from: Optional[str] = None,
+               date_to: Optional[str] = None) -> List[Tuple[float, Dict]]:
+        """Top-k documents by BM25, restricted by the filters; cost grows with matching postings only"""
+        self.load()
+        terms = list(dict.fromkeys(analyze(query)))
+        with self.buffer_lock:
+            segments, documents, total_length = self.segments, self.documents, self.total_length
+            lengths, dates, categories = self.lengths, self.dates, self.categories
+            buffered = {term: dict(self.buffer[term]) for term in terms if term in self.buffer}
+        n = len(documents)
+        if not n or k <= 0:
+            return []
+        avg_length = max(total_length / n, 1.0)
+
+        doc_parts, score_parts = [], []
+        for term in terms:
+            docs, tfs = self._postings(term, segments, buffered.get(term))
+            if not len(docs):
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            tfs = tfs.astype(np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avg_length)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (BM25_K1 + 1) / (tfs + norm))
+        if not doc_parts:
+            return []
+
+        all_docs, all_scores = np.concatenate(doc_parts), np.concatenate(score_parts)
+        if len(all_docs) > n // 8:
+            # Common terms: a dense accumulator over every document is cheaper than sorting postings
+            dense = np.bincount(all_docs, weights=all_scores, minlength=n)
+            candidates = np.flatnonzero(dense)
+            scores = dense[candidates]
+        else:
+            candidates, inverse = np.unique(all_docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=all_scores)
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if category is not None:
+            code = self.category_codes.get(category)
+            keep &= categories[candidates] == (code if code is not None else -1)
+        if date_from:
+            keep &= dates[candidates] >= date_key(date_from)
+        if date_to:
+            keep &= dates[candidates] <= date_key(date_to, upper=True)
+        for tag in tags or ():
+            keep &= np.isin(candidates, np.asarray(self.tag_docs.get(tag.lower(), ()), dtype=np.int32))
+        candidates, scores = candidates[keep], scores[keep]
+
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), documents[candidates[i]]) for i in top]
+
+    def stats(self) -> Dict:
+        self.load()
+        return {
+            "documents": len(self.documents),
+            "segments": len(self.segments),
+            "buffered_documents": len(self.documents) - self.buffered_from,
+            "terms_buffered": len(self.buffer),
+        }
+
+
+# Global index instance
+lexical_index = LexicalIndex(os.path.join(DATA_DIR, "lexical_index"))
@@ -3,14 +3,15 @@ Satellifacts AI Dashboard - Backend API
 FastAPI backend with REAL data connections
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from contextlib import asynccontextmanager
+import asyncio
 import os
 
 from data_fetchers import (
@@ -19,14 +20,38 @@ from data_fetchers import (
     fetch_stock_price,
     fetch_all_news,
     cache,
+    content_cache,
     get_cached_or_fetch,
+    rss_cycle_stats,
+    start_http_client,
+    close_http_client,
+    cancel_refreshes,
     MEDIA_STOCKS
 )
+from article_store import article_store
+from boxoffice_analytics import boxoffice_analytics
+from boxoffice_store import boxoffice_table
+from vector_index import vector_index
+from lexical_index import lexical_index
+from price_history import DEFAULT_POINTS, price_history
+from market_analytics import market_analytics
+from event_bus import event_bus
+from streaming import alert_channel, price_channel, stream_hub
+from persistence import encode_json
+from pipeline import pipeline
+from resilience import upstreams
+from response_cache import ResponseCacheMiddleware, response_cache
+from leader import leader_lease
+from classifier import PROFILE_KEYWORDS, article_classifier
+from html_extraction import shutdown_html_executor
 from scheduler import (
-    start_scheduler,
+    FAST_START,
     stop_scheduler,
-    run_initial_fetch,
+    run_startup,
+    dataset_readiness,
+    startup_status,
     load_data,
+    warm_snapshots,
     scheduler
 )
 
@@ -36,21 +61,71 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     print("Starting Satellifacts API...")
-    start_scheduler()
-    await run_initial_fetch()
+    warm_snapshots()
+    await start_http_client()
+    # Fast start: requests are served from the snapshots while stores load and sources refresh
+    startup = asyncio.create_task(run_startup())
+    if not FAST_START:
+        await startup
     yield
-    # Shutdown
-    stop_scheduler()
+    # Shutdown: nothing may still be fetching when the HTTP client closes (a late call would open a new one)
+    startup.cancel()
+    await asyncio.gather(startup, return_exceptions=True)
+    await stop_scheduler()
+    await cancel_refreshes()
+    await close_http_client()
+    shutdown_html_executor()
     print("Satellifacts API stopped.")
 
 
+class FastJSONResponse(JSONResponse):
+    """JSON encoded with encode_json (orjson when installed) instead of the stdlib encoder"""
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
 app = FastAPI(
     title="Satellifacts AI API",
     description="API Backend with REAL data connections",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Response cache: GETs of the dataset routes are served from their encoded (and compressed) body until
+# the dataset's generation changes; added before CORS so cached responses still get the CORS headers
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "1") != "0"
+if RESPONSE_CACHE:
+    app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+
+def _news_generation():
+    return article_store.loaded, len(article_store.articles), article_store.updated_at
+
+
+def news_headlines(limit: int = 50) -> List[Dict]:
+    """Headlines of the article store; while it is still loading (fast start), the last fetched news"""
+    if article_store.loaded:
+        return article_store.headlines(limit)
+    return list(cache.get("news") or [])[:limit]
+
+
+# Handlers serve the in-memory cache first: a request-path refresh changes the body without touching the file
+response_cache.route("/api/finance/stocks", 900, lambda: (load_data("stocks.json")["generation"], cache.version("stocks")),
+                     lambda: load_data("stocks.json")["updated_at"])
+response_cache.route("/api/finance/analytics", 900, lambda: market_analytics.updated_at, lambda: market_analytics.updated_at,
+                     prefix=True)
+response_cache.route("/api/veille/news", 1800, _news_generation, lambda: article_store.updated_at)
+# Without alerts, the route falls back to the latest news
+response_cache.route("/api/veille/alerts", 1800, lambda: (load_data("alerts.json")["generation"], _news_generation()),
+                     lambda: load_data("alerts.json")["updated_at"] or article_store.updated_at)
+response_cache.route("/api/boxoffice/france", 86400,
+                     lambda: (load_data("boxoffice.json")["generation"], cache.version("boxoffice"), boxoffice_table.updated_at),
+                     lambda: load_data("boxoffice.json")["updated_at"])
+response_cache.route("/api/boxoffice/france/", 86400, lambda: boxoffice_analytics.updated_at,
+                     lambda: boxoffice_analytics.updated_at, prefix=True)
+response_cache.route("/api/boxoffice/us", 86400, lambda: None)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -64,11 +139,30 @@ app.add_middleware(
 class SearchQuery(BaseModel):
     query: str
     limit: Optional[int] = 10
+    mode: str = "hybrid"  # "hybrid", "lexical" (BM25) or "semantic" (vectors)
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    date_from: Optional[str] = None  # YYYY, YYYY-MM or YYYY-MM-DD
+    date_to: Optional[str] = None
 
 class ChatMessage(BaseModel):
     message: str
 
 
+# Route -> (generation, encoded body): payloads of the scheduler datasets are encoded once per generation
+# and returned as bytes, skipping jsonable_encoder and the JSON encoder on every other request
+_payloads: Dict[str, Tuple[Any, bytes]] = {}
+
+
+def encoded_response(route: str, generation: Any, build: Callable[[], Any]) -> Response:
+    """JSON response for `route`, re-encoded only when `generation` changed (datasets are replaced on
+    refresh, never mutated, so a generation holding the same objects compares equal by identity)"""
+    cached = _payloads.get(route)
+    if cached is None or cached[0] != generation:
+        cached = _payloads[route] = (generation, encode_json(build()))
+    return Response(content=cached[1], media_type="application/json")
+
+
 # ============================================
 # API Routes
 # ============================================
@@ -77,23 +171,29 @@ class ChatMessage(BaseModel):
 async def health_check():
     jobs = [{"id": job.id, "name": job.name, "next_run": str(job.next_run_time)}
             for job in scheduler.get_jobs()]
+    datasets = dataset_readiness()
     return {
         "status": "healthy",
+        "ready": all(dataset["ready"] for dataset in datasets.values()),
         "timestamp": datetime.now().isoformat(),
+        "datasets": datasets,
+        "startup": startup_status(),
         "scheduler_jobs": len(jobs),
-        "jobs": jobs
+        "jobs": jobs,
+        "streams": stream_hub.stats(),
+        "events": event_bus.stats(),
+        "upstreams": upstreams.stats()
     }
 
 
 @app.get("/api/stats")
 async def get_stats():
-    news = load_data("news.json")
     alerts = load_data("alerts.json")
     return {
-        "articles_indexed": len(news.get("data", [])),
+        "articles_indexed": article_store.count() if article_store.loaded else len(article_store.articles),
         "modules_active": 8,
         "alerts_today": len(alerts.get("data", [])),
-        "last_update": news.get("updated_at", "N/A")
+        "last_update": article_store.updated_at or "N/A"
     }
 
 
@@ -104,13 +204,65 @@ async def get_stats():
 @app.get("/api/boxoffice/france")
 async def get_boxoffice_france():
     """Real French box office from CNC Open Data"""
-    data = await get_cached_or_fetch("boxoffice", fetch_cnc_boxoffice, ttl=86400)
+    # Follower workers serve the leader's snapshot and never call upstream themselves
+    data = await get_cached_or_fetch("boxoffice", fetch_cnc_boxoffice, ttl=86400) if leader_lease.is_leader else None
     stored = load_data("boxoffice.json")
-    return {
+    return encoded_response("boxoffice/france", (data, stored, boxoffice_table.updated_at), lambda: {
         "data": data if data else stored.get("data", []),
         "source": "CNC Open Data",
-        "last_update": stored.get("updated_at", datetime.now().isoformat())
-    }
+        "last_update": stored.get("updated_at", datetime.now().isoformat()),
+        "table": boxoffice_table.stats()
+    })
+
+
+def _boxoffice_query(function, *args, **kwargs):
+    """Run an analytics query in a thread, turning invalid dates into a 400"""
+    def run():
+        try:
+            return function(*args, **kwargs)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    return asyncio.to_thread(run)
+
+
+@app.get("/api/boxoffice/france/weeks")
+async def get_boxoffice_weeks(start: Optional[str] = None, end: Optional[str] = None):
+    """Weekly totals (entries, revenue, films, top film, change on the previous week) between two dates"""
+    return await _boxoffice_query(boxoffice_analytics.week_totals, start, end)
+
+
+@app.get("/api/boxoffice/france/chart")
+async def get_boxoffice_chart(week: Optional[str] = None, limit: int = Query(20, ge=1, le=500)):
+    """Films of one week (latest by default) with cumulative entries and change on the previous week"""
+    chart = await _boxoffice_query(boxoffice_analytics.chart, week, limit)
+    if chart is None:
+        raise HTTPException(status_code=404, detail="No box office week on or before this date")
+    return chart
+
+
+@app.get("/api/boxoffice/france/films")
+async def get_boxoffice_films(q: Optional[str] = None, distributor: Optional[str] = None,
+                              start: Optional[str] = None, end: Optional[str] = None,
+                              sort: str = Query("entries", pattern="^(entries|revenue|weeks|peak|first_week)$"),
+                              limit: int = Query(50, ge=1, le=500)):
+    """Films released between two dates, by distributor or title, ranked by entries, revenue, weeks or peak"""
+    return await _boxoffice_query(boxoffice_analytics.films, q, distributor, start, end, sort, limit)
+
+
+@app.get("/api/boxoffice/france/film")
+async def get_boxoffice_film(title: str):
+    """Run of one film: totals and weekly entries with the cumulative curve"""
+    film = await _boxoffice_query(boxoffice_analytics.film, title)
+    if film is None:
+        raise HTTPException(status_code=404, detail="Film not found")
+    return film
+
+
+@app.get("/api/boxoffice/france/distributors")
+async def get_boxoffice_distributors(start: Optional[str] = None, end: Optional[str] = None,
+                                     limit: int = Query(20, ge=1, le=500)):
+    """Entries, revenue and market shares per distributor between two dates"""
+    return await _boxoffice_query(boxoffice_analytics.distributors, start, end, limit)
 
 
 @app.get("/api/boxoffice/us")
@@ -132,13 +284,59 @@ async def get_boxoffice_us():
 @app.get("/api/finance/stocks")
 async def get_stocks():
     """Real stock prices from Yahoo Finance"""
-    data = await get_cached_or_fetch("stocks", fetch_all_stocks, ttl=900)
+    data = await get_cached_or_fetch("stocks", fetch_all_stocks, ttl=900) if leader_lease.is_leader else None
     stored = load_data("stocks.json")
-    return {
+    return encoded_response("finance/stocks", (data, stored), lambda: {
         "data": data if data else stored.get("data", []),
         "source": "Yahoo Finance",
         "last_update": stored.get("updated_at", datetime.now().isoformat())
-    }
+    })
+
+
+def _date_to_ts(value: Optional[str], end_of_day: bool = False) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if end_of_day and len(value) <= 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return int(parsed.timestamp())
+
+
+@app.get("/api/finance/history/{ticker}")
+async def get_stock_history(ticker: str, start: Optional[str] = None, end: Optional[str] = None,
+                            points: int = Query(DEFAULT_POINTS, ge=10, le=5000),
+                            method: str = Query("ohlc", pattern="^(ohlc|lttb)$")):
+    """Stored price history of a ticker, downsampled server-side (OHLC buckets or LTTB on closes)"""
+    history = await asyncio.to_thread(price_history.history, ticker, _date_to_ts(start),
+                                      _date_to_ts(end, end_of_day=True), points, method)
+    if history is None:
+        raise HTTPException(status_code=404, detail="No history for this ticker")
+    return {**history, "source": "Price history"}
+
+
+# Headers for Server-Sent Events responses (no caching, no proxy buffering)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.get("/api/finance/stream")
+async def stream_prices():
+    """Live quotes as Server-Sent Events: a snapshot, then the tickers that changed on each refresh"""
+    return StreamingResponse(price_channel.stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/api/finance/analytics")
+async def get_market_analytics():
+    """Returns, volatility and drawdowns per stock plus sector aggregates (precomputed on each price update)"""
+    return Response(content=market_analytics.payload("summary"), media_type="application/json")
+
+
+@app.get("/api/finance/analytics/correlation")
+async def get_market_correlation():
+    """Correlation matrix of daily returns across the watchlist (precomputed on each price update)"""
+    return Response(content=market_analytics.payload("correlation"), media_type="application/json")
 
 
 @app.get("/api/finance/stock/{ticker}")
@@ -158,45 +356,75 @@ async def get_stock(ticker: str):
 async def get_alerts():
     """Real alerts generated from RSS feeds"""
     stored_alerts = load_data("alerts.json")
-    alerts = stored_alerts.get("data", [])
-
-    # If no alerts generated, use news with high/medium priority as alerts
-    if not alerts:
-        stored_news = load_data("news.json")
-        news = stored_news.get("data", [])
-        alerts = []
-        for i, article in enumerate(news[:20]):
-            if article.get("priority") in ["high", "medium"] or article.get("is_relevant"):
-                alerts.append({
-                    "id": i + 1,
-                    "title": article.get("title", ""),
-                    "source": article.get("source", ""),
-                    "time": article.get("published", ""),
-                    "priority": article.get("priority", "medium"),
-                    "category": article.get("category", "Entertainment"),
-                    "link": article.get("link", ""),
-                    "aiSummary": article.get("summary", "")[:200]
-                })
 
-    return {
-        "alerts": alerts[:15],
-        "total": len(alerts),
-        "source": "RSS Feeds Analysis",
-        "last_update": stored_alerts.get("updated_at") or datetime.now().isoformat()
-    }
+    def build():
+        alerts = stored_alerts.get("data", [])
+
+        # If no alerts generated, use news with high/medium priority as alerts
+        if not alerts:
+            news = news_headlines(limit=20)
+            alerts = []
+            for i, article in enumerate(news):
+                if article.get("priority") in ["high", "medium"] or article.get("is_relevant"):
+                    alerts.append({
+                        "id": i + 1,
+                        "title": article.get("title", ""),
+                        "source": article.get("source", ""),
+                        "time": article.get("published", ""),
+                        "priority": article.get("priority", "medium"),
+                        "category": article.get("category", "Entertainment"),
+                        "link": article.get("link", ""),
+                        "aiSummary": article.get("summary", "")[:200]
+                    })
+
+        return {
+            "alerts": alerts[:15],
+            "total": len(alerts),
+            "source": "RSS Feeds Analysis",
+            "last_update": stored_alerts.get("updated_at") or datetime.now().isoformat()
+        }
+
+    # Without stored alerts the payload follows the news, so both are part of its generation
+    return encoded_response("veille/alerts", (stored_alerts, _news_generation()), build)
+
+
+@app.get("/api/veille/alerts/stream")
+async def stream_alerts(last_event_id: Optional[str] = Header(None),
+                        resume_from: Optional[str] = Query(None, alias="last_event_id")):
+    """New alerts as Server-Sent Events, pushed as articles are ingested
+    A reconnecting client (Last-Event-ID header, or ?last_event_id=) gets the alerts it missed"""
+    return StreamingResponse(alert_channel.stream(last_event_id or resume_from),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @app.get("/api/veille/news")
-async def get_news():
-    """All news from RSS feeds"""
-    data = await get_cached_or_fetch("news", fetch_all_news, ttl=1800)
-    stored = load_data("news.json")
-    return {
-        "articles": data if data else stored.get("data", []),
-        "total": len(data if data else stored.get("data", [])),
+async def get_news(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500),
+                   relevant: bool = False, include_duplicates: bool = False,
+                   sort: str = Query("relevance", pattern="^(relevance|date)$")):
+    """News from RSS feeds, paged over the article store
+    sort=relevance (default): relevant articles first, then the others, newest first within each group;
+    sort=date: newest first"""
+    if not article_store.loaded:
+        # Fast start: the log is still being indexed in a thread, serve the last fetched news meanwhile
+        fallback = [a for a in cache.get("news") or [] if a.get("is_relevant") or not relevant]
+        return {"articles": fallback[offset:offset + limit], "total": len(fallback), "offset": offset, "limit": limit,
+                "source": "RSS Feeds", "last_update": None, "loading": True}
+    if leader_lease.is_leader and not article_store.count(include_duplicates=True):
+        # Cold start: nothing ingested yet
+        await article_store.ingest_async(await get_cached_or_fetch("news", fetch_all_news, ttl=1800))
+
+    # Spliced from the records' cached JSON: nothing but the envelope is encoded per request
+    articles, total = article_store.encoded_query(offset, limit, relevant_only=relevant,
+                                                  include_duplicates=include_duplicates,
+                                                  relevant_first=sort == "relevance")
+    envelope = encode_json({
+        "total": total,
+        "offset": offset,
+        "limit": limit,
         "source": "RSS Feeds",
-        "last_update": stored.get("updated_at")
-    }
+        "last_update": article_store.updated_at
+    })
+    return Response(content=b'{"articles":' + articles + b"," + envelope[1:], media_type="application/json")
 
 
 @app.get("/api/veille/sources")
@@ -214,62 +442,68 @@ async def get_sources():
 
 
 # ============================================
-# RAG ARCHIVES (Demo - needs vector DB)
+# RAG ARCHIVES - local vector + BM25 indexes
 # ============================================
 
-SAMPLE_ARTICLES = [
-    {
-        "id": 1,
-        "title": "TF1 et M6 : les détails de la fusion avortée",
-        "date": "2022-09-16",
-        "category": "Audiovisuel",
-        "excerpt": "L'Autorité de la concurrence a finalement bloqué le projet de fusion...",
-        "relevance": 0.95,
-        "tags": ["TF1", "M6", "Fusion", "Concentration"]
-    },
-    {
-        "id": 2,
-        "title": "Canal+ accélère sur les droits sportifs internationaux",
-        "date": "2024-03-12",
-        "category": "Droits TV",
-        "excerpt": "Le groupe Canal+ poursuit sa stratégie d'acquisition de droits sportifs...",
-        "relevance": 0.89,
-        "tags": ["Canal+", "Sport", "Droits TV"]
-    },
-    {
-        "id": 3,
-        "title": "Netflix France : bilan de 10 ans de présence",
-        "date": "2024-09-15",
-        "category": "Streaming",
-        "excerpt": "Dix ans après son lancement en France, Netflix compte plus de 10 millions d'abonnés...",
-        "relevance": 0.85,
-        "tags": ["Netflix", "SVOD", "France"]
-    },
-]
+# Reciprocal rank fusion constant for hybrid search
+RRF_K = 60
+# Semantic candidates fetched per requested result when filters have to be applied afterwards
+SEMANTIC_OVERFETCH = 5
+
+
+def _matches_filters(doc: dict, query: SearchQuery) -> bool:
+    date = doc.get("date", "")
+    if query.category is not None and doc.get("category") != query.category:
+        return False
+    if query.date_from and date < query.date_from:
+        return False
+    if query.date_to and date[:len(query.date_to)] > query.date_to:
+        return False
+    doc_tags = {t.lower() for t in doc.get("tags", ())}
+    return all(tag.lower() in doc_tags for tag in query.tags or ())
+
+
+def _search_archives(query: SearchQuery) -> list:
+    limit = query.limit or 10
+    lexical, semantic = [], []
+    if query.mode in ("hybrid", "lexical"):
+        lexical = lexical_index.search(query.query, limit * 2 if query.mode == "hybrid" else limit,
+                                       category=query.category, tags=query.tags,
+                                       date_from=query.date_from, date_to=query.date_to)
+    if query.mode in ("hybrid", "semantic"):
+        filtered = query.category is not None or query.tags or query.date_from or query.date_to
+        hits = vector_index.search(query.query, limit * (SEMANTIC_OVERFETCH if filtered else 2))
+        semantic = [(score, doc) for score, doc in hits if _matches_filters(doc, query)]
+
+    if query.mode != "hybrid":
+        return [{**doc, "relevance": round(score, 3)} for score, doc in (lexical or semantic)[:limit]]
+
+    # Reciprocal rank fusion: scores of the two rankings are not comparable, their ranks are
+    fused, docs = {}, {}
+    for ranking in (lexical, semantic):
+        for rank, (_, doc) in enumerate(ranking):
+            fused[doc["id"]] = fused.get(doc["id"], 0.0) + 1.0 / (RRF_K + rank + 1)
+            docs[doc["id"]] = doc
+    ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+    return [{**docs[doc_id], "relevance": round(fused[doc_id] * RRF_K, 3)} for doc_id in ranked]
+
 
 @app.post("/api/rag/search")
 async def search_archives(query: SearchQuery):
-    """Semantic search (demo - needs vector DB for production)"""
-    results = []
-    for article in SAMPLE_ARTICLES:
-        if any(word.lower() in article["title"].lower() or
-               word.lower() in " ".join(article["tags"]).lower()
-               for word in query.query.split()):
-            results.append(article)
-
-    if not results:
-        results = SAMPLE_ARTICLES[:query.limit]
-
-    return {"results": results, "total": len(results), "source": "Demo (Vector DB needed)"}
+    """Search over the archived articles: BM25, semantic, or both fused (default)"""
+    if query.mode not in ("hybrid", "lexical", "semantic"):
+        raise HTTPException(status_code=400, detail="mode must be hybrid, lexical or semantic")
+    results = await asyncio.to_thread(_search_archives, query)
+    return {"results": results, "total": len(results), "mode": query.mode, "source": "Archive index"}
 
 
 @app.get("/api/rag/stats")
 async def get_rag_stats():
+    stats = vector_index.stats()
     return {
-        "total_articles": 15847,
-        "since_year": 2014,
-        "unique_tags": 2456,
-        "status": "Demo mode - Vector DB integration pending"
+        **stats,
+        "lexical": lexical_index.stats(),
+        "status": f"Vector index ready ({stats['index']})" if stats["total_articles"] else "Vector index empty"
     }
 
 
@@ -394,16 +628,6 @@ async def generate_newsletter(profile_id: str):
     """Generate a real newsletter with scraped article content"""
     from data_fetchers import generate_newsletter_content
 
-    # Profile keywords for filtering
-    profile_keywords = {
-        'audiovisuel': ['tv', 'télévision', 'audience', 'streaming', 'netflix', 'disney', 'canal', 'tf1', 'm6'],
-        'cinema': ['film', 'cinéma', 'box-office', 'salle', 'sortie', 'réalisateur', 'acteur'],
-        'producteur': ['production', 'studio', 'série', 'tournage', 'projet'],
-        'diffuseur': ['diffusion', 'chaîne', 'droits', 'grille', 'programme'],
-        'annonceur': ['publicité', 'pub', 'annonceur', 'marque', 'spot', 'campagne'],
-        'financier': ['bourse', 'action', 'valorisation', 'acquisition', 'résultats', 'chiffre']
-    }
-
     profile_names = {
         'audiovisuel': 'Audiovisuel',
         'cinema': 'Cinéma',
@@ -414,16 +638,17 @@ async def generate_newsletter(profile_id: str):
     }
 
     # Get news and filter by profile
-    news = load_data("news.json").get("data", [])
+    news = news_headlines()
 
     # Prioritize French articles
     french_news = [n for n in news if n.get('lang') == 'fr']
     if len(french_news) < 3:
         french_news = news  # Fallback to all news
 
-    keywords = profile_keywords.get(profile_id, [])
-    if keywords:
-        filtered = [n for n in french_news if any(kw in (n.get('title', '') + n.get('summary', '')).lower() for kw in keywords)]
+    if profile_id in PROFILE_KEYWORDS:
+        category = f"profile:{profile_id}"
+        filtered = [n for n in french_news
+                    if category in article_classifier.classify(n.get('title', '') + " " + n.get('summary', ''))]
         if len(filtered) >= 3:
             french_news = filtered
 
@@ -446,7 +671,7 @@ async def generate_newsletter(profile_id: str):
 async def chat(message: ChatMessage):
     # Get real data for context
     stocks = load_data("stocks.json").get("data", [])
-    news = load_data("news.json").get("data", [])[:5]
+    news = news_headlines(limit=5)
 
     responses = {
         "canal": "Canal+ a considérablement renforcé sa stratégie sportive avec l'acquisition des droits de la Premier League (2026-2029) pour environ 400M€/an.",
@@ -483,32 +708,32 @@ async def get_scheduler_status():
         })
     return {
         "running": scheduler.running,
-        "jobs": jobs
+        "worker": leader_lease.status(),
+        "jobs": jobs,
+        "pipeline": pipeline.status(),
+        "news_fetch": rss_cycle_stats
+    }
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters of the in-memory caches"""
+    return {
+        "datasets": cache.stats(),
+        "article_content": content_cache.stats(),
+        "responses": response_cache.stats()
     }
 
 
 @app.post("/api/scheduler/run/{job_id}")
 async def run_job_now(job_id: str):
-    """Manually trigger a scheduled job"""
-    job = scheduler.get_job(job_id)
-    if not job:
+    """Manually trigger a pipeline job and wait for it (its downstream jobs follow in the background)"""
+    if job_id not in pipeline.jobs:
         raise HTTPException(status_code=404, detail="Job not found")
-
-    # Run the job function directly
-    if job_id == "fetch_stocks":
-        from scheduler import task_fetch_stocks
-        await task_fetch_stocks()
-    elif job_id == "fetch_boxoffice":
-        from scheduler import task_fetch_boxoffice
-        await task_fetch_boxoffice()
-    elif job_id == "fetch_news":
-        from scheduler import task_fetch_news
-        await task_fetch_news()
-    elif job_id == "generate_alerts":
-        from scheduler import task_generate_alerts
-        await task_generate_alerts()
-
-    return {"status": "executed", "job": job_id}
+    if not leader_lease.is_leader:
+        raise HTTPException(status_code=409, detail=f"Jobs run on the scheduler leader (pid {leader_lease.leader_pid()})")
+    run = await pipeline.run(job_id)
+    return {"status": "executed", "job": job_id, "run": run}
 
 
 # ============================================
@@ -0,0 +1,236 @@
+"""
+Market analytics over the stored price history
+Daily closes of the watchlist are kept as one aligned NumPy matrix (days x tickers); returns,
+prefix sums, peaks and drawdowns are extended from the first changed day when samples arrive,
+and the API payloads are rebuilt then, so requests only return pre-encoded JSON
+"""
+
+from datetime import datetime
+from typing import List, Dict, Optional
+import math
+import threading
+
+import numpy as np
+
+from data_fetchers import MEDIA_STOCKS
+from persistence import encode_json
+from price_history import PriceHistory, price_history
+
+SECONDS_PER_DAY = 86400
+TRADING_DAYS = 252
+# Trailing windows in trading days
+RETURN_WINDOWS = {"1w": 5, "1m": 21, "3m": 63, "1y": 252}
+VOLATILITY_WINDOWS = {"1m": 21, "1y": 252}
+CORRELATION_WINDOW = 252
+
+
+def _clean(values: np.ndarray, digits: int = 4) -> list:
+    """JSON-safe (nested) list, rounded, NaN -> None"""
+    rounded = np.round(values, digits).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+
+class MarketAnalytics:
+    """Rolling returns, volatility, drawdowns, correlations and sector aggregates for a list of stocks"""
+    def __init__(self, history: PriceHistory, stocks: List[Dict]):
+        self.history = history
+        self.tickers = [stock["ticker"] for stock in stocks]
+        self.names = [stock.get("name", stock["ticker"]) for stock in stocks]
+        self.sector_names = sorted({stock.get("sector", "") for stock in stocks})
+        self.sector_codes = np.array([self.sector_names.index(stock.get("sector", "")) for stock in stocks])
+        n = len(self.tickers)
+        self.days = np.zeros(0, dtype=np.int64)          # day number (Unix days) of each row
+        self.raw = np.zeros((0, n))                      # last close of each day, NaN without a sample
+        self.closes = np.zeros((0, n))                   # raw closes carried forward
+        self.returns = np.zeros((0, n))                  # daily log returns, NaN before the first close
+        # Prefix sums over rows for O(1) window statistics: count, sum and sum of squares of returns
+        self.count_sum = np.zeros((1, n))
+        self.return_sum = np.zeros((1, n))
+        self.square_sum = np.zeros((1, n))
+        self.peaks = np.zeros((0, n))                    # running maximum close
+        self.max_drawdowns = np.zeros((0, n))            # running minimum of close / peak - 1
+        self.cursors: Dict[str, int] = {}                # ticker -> last sample timestamp consumed
+        self.payloads: Dict[str, bytes] = {}
+        self.updated_at: Optional[str] = None
+        self.lock = threading.Lock()
+
+    # ------------------------------------------
+    # INCREMENTAL UPDATE
+    # ------------------------------------------
+
+    def update(self) -> int:
+        """Fold samples recorded since the last update into the matrices; returns the number of new samples"""
+        with self.lock:
+            new_days, updates, consumed = [], [], 0
+            for col, ticker in enumerate(self.tickers):
+                cursor = self.cursors.get(ticker)
+                window = self.history.window(ticker, cursor + 1 if cursor is not None else None)
+                ts = window["ts"] if window is not None else ()
+                if not len(ts):
+                    continue
+                self.cursors[ticker] = int(ts[-1])
+                consumed += len(ts)
+                days = ts // SECONDS_PER_DAY
+                # Last sample of each day (samples are sorted by time)
+                last = np.r_[days[1:] != days[:-1], True]
+                updates.append((col, days[last], window["close"][last]))
+                new_days.append(days[last])
+            if not updates:
+                return 0
+
+            first_changed = self._insert_days(np.concatenate(new_days))
+            for col, days, closes in updates:
+                rows = np.searchsorted(self.days, days)
+                self.raw[rows, col] = closes
+                first_changed = min(first_changed, int(rows[0]))
+            self._recompute_from(first_changed)
+            self._build_payloads()
+            return consumed
+
+    def _insert_days(self, days: np.ndarray) -> int:
+        """Add rows for unseen days; returns the first row whose position changed"""
+        missing = np.setdiff1d(days, self.days)
+        if not len(missing):
+            return len(self.days)
+        n = len(self.tickers)
+        if not len(self.days) or missing[0] > self.days[-1]:
+            first = len(self.days)
+            self.days = np.concatenate([self.days, missing])
+            self.raw = np.vstack([self.raw, np.full((len(missing), n), np.nan)])
+            return first
+        # A backfill reached further into the past: re-align every row
+        all_days = np.union1d(self.days, missing)
+        raw = np.full((len(all_days), n), np.nan)
+        raw[np.searchsorted(all_days, self.days)] = self.raw
+        self.days, self.raw = all_days, raw
+        return int(np.searchsorted(all_days, missing[0]))
+
+    def _recompute_from(self, start: int):
+        """Rebuild derived rows from `start` on, seeded with the row before it"""
+        raw = self.raw[start:]
+        # Carry the last close forward over days a ticker did not trade
+        closes = raw.copy()
+        previous = self.closes[start - 1] if start > 0 else np.full(raw.shape[1], np.nan)
+        for i in range(len(closes)):
+            row = closes[i]
+            np.copyto(row, previous, where=np.isnan(row))
+            previous = row
+        self.closes = np.vstack([self.closes[:start], closes])
+
+        before = self.closes[start - 1:start] if start > 0 else np.full((1, raw.shape[1]), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(np.vstack([before, closes])), axis=0)
+        self.returns = np.vstack([self.returns[:start], returns])
+
+        valid = ~np.isnan(returns)
+        filled = np.where(valid, returns, 0.0)
+        self.count_sum = np.vstack([self.count_sum[:start + 1], self.count_sum[start] + np.cumsum(valid, axis=0)])
+        self.return_sum = np.vstack([self.return_sum[:start + 1], self.return_sum[start] + np.cumsum(filled, axis=0)])
+        self.square_sum = np.vstack([self.square_sum[:start + 1],
+                                     self.square_sum[start] + np.cumsum(filled * filled, axis=0)])
+
+        seed_peak = self.peaks[start - 1] if start > 0 else np.full(raw.shape[1], -np.inf)
+        peaks = np.fmax.accumulate(np.vstack([seed_peak, np.nan_to_num(closes, nan=-np.inf)]), axis=0)[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdowns = np.where(np.isfinite(peaks) & (peaks > 0), closes / peaks - 1, 0.0)
+        seed_dd = self.max_drawdowns[start - 1] if start > 0 else np.zeros(raw.shape[1])
+        max_drawdowns = np.minimum.accumulate(np.vstack([seed_dd, np.nan_to_num(drawdowns)]), axis=0)[1:]
+        self.peaks = np.vstack([self.peaks[:start], peaks])
+        self.max_drawdowns = np.vstack([self.max_drawdowns[:start], max_drawdowns])
+
+    # ------------------------------------------
+    # METRICS
+    # ------------------------------------------
+
+    def _window_returns(self, days: int) -> np.ndarray:
+        rows = len(self.closes)
+        if rows <= days:
+            return np.full(len(self.tickers), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.closes[-1] / self.closes[-1 - days] - 1
+
+    def _volatility(self, days: int) -> np.ndarray:
+        """Annualized standard deviation of daily log returns over the trailing window"""
+        end, start = len(self.returns), max(len(self.returns) - days, 0)
+        count = self.count_sum[end] - self.count_sum[start]
+        total = self.return_sum[end] - self.return_sum[start]
+        squares = self.square_sum[end] - self.square_sum[start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (squares - total * total / count) / (count - 1)
+        return np.where(count > 1, np.sqrt(np.maximum(variance, 0)) * math.sqrt(TRADING_DAYS), np.nan)
+
+    def _correlation(self) -> np.ndarray:
+        """Pearson correlation of daily returns over the trailing window (pairwise over available days)"""
+        window = self.returns[-CORRELATION_WINDOW:]
+        valid = ~np.isnan(window)
+        counts = valid.sum(axis=0)
+        means = np.where(counts > 0, np.nansum(window, axis=0) / np.maximum(counts, 1), 0.0)
+        centered = np.where(valid, window - means, 0.0)
+        covariance = centered.T @ centered
+        scale = np.sqrt(np.diag(covariance))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = covariance / np.outer(scale, scale)
+        correlation[~np.isfinite(correlation)] = np.nan
+        return np.clip(correlation, -1.0, 1.0)
+
+    def _build_payloads(self):
+        self.updated_at = datetime.now().isoformat()
+        has_data = ~np.isnan(self.closes[-1])
+        last_close = self.closes[-1]
+        drawdown = np.where(has_data, last_close / self.peaks[-1] - 1, np.nan)
+        returns = {label: self._window_returns(days) for label, days in RETURN_WINDOWS.items()}
+        volatility = {label: self._volatility(days) for label, days in VOLATILITY_WINDOWS.items()}
+        max_drawdown = np.where(has_data, self.max_drawdowns[-1], np.nan)
+
+        columns = {
+            "close": _clean(last_close),
+            "drawdown": _clean(drawdown),
+            "max_drawdown": _clean(max_drawdown),
+            **{f"return_{label}": _clean(values) for label, values in returns.items()},
+            **{f"volatility_{label}": _clean(values) for label, values in volatility.items()},
+        }
+        stocks = [
+            {"ticker": ticker, "name": name, "sector": self.sector_names[code],
+             **{key: values[i] for key, values in columns.items()}}
+            for i, (ticker, name, code) in enumerate(zip(self.tickers, self.names, self.sector_codes))
+        ]
+
+        # Equal-weighted sector aggregates over tickers with data
+        sectors = []
+        for code, sector in enumerate(self.sector_names):
+            members = (self.sector_codes == code) & has_data
+            if not members.any():
+                continue
+            sectors.append({
+                "sector": sector,
+                "tickers": [t for t, m in zip(self.tickers, members) if m],
+                **{f"return_{label}": _mean(values[members]) for label, values in returns.items()},
+                **{f"volatility_{label}": _mean(values[members]) for label, values in volatility.items()},
+                "max_drawdown": _mean(max_drawdown[members]),
+            })
+
+        as_of = str(np.datetime64(int(self.days[-1]), "D"))
+        self.payloads["summary"] = encode_json({
+            "as_of": as_of, "days": len(self.days), "stocks": stocks, "sectors": sectors,
+            "updated_at": self.updated_at,
+        })
+        self.payloads["correlation"] = encode_json({
+            "as_of": as_of, "window": CORRELATION_WINDOW, "tickers": self.tickers,
+            "matrix": _clean(self._correlation(), 3),
+            "updated_at": self.updated_at,
+        })
+
+    def payload(self, name: str) -> bytes:
+        """Pre-encoded JSON for "summary" or "correlation" (empty until the first samples arrive)"""
+        empty = {"stocks": [], "sectors": []} if name == "summary" else {"tickers": [], "matrix": []}
+        return self.payloads.get(name) or encode_json({**empty, "as_of": None, "updated_at": None})
+
+
+def _mean(values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return round(float(values.mean()), 4) if len(values) else None
+
+
+# Global instance over the watchlist
+market_analytics = MarketAnalytics(price_history, MEDIA_STOCKS)
@@ -0,0 +1,85 @@
+"""
+Atomic, non-blocking persistence for dataset snapshots
+Writes go to a temp file, are fsynced, then renamed over the target
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_json(payload: Any) -> bytes:
+    """Compact JSON encoding (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def write_atomic(filepath: str, raw: bytes):
+    """Write bytes so that readers see either the old file or the new one, never a partial write"""
+    directory = os.path.dirname(filepath) or "."
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Persist the rename itself
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def read_json_file(filepath: str) -> Any:
+    with open(filepath, "rb") as f:
+        return decode_json(f.read())
+
+
+def file_signature(filepath: str) -> Optional[Tuple[int, int]]:
+    """(mtime, size) of a file, None when missing: tells a reader whether another process changed it"""
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DatasetWriter:
+    """Serializes writes per file off the event loop, dropping writes older than the last one persisted"""
+    def __init__(self):
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.written: Dict[str, int] = {}
+
+    async def write(self, filepath: str, payload: Dict, generation: int) -> bool:
+        """Encode and atomically write payload; returns False if a newer generation was already written"""
+        lock = self.locks.setdefault(filepath, asyncio.Lock())
+        async with lock:
+            if self.written.get(filepath, -1) >= generation:
+                return False
+            raw = await asyncio.to_thread(encode_json, payload)
+            await asyncio.to_thread(write_atomic, filepath, raw)
+            self.written[filepath] = generation
+            return True
+
+
+dataset_writer = DatasetWriter()
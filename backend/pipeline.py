@@ -0,0 +1,155 @@
+"""
+Dependency-aware job runner on top of APScheduler
+Jobs declare their upstreams; a job that reports new data triggers its downstream jobs.
+A trigger that arrives while a job runs collapses into a single follow-up run, so runs never overlap
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+import asyncio
+import time
+
+# Runs kept per job for /api/scheduler/status
+HISTORY_SIZE = 20
+
+# A job returns a truthy value when it produced new data for its downstream jobs
+JobFunc = Callable[[], Awaitable[object]]
+
+
+class PipelineJob:
+    def __init__(self, job_id: str, name: str, func: JobFunc, upstreams: Sequence[str] = (),
+                 min_interval: float = 0):
+        self.id = job_id
+        self.name = name
+        self.func = func
+        self.upstreams = tuple(upstreams)
+        self.downstreams: List[str] = []
+        self.min_interval = min_interval  # scheduled triggers this soon after the last start are dropped
+        self.task: Optional[asyncio.Task] = None
+        self.pending: Optional[str] = None  # reason of the collapsed follow-up run, if any
+        self.last_started = 0.0
+        self.history: Deque[Dict] = deque(maxlen=HISTORY_SIZE)
+        self.runs = 0
+        self.failures = 0
+        self.collapsed = 0
+        self.skipped = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def status(self) -> Dict:
+        durations = [run["duration_ms"] for run in self.history]
+        return {
+            "id": self.id,
+            "name": self.name,
+            "upstreams": list(self.upstreams),
+            "downstreams": self.downstreams,
+            "running": self.running,
+            "pending": self.pending is not None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "collapsed_triggers": self.collapsed,
+            "skipped_triggers": self.skipped,
+            "avg_duration_ms": round(sum(durations) / len(durations), 1) if durations else None,
+            "last_run": self.history[-1] if self.history else None,
+            "history": list(self.history),
+        }
+
+
+class Pipeline:
+    """Job graph; APScheduler triggers and manual runs all go through trigger()"""
+    def __init__(self):
+        self.jobs: Dict[str, PipelineJob] = {}
+        self.stopped = False
+
+    def job(self, job_id: str, name: str, func: JobFunc, upstreams: Sequence[str] = (),
+            min_interval: float = 0) -> PipelineJob:
+        for upstream in upstreams:
+            if upstream not in self.jobs:
+                raise ValueError(f"Unknown upstream job {upstream} for {job_id}")
+        job = self.jobs[job_id] = PipelineJob(job_id, name, func, upstreams, min_interval)
+        for upstream in upstreams:
+            self.jobs[upstream].downstreams.append(job_id)
+        return job
+
+    def trigger(self, job_id: str, reason: str = "manual") -> Optional[asyncio.Task]:
+        """Start a job, or queue one follow-up run if it is already running; returns the run's task"""
+        job = self.jobs[job_id]
+        if self.stopped:
+            return None
+        if reason == "schedule" and time.monotonic() - job.last_started < job.min_interval:
+            job.skipped += 1
+            return None
+        if job.running:
+            if job.pending is not None:
+                job.collapsed += 1
+            job.pending = job.pending or reason
+            return job.task
+        job.task = asyncio.create_task(self._run(job, reason))
+        return job.task
+
+    async def scheduled(self, job_id: str):
+        """APScheduler entry point"""
+        self.trigger(job_id, "schedule")
+
+    async def run(self, job_id: str, reason: str = "manual") -> Optional[Dict]:
+        """Trigger a job and wait for it (and any follow-up run) to finish; returns its last run record"""
+        task = self.trigger(job_id, reason)
+        job = self.jobs[job_id]
+        if task is not None:
+            # Follow-up runs happen inside the same task
+            await asyncio.shield(task)
+        return job.history[-1] if job.history else None
+
+    async def wait_idle(self):
+        """Wait until no job is running (downstream runs included)"""
+        while True:
+            tasks = [job.task for job in self.jobs.values() if job.running]
+            if not tasks:
+                return
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def stop(self):
+        """Refuse new runs, cancel the running ones and wait for them to unwind (shutdown)"""
+        self.stopped = True
+        tasks = [job.task for job in self.jobs.values() if job.running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: PipelineJob, reason: str):
+        while True:
+            job.last_started = time.monotonic()
+            started_at = datetime.now().isoformat()
+            outcome, produced, error = "success", False, None
+            try:
+                produced = bool(await job.func())
+                if not produced:
+                    outcome = "no_change"
+            except Exception as e:
+                outcome, error = "error", str(e)
+                job.failures += 1
+                print(f"[{datetime.now()}] Job {job.id} failed: {e}")
+            job.runs += 1
+            job.history.append({
+                "started_at": started_at,
+                "duration_ms": round((time.monotonic() - job.last_started) * 1000, 1),
+                "outcome": outcome,
+                "trigger": reason,
+                **({"error": error} if error else {}),
+            })
+            if produced:
+                for downstream in job.downstreams:
+                    self.trigger(downstream, f"upstream:{job.id}")
+            if job.pending is None:
+                return
+            reason, job.pending = job.pending, None
+
+    def status(self) -> List[Dict]:
+        return [job.status() for job in self.jobs.values()]
+
+
+# Global pipeline instance
+pipeline = Pipeline()
@@ -0,0 +1,282 @@
+"""
+Historical stock prices: append-only columnar time series per ticker
+Each ticker has one file per column (timestamps + OHLCV), memory-mapped for reads,
+with server-side downsampling (OHLC buckets, LTTB) for charting long ranges
+"""
+
+from typing import List, Dict, Optional, Tuple
+import os
+import re
+import threading
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Column name -> dtype; "ts" is the sample time in Unix seconds, strictly increasing
+COLUMNS = {
+    "ts": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,  # NaN for quote samples (Yahoo only reports the cumulative day volume)
+}
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# Default number of points returned by the history endpoint
+DEFAULT_POINTS = 500
+
+
+# ============================================
+# DOWNSAMPLING
+# ============================================
+
+def ohlc_buckets(series: Dict[str, np.ndarray], buckets: int) -> Dict[str, np.ndarray]:
+    """Aggregate samples into equal-time OHLC buckets (empty buckets are dropped)"""
+    ts = series["ts"]
+    if len(ts) <= buckets:
+        return series
+    edges = np.linspace(ts[0], ts[-1] + 1, buckets + 1)
+    bucket_ids = np.searchsorted(edges, ts, side="right") - 1
+    # Samples are sorted by time, so each bucket is a contiguous run
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    volume = series["volume"]
+    volume_sums = np.add.reduceat(np.nan_to_num(volume), starts)
+    has_volume = np.add.reduceat(~np.isnan(volume), starts) > 0
+    return {
+        "ts": ts[starts],
+        "open": series["open"][starts],
+        "high": np.fmax.reduceat(series["high"], starts),
+        "low": np.fmin.reduceat(series["low"], starts),
+        "close": series["close"][ends],
+        "volume": np.where(has_volume, volume_sums, np.nan),
+    }
+
+
+def _value(v) -> Optional[float]:
+    """JSON-safe sample value: missing values are stored as NaN, which JSON cannot carry"""
+    return None if np.isnan(v) else float(v)
+
+
+def lttb(ts: np.ndarray, values: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape"""
+    n = len(ts)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = ts.astype(np.float64)
+    y = values.astype(np.float64)
+    # Interior points split into threshold - 2 buckets; first and last points are always kept
+    edges = (np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Third vertex: average of the next bucket (the last point for the final bucket)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+# ============================================
+# SERIES
+# ============================================
+
+class TickerSeries:
+    """Column files for one ticker, appended to and re-mapped as samples arrive"""
+    def __init__(self, directory: str, read_only: bool = False):
+        self.directory = directory
+        self.paths = {name: os.path.join(directory, f"{name}.bin") for name in COLUMNS}
+        self.columns: Dict[str, np.ndarray] = {}
+        os.makedirs(directory, exist_ok=True)
+        count = self._stored_rows()
+        # A crash between column appends leaves some files longer than others (on a follower
+        # worker, the leader may simply be between two appends)
+        if not read_only:
+            for name, path in self.paths.items():
+                if os.path.exists(path) and os.path.getsize(path) > count * np.dtype(COLUMNS[name]).itemsize:
+                    os.truncate(path, count * np.dtype(COLUMNS[name]).itemsize)
+        self._map(count)
+
+    def __len__(self):
+        return len(self.columns["ts"])
+
+    def _stored_rows(self) -> int:
+        """Rows present in every column file"""
+        return min(os.path.getsize(p) // np.dtype(COLUMNS[n]).itemsize if os.path.exists(p) else 0
+                   for n, p in self.paths.items())
+
+    def refresh(self) -> int:
+        """Map rows another process appended; returns how many"""
+        count = self._stored_rows()
+        if count <= len(self):
+            return 0
+        added = count - len(self)
+        self._map(count)
+        return added
+
+    def _map(self, count: int):
+        self.columns = {
+            name: np.memmap(path, dtype=COLUMNS[name], mode="r", shape=(count,)) if count
+            else np.zeros(0, dtype=COLUMNS[name])
+            for name, path in self.paths.items()
+        }
+
+    def last_timestamp(self) -> Optional[int]:
+        ts = self.columns["ts"]
+        return int(ts[-1]) if len(ts) else None
+
+    def append(self, rows: Dict[str, np.ndarray]) -> int:
+        """Append rows newer than the last stored sample; returns how many were written"""
+        ts = np.asarray(rows["ts"], dtype=np.int64)
+        last = self.last_timestamp()
+        keep = np.ones(len(ts), dtype=bool) if last is None else ts > last
+        # Within the batch, keep strictly increasing timestamps only
+        keep &= np.r_[True, ts[1:] > np.maximum.accumulate(ts)[:-1]]
+        if not keep.any():
+            return 0
+        for name, path in self.paths.items():
+            column = np.asarray(rows[name], dtype=COLUMNS[name])[keep]
+            with open(path, "ab") as f:
+                f.write(column.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        self._map(len(self) + int(keep.sum()))
+        return int(keep.sum())
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Samples with start <= ts <= end (binary search on the sorted timestamps)"""
+        columns = self.columns
+        ts = columns["ts"]
+        lo = int(np.searchsorted(ts, start, side="left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, side="right")) if end is not None else len(ts)
+        return {name: np.asarray(column[lo:hi]) for name, column in columns.items()}
+
+
+# ============================================
+# STORE
+# ============================================
+
+class PriceHistory:
+    """Per-ticker time series under one directory"""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.series: Dict[str, TickerSeries] = {}
+        self.lock = threading.Lock()
+        self.read_only = False  # set on follower workers, which only map what the leader writes
+        self.load_lock = threading.Lock()
+        self.loaded = False
+
+    @staticmethod
+    def _dirname(ticker: str) -> str:
+        return re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+
+    def load(self):
+        """Map every ticker's series
+        Blocking, once: concurrent callers wait for the first one (keep it off the event loop)"""
+        if self.loaded:
+            return
+        with self.load_lock:
+            if not self.loaded:
+                self._load()
+                self.loaded = True
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                self.series[name] = TickerSeries(path, self.read_only)
+        print(f"Price history: {len(self.series)} tickers, {sum(len(s) for s in self.series.values())} samples")
+
+    def refresh(self) -> int:
+        """Map the tickers and samples another process (the scheduler leader) added; returns the new samples"""
+        self.load()
+        added = 0
+        with self.lock:
+            for name in sorted(os.listdir(self.directory)):
+                path = os.path.join(self.directory, name)
+                if os.path.isdir(path) and name not in self.series:
+                    self.series[name] = TickerSeries(path, self.read_only)
+                    added += len(self.series[name])
+            for series in self.series.values():
+                added += series.refresh()
+        return added
+
+    def _get(self, ticker: str, create: bool = False) -> Optional[TickerSeries]:
+        self.load()
+        name = self._dirname(ticker)
+        series = self.series.get(name)
+        if series is None and create:
+            series = self.series[name] = TickerSeries(os.path.join(self.directory, name))
+        return series
+
+    def last_timestamp(self, ticker: str) -> Optional[int]:
+        series = self._get(ticker)
+        return series.last_timestamp() if series is not None else None
+
+    def append_bars(self, ticker: str, bars: Dict[str, List]) -> int:
+        """Append chart bars ({"ts": [...], "open": [...], ...}); bars without a close are skipped"""
+        close = np.array([np.nan if v is None else v for v in bars.get("close", ())], dtype=np.float64)
+        if not len(close):
+            return 0
+        rows = {"ts": np.asarray(bars["ts"], dtype=np.int64)[:len(close)]}
+        for name in PRICE_COLUMNS:
+            values = bars.get(name) or [None] * len(close)
+            rows[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        valid = ~np.isnan(close)
+        with self.lock:
+            return self._get(ticker, create=True).append({name: column[valid] for name, column in rows.items()})
+
+    def record_quotes(self, quotes: List[Dict]) -> int:
+        """Append one sample per quote carrying a market time; returns how many were new"""
+        added = 0
+        for quote in quotes:
+            market_time, price = quote.get("marketTime"), quote.get("price")
+            if not market_time or not price:
+                continue
+            added += self.append_bars(quote["ticker"], {
+                "ts": [market_time], "open": [price], "high": [price], "low": [price], "close": [price],
+            })
+        return added
+
+    def window(self, ticker: str, start: Optional[int] = None, end: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Raw columns of a ticker between start and end, None for an unknown ticker"""
+        series = self._get(ticker)
+        return series.window(start, end) if series is not None else None
+
+    def history(self, ticker: str, start: Optional[int] = None, end: Optional[int] = None,
+                points: int = DEFAULT_POINTS, method: str = "ohlc") -> Optional[Dict]:
+        """Samples of a ticker between start and end, downsampled to at most `points` entries"""
+        window = self.window(ticker, start, end)
+        if window is None:
+            return None
+        total = len(window["ts"])
+        if method == "lttb":
+            picked = lttb(window["ts"], window["close"], points)
+            rows = [{"t": int(window["ts"][i]), "close": float(window["close"][i])} for i in picked]
+        else:
+            buckets = ohlc_buckets(window, points)
+            rows = [
+                {"t": int(t), "open": _value(o), "high": _value(h), "low": _value(l), "close": float(c),
+                 "volume": _value(v)}
+                for t, o, h, l, c, v in zip(*(buckets[name] for name in COLUMNS))
+            ]
+        return {"ticker": ticker, "method": method, "total_samples": total, "points": rows}
+
+    def stats(self) -> Dict:
+        self.load()
+        return {
+            "tickers": len(self.series),
+            "samples": sum(len(s) for s in self.series.values()),
+        }
+
+
+# Global store instance
+price_history = PriceHistory(os.path.join(DATA_DIR, "price_history"))
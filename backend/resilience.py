@@ -0,0 +1,209 @@
+"""
+Resilience for upstream calls: per-host circuit breakers, timeouts derived from observed latency,
+and jittered retries drawn from a global retry budget
+A host that keeps failing is skipped outright until a probe succeeds, instead of costing a full
+timeout on every refresh cycle
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import random
+import time
+
+import httpx
+
+# Consecutive failures that open a host's breaker
+FAILURE_THRESHOLD = 5
+# Seconds an open breaker rejects calls; doubles each time a probe fails, up to the maximum
+OPEN_SECONDS = 30
+MAX_OPEN_SECONDS = 600
+# Latencies of successful calls kept per host; the timeout is TIMEOUT_MULTIPLIER x their p95, within
+# [MIN_TIMEOUT, the caller's timeout], once MIN_SAMPLES were observed. Probes of an open breaker get
+# the caller's timeout, so a host that became slower for good is re-measured and not cut off forever
+LATENCY_SAMPLES = 50
+MIN_SAMPLES = 5
+TIMEOUT_MULTIPLIER = 3.0
+MIN_TIMEOUT = 2.0
+# Retries per call, with full-jitter exponential backoff from RETRY_BASE_DELAY seconds
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.5
+# Every call earns RETRY_RATIO of a retry, up to RETRY_BUDGET_MAX retries saved up
+RETRY_RATIO = 0.2
+RETRY_BUDGET_MAX = 10.0
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised without calling the host while its breaker is open"""
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HostGuard:
+    """Breaker state and latency samples of one upstream host"""
+    def __init__(self, host: str, upstreams: "Upstreams"):
+        self.host = host
+        self.upstreams = upstreams
+        self.state = "closed"  # closed -> open (failing) -> half_open (one probe) -> closed
+        self.consecutive_failures = 0
+        self.open_seconds = upstreams.open_seconds
+        self.open_until = 0.0
+        self.probing = False
+        self.latencies: Deque[float] = deque(maxlen=upstreams.latency_samples)
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def timeout(self, ceiling: float) -> float:
+        """Attempt timeout: a multiple of the observed p95 latency, never above the caller's timeout"""
+        if len(self.latencies) < self.upstreams.min_samples:
+            return ceiling
+        p95 = _percentile(self.latencies, 0.95)
+        return min(ceiling, max(self.upstreams.min_timeout, self.upstreams.timeout_multiplier * p95))
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (an open breaker lets one probe through once it cools down)"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() >= self.open_until:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            print(f"[{datetime.now()}] Circuit closed for {self.host}")
+        self.state, self.probing = "closed", False
+        self.open_seconds = self.upstreams.open_seconds
+
+    def record_failure(self, error: str):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == "half_open":
+            # The probe failed: stay open, for longer
+            self.open_seconds = min(self.open_seconds * 2, self.upstreams.max_open_seconds)
+            self._open()
+        elif self.state == "closed" and self.consecutive_failures >= self.upstreams.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state, self.probing = "open", False
+        # Jittered, so hosts that failed together are not probed together
+        self.open_until = time.monotonic() + self.open_seconds * random.uniform(0.9, 1.1)
+        print(f"[{datetime.now()}] Circuit open for {self.host} ({self.consecutive_failures} failures, "
+              f"retry in {self.open_seconds}s): {self.last_error}")
+
+    def stats(self) -> Dict:
+        p50, p95 = _percentile(self.latencies, 0.5), _percentile(self.latencies, 0.95)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_s": round(max(self.open_until - time.monotonic(), 0), 1) if self.state == "open" else None,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class Upstreams:
+    """Host guards plus the retry budget shared by every host"""
+    def __init__(self):
+        self.failure_threshold = FAILURE_THRESHOLD
+        self.open_seconds = OPEN_SECONDS
+        self.max_open_seconds = MAX_OPEN_SECONDS
+        self.latency_samples = LATENCY_SAMPLES
+        self.min_samples = MIN_SAMPLES
+        self.timeout_multiplier = TIMEOUT_MULTIPLIER
+        self.min_timeout = MIN_TIMEOUT
+        self.max_retries = MAX_RETRIES
+        self.retry_base_delay = RETRY_BASE_DELAY
+        self.retry_ratio = RETRY_RATIO
+        self.retry_budget_max = RETRY_BUDGET_MAX
+        self.retry_tokens = RETRY_BUDGET_MAX
+        self.retries = 0
+        self.retries_denied = 0
+        self.hosts: Dict[str, HostGuard] = {}
+
+    def guard(self, host: str) -> HostGuard:
+        if host not in self.hosts:
+            self.hosts[host] = HostGuard(host, self)
+        return self.hosts[host]
+
+    def _take_retry(self) -> bool:
+        if self.retry_tokens >= 1:
+            self.retry_tokens -= 1
+            self.retries += 1
+            return True
+        self.retries_denied += 1
+        return False
+
+    async def call(self, host: str, send: Callable[[float], Awaitable[httpx.Response]],
+                   timeout: float) -> httpx.Response:
+        """Run send(attempt_timeout) under the host's breaker, retrying transport errors, timeouts,
+        429 and 5xx while the budget allows; the last response (even an error status) is returned"""
+        guard = self.guard(host)
+        if not guard.allow():
+            guard.rejected += 1
+            raise CircuitOpenError(f"circuit open for {host} ({guard.last_error})")
+        self.retry_tokens = min(self.retry_tokens + self.retry_ratio, self.retry_budget_max)
+        attempt = 0
+        while True:
+            guard.calls += 1
+            attempt_timeout = timeout if guard.state == "half_open" else guard.timeout(timeout)
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(send(attempt_timeout), attempt_timeout)
+            except (asyncio.TimeoutError, httpx.TimeoutException):
+                response, failure = None, httpx.TimeoutException(f"{host}: timeout after {attempt_timeout:.1f}s")
+                guard.record_failure(str(failure))
+            except httpx.TransportError as e:
+                response, failure = None, e
+                guard.record_failure(f"{type(e).__name__}: {e}")
+            except BaseException:
+                # Cancelled or not an upstream failure: do not leave a half-open breaker waiting on this probe
+                guard.probing = False
+                raise
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    guard.record_success(time.monotonic() - started)
+                    return response
+                failure = None
+                guard.record_failure(f"HTTP {response.status_code}")
+
+            if attempt >= self.max_retries or not guard.allow() or not self._take_retry():
+                if response is not None:
+                    return response
+                raise failure
+            if response is not None:
+                await response.aclose()  # discarded (a streamed body would keep its connection)
+            attempt += 1
+            await asyncio.sleep(random.uniform(0, self.retry_base_delay * 2 ** attempt))
+
+    def stats(self) -> Dict:
+        return {
+            "retry_budget": {
+                "tokens": round(self.retry_tokens, 2),
+                "retries": self.retries,
+                "denied": self.retries_denied,
+            },
+            "hosts": {host: guard.stats() for host, guard in sorted(self.hosts.items())},
+        }
+
+
+# Global instance shared by every fetcher
+upstreams = Upstreams()
@@ -0,0 +1,212 @@
+"""
+HTTP response cache for the dataset routes
+The encoded body of a GET is kept per URL together with the generation of the dataset it was built
+from, compressed once (gzip, and brotli when installed) and served with a strong ETag until the
+generation changes or the dataset's TTL runs out; each encoding gets its own strong ETag, and
+If-None-Match is answered with 304 from the cache, without running the handler
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import gzip
+import hashlib
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Cached URLs (path + query string), least recently used evicted first
+MAX_ENTRIES = 256
+# Bodies smaller than this are sent as they are
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class CachedRoute:
+    """How to tell whether a cached response of a route is still current
+    generation(): changes whenever the data behind the route changes (snapshot generation, updated_at...)
+    updated_at(): ISO time of the data, so Cache-Control only covers what is left of the TTL"""
+    def __init__(self, ttl: int, generation: Callable[[], Any], updated_at: Optional[Callable[[], Optional[str]]] = None):
+        self.ttl = ttl
+        self.generation = generation
+        self.updated_at = updated_at
+
+    def max_age(self) -> int:
+        updated_at = self.updated_at() if self.updated_at else None
+        if not updated_at:
+            return self.ttl
+        try:
+            age = (datetime.now() - datetime.fromisoformat(updated_at)).total_seconds()
+        except ValueError:
+            return 0
+        return int(min(max(self.ttl - age, 0), self.ttl))
+
+
+# ETag suffix of each representation: a strong ETag is specific to one encoding of the body
+ETAG_SUFFIXES = {b"identity": b"", b"gzip": b"-gz", b"br": b"-br"}
+
+
+class CachedResponse:
+    """One encoded body and its compressed variants, each with its own ETag"""
+    def __init__(self, generation: Any, ttl: int, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.generation = generation
+        self.expires = time.monotonic() + ttl
+        self.status = status
+        self.headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"etag", b"cache-control", b"vary")]
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest().encode()
+        self.bodies = {b"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.bodies[b"gzip"] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies[b"br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        self.etags = {coding: b'"' + digest + ETAG_SUFFIXES[coding] + b'"' for coding in self.bodies}
+
+
+def _header(scope: Dict, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return b""
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*" or candidate.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+def _accepted(accept_encoding: bytes) -> set:
+    """Codings the client accepts (q=0 means refused)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(b","):
+        coding, _, params = part.strip().partition(b";")
+        if params.replace(b" ", b"") not in (b"q=0", b"q=0.0", b"q=0.00", b"q=0.000"):
+            accepted.add(coding.strip())
+    return accepted
+
+
+class ResponseCache:
+    """Registered routes and their cached responses"""
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.routes: Dict[str, CachedRoute] = {}
+        self.prefixes: List[Tuple[str, CachedRoute]] = []
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+
+    def route(self, path: str, ttl: int, generation: Callable[[], Any],
+              updated_at: Optional[Callable[[], Optional[str]]] = None, prefix: bool = False):
+        """Cache GETs of `path` (or of every path under it with prefix=True)"""
+        route = CachedRoute(ttl, generation, updated_at)
+        if prefix:
+            self.prefixes.append((path, route))
+        else:
+            self.routes[path] = route
+
+    def match(self, path: str) -> Optional[CachedRoute]:
+        route = self.routes.get(path)
+        if route is None:
+            route = next((route for prefix, route in self.prefixes if path.startswith(prefix)), None)
+        return route
+
+    def get(self, key: str, generation: Any) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None or entry.generation != generation or time.monotonic() >= entry.expires:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+            "bytes_uncompressed": self.bytes_uncompressed,
+            "brotli": brotli is not None,
+        }
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware answering the GETs of the cache's routes from it"""
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        route = self.cache.match(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if route is None:
+            return await self.app(scope, receive, send)
+
+        key = scope["path"] + "?" + scope["query_string"].decode("latin-1")
+        # Read before the handler runs: a change meanwhile makes the stored entry stale, never wrong
+        generation = route.generation()
+        entry = self.cache.get(key, generation)
+        if entry is not None:
+            return await self._send(scope, send, route, entry)
+
+        start, body = {}, []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        content_type = dict(start.get("headers", [])).get(b"content-type", b"")
+        if start["status"] != 200 or not content_type.startswith(b"application/json"):
+            await send(start)
+            await send({"type": "http.response.body", "body": b"".join(body)})
+            return
+        entry = CachedResponse(generation, route.ttl, start["status"], start.get("headers", []), b"".join(body))
+        self.cache.put(key, entry)
+        await self._send(scope, send, route, entry)
+
+    async def _send(self, scope, send, route: CachedRoute, entry: CachedResponse):
+        cache = self.cache
+        accepted = _accepted(_header(scope, b"accept-encoding"))
+        coding = next((c for c in (b"br", b"gzip") if c in entry.bodies and c in accepted), b"identity")
+        headers = [
+            (b"etag", entry.etags[coding]),
+            (b"cache-control", f"public, max-age={route.max_age()}".encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        # Validated against the representation this request would get
+        if _etag_matches(_header(scope, b"if-none-match"), entry.etags[coding]):
+            cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.bodies[coding]
+        if coding != b"identity":
+            headers.append((b"content-encoding", coding))
+        headers.append((b"content-length", str(len(body)).encode()))
+        cache.bytes_sent += len(body)
+        cache.bytes_uncompressed += len(entry.bodies[b"identity"])
+        await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers + headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global cache instance (routes are registered in main.py)
+response_cache = ResponseCache()
@@ -4,121 +4,259 @@ Runs periodic data fetching using APScheduler
 """
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.combining import OrTrigger
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
-import json
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+import asyncio
 import os
+import time
 
 from data_fetchers import (
     fetch_cnc_boxoffice,
     fetch_all_stocks,
+    fetch_stock_bars,
     fetch_all_news,
+    prewarm_article_content,
+    refresh_cached,
+    content_cache,
     cache
 )
+from alerts import alert_log
+from article_store import article_store
+from boxoffice_analytics import boxoffice_analytics
+from boxoffice_store import boxoffice_table
+from event_bus import ARTICLES_INGESTED, event_bus
+from leader import leader_lease
+from persistence import dataset_writer, file_signature, read_json_file
+from pipeline import pipeline
+from lexical_index import lexical_index
+from price_history import price_history
+from market_analytics import market_analytics
+from streaming import alert_channel, price_channel
+from vector_index import article_document, vector_index
 
 # Data storage path
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Articles ingested but not yet added to the archive search indexes
+_unindexed_articles: list = []
 
-def save_data(filename: str, data: dict):
-    """Save data to JSON file"""
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump({
-            "data": data,
-            "updated_at": datetime.now().isoformat()
-        }, f, ensure_ascii=False, indent=2)
-    print(f"[{datetime.now()}] Saved {filename}")
+# Datasets written by the scheduled tasks
+SNAPSHOT_FILES = ("stocks.json", "boxoffice.json", "alerts.json")
+
+# Price history older than this is backfilled from daily chart bars
+BACKFILL_AFTER = 86400
+# Smallest Yahoo chart range covering a gap (seconds); None covers everything
+BACKFILL_RANGES = ((5 * 86400, "5d"), (30 * 86400, "1mo"), (365 * 86400, "1y"), (None, "10y"))
+# Minimum delay between two backfill attempts for a ticker (weekends and holidays add no bars)
+BACKFILL_RETRY = 6 * 3600
+_backfill_attempts: Dict[str, float] = {}
+
+
+# ============================================
+# IN-MEMORY SNAPSHOTS
+# ============================================
+
+# filename -> read-only {"data", "updated_at", "generation"}; replaced wholesale on each save
+_snapshots: Dict[str, MappingProxyType] = {}
+# filename -> file signature when last read (follower workers reload a file once the leader replaced it)
+_snapshot_signatures: Dict[str, Optional[tuple]] = {}
+
+
+def _freeze(data):
+    """Read-only view of a dataset (lists become tuples)"""
+    return tuple(data) if isinstance(data, list) else data
 
 
-def load_data(filename: str) -> dict:
-    """Load data from JSON file"""
+def _read_snapshot_file(filename: str) -> dict:
+    """Load a dataset from disk (warm start, and follower workers picking up the leader's writes)"""
     filepath = os.path.join(DATA_DIR, filename)
+    _snapshot_signatures[filename] = file_signature(filepath)
     if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+        try:
+            return read_json_file(filepath)
+        except ValueError as e:
+            print(f"[{datetime.now()}] Could not read {filename}: {e}")
     return {"data": [], "updated_at": None}
 
 
+def _snapshot_from(stored: dict) -> MappingProxyType:
+    return MappingProxyType({
+        "data": _freeze(stored.get("data", [])),
+        "updated_at": stored.get("updated_at"),
+        "generation": stored.get("generation", 0),
+    })
+
+
+async def save_data(filename: str, data: dict):
+    """Publish a new snapshot of a dataset, then persist it atomically off the event loop"""
+    previous = load_data(filename)
+    snapshot = MappingProxyType({
+        "data": _freeze(data),
+        "updated_at": datetime.now().isoformat(),
+        "generation": previous["generation"] + 1,
+    })
+    _snapshots[filename] = snapshot
+
+    filepath = os.path.join(DATA_DIR, filename)
+    if await dataset_writer.write(filepath, dict(snapshot), snapshot["generation"]):
+        print(f"[{datetime.now()}] Saved {filename} (generation {snapshot['generation']})")
+
+
+def load_data(filename: str) -> Mapping:
+    """Current snapshot of a dataset; read from disk only the first time it is requested"""
+    snapshot = _snapshots.get(filename)
+    if snapshot is None:
+        snapshot = _snapshots.setdefault(filename, _snapshot_from(_read_snapshot_file(filename)))
+    return snapshot
+
+
+def warm_snapshots():
+    """Load the persisted JSON datasets into memory so requests never touch the disk (cheap: served at once)"""
+    for filename in SNAPSHOT_FILES:
+        load_data(filename)
+    price_channel.seed(load_data("stocks.json")["data"])
+    alert_log.seed(load_data("alerts.json")["data"])
+    alert_channel.seed(reversed(alert_log.latest()))
+
+
+def load_stores(read_only: bool = False):
+    """Load the article store, search indexes, price history and box office table (blocking; run in a thread at startup)
+    read_only: follower worker, nothing on disk is repaired or written"""
+    for store in (article_store, vector_index, lexical_index, price_history):
+        store.read_only = read_only
+    article_store.load()
+    vector_index.load()
+    lexical_index.load()
+    price_history.load()
+    market_analytics.update()
+    boxoffice_table.load()
+    boxoffice_analytics.update()
+
+
 # ============================================
 # SCHEDULED TASKS
 # ============================================
 
-async def task_fetch_stocks():
-    """Fetch stock prices every 15 minutes during market hours"""
+async def task_fetch_stocks() -> bool:
+    """Fetch stock prices (every 15 minutes during market hours, hourly otherwise)"""
     print(f"[{datetime.now()}] Running: Stock prices update")
-    try:
-        data = await fetch_all_stocks()
-        save_data("stocks.json", data)
-        cache.set("stocks", data, ttl_seconds=900)  # 15 min cache
-        print(f"[{datetime.now()}] Updated {len(data)} stock prices")
-    except Exception as e:
-        print(f"[{datetime.now()}] Stock update failed: {e}")
-
-
-async def task_fetch_boxoffice():
+    # Same key as the request path: a request refreshing the cache meanwhile shares this fetch
+    data = await refresh_cached("stocks", fetch_all_stocks, ttl=900)  # 15 min cache
+    await save_data("stocks.json", data)
+    changed = price_channel.publish(data)
+    print(f"[{datetime.now()}] Updated {len(data)} stock prices ({len(changed)} changed)")
+    return bool(data)
+
+
+def backfill_range(last_ts: Optional[int], now: float) -> Optional[str]:
+    """Chart range to request for a ticker's history, None when it is recent enough"""
+    gap = None if last_ts is None else now - last_ts
+    if gap is not None and gap < BACKFILL_AFTER:
+        return None
+    for span, range_ in BACKFILL_RANGES:
+        if span is None or (gap is not None and gap <= span):
+            return range_
+
+
+async def task_update_price_history() -> int:
+    """Backfill missing or stale history from daily chart bars, then record the latest quote samples"""
+    quotes = load_data("stocks.json")["data"]
+    now = time.time()
+    ranges = {}
+    for quote in quotes:
+        ticker = quote["ticker"]
+        range_ = backfill_range(price_history.last_timestamp(ticker), now)
+        if range_ and now - _backfill_attempts.get(ticker, 0) >= BACKFILL_RETRY:
+            ranges[ticker] = range_
+            _backfill_attempts[ticker] = now
+
+    backfilled = 0
+    results = await asyncio.gather(*(fetch_stock_bars(t, r) for t, r in ranges.items()))
+    for ticker, bars in zip(ranges, results):
+        if bars:
+            backfilled += await asyncio.to_thread(price_history.append_bars, ticker, bars)
+    recorded = await asyncio.to_thread(price_history.record_quotes, quotes)
+    print(f"[{datetime.now()}] Price history: {recorded} samples recorded, {backfilled} bars backfilled")
+    return recorded + backfilled
+
+
+async def task_update_analytics() -> int:
+    """Fold new price samples into the market analytics"""
+    return await asyncio.to_thread(market_analytics.update)
+
+
+async def task_fetch_boxoffice() -> bool:
     """Fetch box office data daily at 10:00"""
     print(f"[{datetime.now()}] Running: Box office update")
-    try:
-        data = await fetch_cnc_boxoffice()
-        save_data("boxoffice.json", data)
-        cache.set("boxoffice", data, ttl_seconds=86400)  # 24h cache
-        print(f"[{datetime.now()}] Updated {len(data)} box office entries")
-    except Exception as e:
-        print(f"[{datetime.now()}] Box office update failed: {e}")
+    data = await refresh_cached("boxoffice", fetch_cnc_boxoffice, ttl=86400)  # 24h cache
+    await save_data("boxoffice.json", data)
+    print(f"[{datetime.now()}] Updated {len(data)} box office entries")
+    return bool(data)
 
 
-async def task_fetch_news():
-    """Fetch news every 30 minutes"""
-    print(f"[{datetime.now()}] Running: News monitoring update")
-    try:
-        data = await fetch_all_news()
-        save_data("news.json", data)
-        cache.set("news", data, ttl_seconds=1800)  # 30 min cache
-        print(f"[{datetime.now()}] Updated {len(data)} news articles")
-    except Exception as e:
-        print(f"[{datetime.now()}] News update failed: {e}")
+async def task_update_boxoffice_analytics() -> int:
+    """Fold the box office rows ingested or corrected since the last run into the rollups"""
+    return await asyncio.to_thread(boxoffice_analytics.update)
 
 
-async def task_generate_alerts():
-    """Generate alerts from news based on priority keywords"""
+async def task_fetch_news() -> int:
+    """Fetch news every 30 minutes"""
+    print(f"[{datetime.now()}] Running: News monitoring update")
+    data = await refresh_cached("news", fetch_all_news, ttl=1800)  # 30 min cache
+    new_articles = await article_store.ingest_async(data)
+    print(f"[{datetime.now()}] Fetched {len(data)} news articles, {len(new_articles)} new")
+    if new_articles:
+        _unindexed_articles.extend(new_articles)
+        await event_bus.publish(ARTICLES_INGESTED, new_articles)
+    return len(new_articles)
+
+
+async def task_index_archive() -> int:
+    """Scrape newsletter candidates, then index the articles ingested since the last run with their content"""
+    await prewarm_article_content(article_store.headlines())
+    articles = _unindexed_articles[:]
+    del _unindexed_articles[:len(articles)]
+    return await sync_search_index(articles)
+
+
+async def sync_search_index(articles: list = None) -> int:
+    """Add stored articles (all of them by default) to the archive search indexes"""
+    if articles is None:
+        articles, _ = article_store.query(limit=article_store.count())
+    items = [article_document(a, content_cache.get(a.get("link", ""), "")) for a in articles
+             if not a.get("duplicate_of")]
+    added = await asyncio.to_thread(vector_index.add, items)
+    await asyncio.to_thread(lexical_index.add, items)
+    await asyncio.to_thread(lexical_index.flush_if_due)
+    if added:
+        print(f"[{datetime.now()}] Indexed {added} articles for archive search")
+    return added
+
+
+async def on_articles_ingested(articles: list):
+    """Evaluate the alert rules on newly ingested articles and push new alerts to subscribers"""
+    created = alert_log.evaluate(articles)
+    if not created:
+        return
+    alert_channel.publish(created)
+    alerts = alert_log.latest()
+    cache.set("alerts", alerts, ttl_seconds=1800)
+    print(f"[{datetime.now()}] {len(created)} new alerts")
+    await save_data("alerts.json", alerts)
+
+
+event_bus.subscribe(ARTICLES_INGESTED, on_articles_ingested)
+
+
+async def task_generate_alerts() -> None:
+    """Catch-up pass: run the alert rules on the current headlines (articles already alerted are skipped)"""
     print(f"[{datetime.now()}] Running: Alert generation")
-    try:
-        news_data = load_data("news.json")
-        articles = news_data.get("data", [])
-
-        HIGH_PRIORITY_KEYWORDS = ["fusion", "acquisition", "droits", "exclusif", "record", "crise"]
-        MEDIUM_PRIORITY_KEYWORDS = ["audience", "streaming", "lancement", "partenariat"]
-
-        alerts = []
-        for article in articles[:20]:
-            title_lower = article.get("title", "").lower()
-
-            priority = "low"
-            if any(kw in title_lower for kw in HIGH_PRIORITY_KEYWORDS):
-                priority = "high"
-            elif any(kw in title_lower for kw in MEDIUM_PRIORITY_KEYWORDS):
-                priority = "medium"
-
-            if priority in ["high", "medium"]:
-                alerts.append({
-                    "id": len(alerts) + 1,
-                    "title": article.get("title", ""),
-                    "source": article.get("source", ""),
-                    "time": article.get("published", ""),
-                    "priority": priority,
-                    "category": article.get("category", ""),
-                    "link": article.get("link", ""),
-                    "aiSummary": article.get("summary", "")[:200]
-                })
-
-        save_data("alerts.json", alerts)
-        cache.set("alerts", alerts, ttl_seconds=1800)
-        print(f"[{datetime.now()}] Generated {len(alerts)} alerts")
-    except Exception as e:
-        print(f"[{datetime.now()}] Alert generation failed: {e}")
+    await on_articles_ingested(article_store.headlines(limit=20))
 
 
 # ============================================
@@ -127,32 +265,42 @@ async def task_generate_alerts():
 
 scheduler = AsyncIOScheduler()
 
+# Job graph: a job that produces new data triggers its downstream jobs
+pipeline.job("fetch_stocks", "Fetch Stock Prices", task_fetch_stocks, min_interval=300)
+pipeline.job("update_price_history", "Record Price History", task_update_price_history, upstreams=["fetch_stocks"])
+pipeline.job("update_analytics", "Update Market Analytics", task_update_analytics, upstreams=["update_price_history"])
+pipeline.job("fetch_boxoffice", "Fetch Box Office", task_fetch_boxoffice, min_interval=300)
+pipeline.job("update_boxoffice_analytics", "Update Box Office Analytics", task_update_boxoffice_analytics,
+             upstreams=["fetch_boxoffice"])
+pipeline.job("fetch_news", "Fetch News", task_fetch_news, min_interval=300)
+pipeline.job("index_archive", "Index Archive", task_index_archive, upstreams=["fetch_news"])
+# Alerts are evaluated per article as news is ingested (see on_articles_ingested); this is a manual catch-up
+pipeline.job("generate_alerts", "Generate Alerts", task_generate_alerts)
+
 
 def setup_scheduler():
-    """Configure all scheduled tasks"""
+    """Schedule the root jobs of the pipeline (downstream jobs run when their upstreams produce data)"""
 
-    # Stock prices: every 15 minutes during market hours (9h-18h, Mon-Fri)
+    # Stock prices: every 15 minutes during market hours (9h-18h, Mon-Fri), hourly the rest of the time
+    # for international markets; one job, so the two schedules never double-fetch
     scheduler.add_job(
-        task_fetch_stocks,
-        CronTrigger(day_of_week="mon-fri", hour="9-18", minute="*/15"),
+        pipeline.scheduled,
+        OrTrigger([
+            CronTrigger(day_of_week="mon-fri", hour="9-18", minute="*/15"),
+            CronTrigger(day_of_week="mon-fri", hour="0-8,19-23", minute=0),
+            CronTrigger(day_of_week="sat,sun", minute=0),
+        ]),
+        args=["fetch_stocks"],
         id="fetch_stocks",
         name="Fetch Stock Prices",
         replace_existing=True
     )
 
-    # Also fetch stocks every hour outside market hours for international markets
-    scheduler.add_job(
-        task_fetch_stocks,
-        IntervalTrigger(hours=1),
-        id="fetch_stocks_hourly",
-        name="Fetch Stock Prices (Hourly)",
-        replace_existing=True
-    )
-
     # Box office: daily at 10:00
     scheduler.add_job(
-        task_fetch_boxoffice,
+        pipeline.scheduled,
         CronTrigger(hour=10, minute=0),
+        args=["fetch_boxoffice"],
         id="fetch_boxoffice",
         name="Fetch Box Office",
         replace_existing=True
@@ -160,37 +308,19 @@ def setup_scheduler():
 
     # News monitoring: every 30 minutes
     scheduler.add_job(
-        task_fetch_news,
+        pipeline.scheduled,
         IntervalTrigger(minutes=30),
+        args=["fetch_news"],
         id="fetch_news",
         name="Fetch News",
         replace_existing=True
     )
 
-    # Alert generation: every 30 minutes (after news fetch)
-    scheduler.add_job(
-        task_generate_alerts,
-        IntervalTrigger(minutes=30),
-        id="generate_alerts",
-        name="Generate Alerts",
-        replace_existing=True
-    )
-
     print("Scheduler configured with the following jobs:")
     for job in scheduler.get_jobs():
         print(f"  - {job.name}: {job.trigger}")
 
 
-async def run_initial_fetch():
-    """Run all fetches immediately on startup"""
-    print(f"[{datetime.now()}] Running initial data fetch...")
-    await task_fetch_stocks()
-    await task_fetch_boxoffice()
-    await task_fetch_news()
-    await task_generate_alerts()
-    print(f"[{datetime.now()}] Initial fetch complete!")
-
-
 def start_scheduler():
     """Start the scheduler"""
     setup_scheduler()
@@ -198,7 +328,177 @@ def start_scheduler():
     print(f"[{datetime.now()}] Scheduler started!")
 
 
-def stop_scheduler():
-    """Stop the scheduler"""
-    scheduler.shutdown()
-    print(f"[{datetime.now()}] Scheduler stopped!")
+async def stop_scheduler():
+    """Stop the scheduler (or the follower sync), cancel the jobs still running and hand the leadership over"""
+    if _follower is not None:
+        _follower.cancel()
+        await asyncio.gather(_follower, return_exceptions=True)
+    if scheduler.running:
+        scheduler.shutdown()
+        print(f"[{datetime.now()}] Scheduler stopped!")
+    await pipeline.stop()
+    leader_lease.release()
+
+
+# ============================================
+# STARTUP
+# ============================================
+
+# Serve the persisted snapshots at once and refresh them in the background; "0" blocks startup until done
+FAST_START = os.getenv("FAST_START", "1") != "0"
+
+# Seconds the startup sequence waits for each source before going on with its snapshot
+STARTUP_DEADLINES = {"fetch_stocks": 20, "fetch_boxoffice": 30, "fetch_news": 60}
+
+# Dataset -> (pipeline job refreshing it, whether it needs load_stores(), last update time)
+DATASETS = {
+    "stocks": ("fetch_stocks", False, lambda: load_data("stocks.json")["updated_at"]),
+    "boxoffice": ("fetch_boxoffice", False, lambda: load_data("boxoffice.json")["updated_at"]),
+    "news": ("fetch_news", True, lambda: article_store.updated_at),
+    "alerts": ("generate_alerts", False, lambda: load_data("alerts.json")["updated_at"]),
+    "price_history": ("update_analytics", True, lambda: market_analytics.updated_at),
+    "boxoffice_analytics": ("update_boxoffice_analytics", True, lambda: boxoffice_analytics.updated_at),
+    "search_index": ("index_archive", True, lambda: None),
+}
+
+_startup = {"started_at": None, "finished_at": None, "duration_ms": None, "stores_loaded": False,
+            "timed_out": set()}
+
+# Seconds between two passes of a follower worker over the leader's files
+FOLLOWER_SYNC_SECONDS = float(os.getenv("FOLLOWER_SYNC_SECONDS", "2"))
+_follower: Optional[asyncio.Task] = None
+# Dataset -> when a follower last picked up a change from the leader
+_synced: Dict[str, str] = {}
+
+
+async def _run_with_deadline(job_id: str):
+    """Wait for a startup fetch up to its deadline; past it the fetch keeps running and the snapshot is served"""
+    try:
+        await asyncio.wait_for(pipeline.run(job_id, "startup"), STARTUP_DEADLINES[job_id])
+    except asyncio.TimeoutError:
+        _startup["timed_out"].add(job_id)
+        print(f"[{datetime.now()}] {job_id} exceeded its {STARTUP_DEADLINES[job_id]}s startup deadline, "
+              f"serving the persisted snapshot until it completes")
+
+
+async def run_initial_fetch():
+    """Refresh every source concurrently on startup, each under its own deadline"""
+    print(f"[{datetime.now()}] Running initial data fetch...")
+    await asyncio.gather(*(_run_with_deadline(job_id) for job_id in STARTUP_DEADLINES))
+    await pipeline.run("generate_alerts", "startup")
+    # Catch up with articles stored before the search indexes existed (already indexed ones are skipped)
+    stored, _ = article_store.query(limit=article_store.count())
+    _unindexed_articles.extend(stored)
+    await pipeline.run("index_archive", "startup")
+    # Fetches past their deadline are not waited for (their downstream jobs run when they land)
+    if not _startup["timed_out"]:
+        await pipeline.wait_idle()
+    print(f"[{datetime.now()}] Initial fetch complete!")
+
+
+async def run_startup():
+    """Load the stores, then run the scheduler (leader) or follow the leader's writes (other workers)
+    A background task in fast-start mode"""
+    global _follower
+    _startup["started_at"] = datetime.now().isoformat()
+    started = time.monotonic()
+    leader = leader_lease.try_acquire()
+    # Stores are loaded before any job runs: ingestion and recording need their full state
+    await asyncio.to_thread(load_stores, not leader)
+    _startup["stores_loaded"] = True
+    if leader:
+        start_scheduler()
+        await run_initial_fetch()
+    else:
+        print(f"[{datetime.now()}] Worker {os.getpid()} follows scheduler leader {leader_lease.leader_pid()}")
+        _follower = asyncio.create_task(follow_leader())
+    _startup["finished_at"] = datetime.now().isoformat()
+    _startup["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+
+# ============================================
+# FOLLOWER WORKERS
+# ============================================
+
+async def sync_from_leader():
+    """Pick up what the leader persisted since the last pass: replaced snapshot files, lines appended
+    to the article log, rows appended to the price columns, rewritten search indexes and box office table"""
+    for filename in SNAPSHOT_FILES:
+        if file_signature(os.path.join(DATA_DIR, filename)) == _snapshot_signatures.get(filename):
+            continue
+        stored = await asyncio.to_thread(_read_snapshot_file, filename)
+        snapshot = _snapshots[filename] = _snapshot_from(stored)
+        _synced[filename.rsplit(".", 1)[0]] = datetime.now().isoformat()
+        # Subscribers of this worker get the same pushes as the leader's
+        if filename == "stocks.json":
+            price_channel.publish(snapshot["data"])
+        elif filename == "alerts.json":
+            alert_channel.publish(alert_log.sync(snapshot["data"]))
+
+    if await article_store.refresh_async():
+        _synced["news"] = datetime.now().isoformat()
+    if await asyncio.to_thread(price_history.refresh):
+        await asyncio.to_thread(market_analytics.update)
+        _synced["price_history"] = datetime.now().isoformat()
+    reloaded = [await asyncio.to_thread(index.reload) for index in (vector_index, lexical_index)]
+    if any(reloaded):
+        _synced["search_index"] = datetime.now().isoformat()
+    if await asyncio.to_thread(boxoffice_table.reload):
+        await asyncio.to_thread(boxoffice_analytics.update)
+        _synced["boxoffice_analytics"] = datetime.now().isoformat()
+
+
+async def follow_leader():
+    """Sync from the leader until this worker takes the lease over (the leader exited), then lead"""
+    while not leader_lease.try_acquire():
+        await asyncio.sleep(FOLLOWER_SYNC_SECONDS)
+        try:
+            await sync_from_leader()
+        except Exception as e:
+            print(f"[{datetime.now()}] Follower sync failed: {e}")
+    # Catch up with the last writes of the previous leader before writing ourselves
+    await sync_from_leader()
+    for store in (article_store, vector_index, lexical_index, price_history):
+        store.read_only = False
+    start_scheduler()
+    await run_initial_fetch()
+
+
+def dataset_readiness() -> Dict:
+    """Per dataset: whether it can be served, and whether it is still the persisted snapshot"""
+    datasets = {}
+    for name, (job_id, needs_stores, updated_at) in DATASETS.items():
+        job = pipeline.jobs[job_id]
+        last = job.history[-1] if job.history else None
+        if needs_stores and not _startup["stores_loaded"]:
+            state = "loading"
+        elif not leader_lease.is_leader:
+            state = "synced" if name in _synced else "snapshot"
+        elif last is not None and last["outcome"] != "error":
+            state = "fresh"
+        elif job.running:
+            state = "refreshing"  # serving the snapshot meanwhile
+        elif last is not None:
+            state = "stale"  # the refresh failed, serving the snapshot
+        else:
+            state = "snapshot"
+        datasets[name] = {
+            "ready": state != "loading",
+            "state": state,
+            "updated_at": updated_at(),
+            "synced_at": _synced.get(name),
+            "deadline_exceeded": job_id in _startup["timed_out"],
+        }
+    return datasets
+
+
+def startup_status() -> Dict:
+    return {
+        "mode": "fast" if FAST_START else "blocking",
+        "started_at": _startup["started_at"],
+        "finished_at": _startup["finished_at"],
+        "duration_ms": _startup["duration_ms"],
+        "stores_loaded": _startup["stores_loaded"],
+        "deadlines": STARTUP_DEADLINES,
+        "worker": leader_lease.status(),
+    }
@@ -0,0 +1,188 @@
+"""
+Server-Sent Events fan-out for live dashboard updates
+Each channel keeps the last published state per key and pushes only the entries that changed;
+every subscriber has a bounded queue, and one that falls behind gets a fresh snapshot instead.
+Recent events are kept so a reconnecting client resumes from its Last-Event-ID
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import os
+import time
+
+from alerts import ALERT_LIMIT
+from persistence import encode_json
+
+# Messages queued per subscriber before it is considered too slow and resynchronized
+MAX_QUEUED_MESSAGES = int(os.getenv("STREAM_MAX_QUEUE", "32"))
+# Events kept per channel for clients resuming with Last-Event-ID
+REPLAY_EVENTS = 256
+# Comment line sent when a channel is idle, so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+def sse_event(event: str, payload: Dict, event_id: Optional[str] = None) -> bytes:
+    """One SSE frame with a JSON payload"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode("utf-8") + encode_json(payload) + b"\n\n"
+
+
+class Subscriber:
+    """Bounded outbox of pre-encoded frames for one connection"""
+    def __init__(self, max_queued: int = MAX_QUEUED_MESSAGES):
+        self.queue: Deque[bytes] = deque()
+        self.max_queued = max_queued
+        self.ready = asyncio.Event()
+        self.needs_snapshot = False
+
+    def push(self, frame: bytes):
+        """Never blocks the publisher: a full queue is dropped and replaced by a snapshot on the next send"""
+        if self.needs_snapshot:
+            return
+        if len(self.queue) >= self.max_queued:
+            self.queue.clear()
+            self.needs_snapshot = True
+        else:
+            self.queue.append(frame)
+        self.ready.set()
+
+
+class Channel:
+    """Keyed state with diff publishing to every subscriber"""
+    def __init__(self, name: str, key: str, fields: Optional[Tuple[str, ...]] = None,
+                 max_keys: Optional[int] = None):
+        self.name = name
+        self.key = key
+        self.fields = fields      # fields compared and sent; None means every field
+        self.max_keys = max_keys  # oldest keys are dropped from the state beyond this
+        self.state: Dict[str, Dict] = {}
+        self.subscribers: Set[Subscriber] = set()
+        # Event ids are "<epoch>-<seq>": ids from before a restart are recognized as stale
+        self.epoch = format(int(time.time()), "x")
+        self.seq = 0
+        self.history: Deque[Tuple[int, bytes]] = deque(maxlen=REPLAY_EVENTS)
+        self.published = 0
+        self.resyncs = 0  # snapshots re-sent to subscribers that fell behind
+
+    def _project(self, item: Dict) -> Dict:
+        if self.fields is None:
+            return dict(item)
+        return {field: item.get(field) for field in self.fields}
+
+    def _event_id(self) -> str:
+        return f"{self.epoch}-{self.seq}"
+
+    def _trim(self):
+        if self.max_keys is not None:
+            while len(self.state) > self.max_keys:
+                del self.state[next(iter(self.state))]
+
+    def seed(self, items: Iterable[Dict]):
+        """Set the initial state without notifying anyone (e.g. from the persisted snapshot)"""
+        for item in items:
+            self.state[item[self.key]] = self._project(item)
+        self._trim()
+
+    def publish(self, items: Iterable[Dict]) -> List[Dict]:
+        """Update the state and push the changed entries (changed fields only) as one diff event"""
+        changes = []
+        for item in items:
+            current = self._project(item)
+            previous = self.state.get(item[self.key])
+            if previous == current:
+                continue
+            self.state[item[self.key]] = current
+            if previous is None:
+                changes.append({self.key: item[self.key], **current})
+            else:
+                changes.append({self.key: item[self.key],
+                                **{k: v for k, v in current.items() if previous.get(k) != v}})
+        self._trim()
+        if changes:
+            self.seq += 1
+            frame = sse_event(self.name, {"type": "diff", "seq": self.seq, "changes": changes,
+                                          "timestamp": datetime.now().isoformat()}, self._event_id())
+            self.history.append((self.seq, frame))
+            # Encoded once, shared by every subscriber
+            for subscriber in self.subscribers:
+                subscriber.push(frame)
+            self.published += 1
+        return changes
+
+    def snapshot_frame(self) -> bytes:
+        items = [{self.key: key, **value} for key, value in self.state.items()]
+        return sse_event(self.name, {"type": "snapshot", "seq": self.seq, "items": items,
+                                     "timestamp": datetime.now().isoformat()}, self._event_id())
+
+    def replay(self, last_event_id: Optional[str]) -> Optional[List[bytes]]:
+        """Events published after last_event_id, None when they are not all available any more"""
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        seq = int(seq)
+        if seq < self.seq and (not self.history or self.history[0][0] > seq + 1):
+            return None
+        return [frame for event_seq, frame in self.history if event_seq > seq]
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE body for one client: missed events when resuming, else a snapshot; then diffs as published"""
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        # Built before the first yield, so events published while it is sent are queued, not lost
+        missed = self.replay(last_event_id)
+        opening = [b"retry: 5000\n\n"] + (missed if missed is not None else [self.snapshot_frame()])
+        try:
+            for frame in opening:
+                yield frame
+            while True:
+                if subscriber.needs_snapshot:
+                    subscriber.needs_snapshot = False
+                    self.resyncs += 1
+                    yield self.snapshot_frame()
+                while subscriber.queue and not subscriber.needs_snapshot:
+                    yield subscriber.queue.popleft()
+                subscriber.ready.clear()
+                if subscriber.queue or subscriber.needs_snapshot:
+                    continue
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers.discard(subscriber)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "keys": len(self.state),
+            "events_published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+class StreamHub:
+    """Named channels shared by the scheduler (publishers) and the API (subscribers)"""
+    def __init__(self):
+        self.channels: Dict[str, Channel] = {}
+
+    def channel(self, name: str, key: str = "id", fields: Optional[Tuple[str, ...]] = None,
+                max_keys: Optional[int] = None) -> Channel:
+        if name not in self.channels:
+            self.channels[name] = Channel(name, key, fields, max_keys)
+        return self.channels[name]
+
+    def stats(self) -> Dict:
+        return {name: channel.stats() for name, channel in self.channels.items()}
+
+
+# Global hub instance
+stream_hub = StreamHub()
+
+# Live quotes: a ticker is republished when one of these fields changes
+price_channel = stream_hub.channel("prices", key="ticker",
+                                   fields=("name", "sector", "price", "change", "currency", "marketCap"))
+
+# News alerts, one entry per alert id; the last ALERT_LIMIT make up the snapshot
+alert_channel = stream_hub.channel("alerts", key="id", max_keys=ALERT_LIMIT)
@@ -0,0 +1,336 @@
+"""
+Local semantic search over the news archive
+Hashed term-frequency vectors in a memory-mapped NumPy matrix, IDF-weighted queries, with an IVF index
+(spherical k-means coarse quantizer) for approximate nearest-neighbor search
+"""
+
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+import io
+import json
+import math
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from classifier import STOPWORDS, article_classifier, tokenize
+from persistence import encode_json, file_signature, read_json_file, write_atomic
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Embedding width (hashed feature space)
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "512"))
+HASHES_PER_TERM = 3
+# Below this size the whole matrix is scanned; above it the IVF index is used
+IVF_MIN_DOCS = 4096
+# Inverted lists probed per query (at least this many, and at least 1/8 of the lists)
+IVF_NPROBE = 12
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 25000
+
+# ============================================
+# EMBEDDINGS
+# ============================================
+
+def text_features(text: str) -> List[str]:
+    """Folded, stopword-free terms of a text"""
+    return [t for t in tokenize(text) if t not in STOPWORDS and len(t) > 1]
+
+
+def _buckets(term: str) -> List[Tuple[int, float]]:
+    """HASHES_PER_TERM signed positions of a term (a true match lines up on all of them,
+    a hash collision usually on one)"""
+    out = []
+    for seed in range(HASHES_PER_TERM):
+        h = zlib.crc32(term.encode("utf-8"), seed)
+        out.append((h % VECTOR_DIM, 1.0 if h & 0x80000000 else -1.0))
+    return out
+
+
+def embed(text: str) -> np.ndarray:
+    """L2-normalized hashed vector with sublinear term frequency"""
+    counts: Dict[str, int] = {}
+    for feature in text_features(text):
+        counts[feature] = counts.get(feature, 0) + 1
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature, tf in counts.items():
+        for idx, sign in _buckets(feature):
+            vector[idx] += sign * (1.0 + math.log(tf))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def article_document(article: Dict, content: str = "") -> Tuple[Dict, str]:
+    """Display record and indexed text for a stored article"""
+    published_ts = article.get("published_ts") or 0
+    if published_ts:
+        date = datetime.fromtimestamp(published_ts).date().isoformat()
+    else:
+        date = (article.get("ingested_at") or "")[:10]
+    summary = article.get("summary", "")
+    tags = sorted(article_classifier.matched_keywords(article.get("title", "") + " " + summary))
+    document = {
+        "id": article["id"],
+        "title": article.get("title", ""),
+        "date": date,
+        "category": article.get("category", ""),
+        "excerpt": summary[:300],
+        "tags": tags,
+        "source": article.get("source", ""),
+        "link": article.get("link", ""),
+    }
+    text = " ".join([document["title"], document["title"], summary, content])
+    return document, text
+
+
+# ============================================
+# VECTOR INDEX
+# ============================================
+
+class VectorIndex:
+    """
+    Append-only vector store on disk (vectors.f32 rows + documents.jsonl lines),
+    memory-mapped for search, with IVF lists retrained as the archive grows
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.documents_path = os.path.join(directory, "documents.jsonl")
+        self.ivf_path = os.path.join(directory, "ivf.npz")
+        self.terms_path = os.path.join(directory, "terms.json")
+        self.matrix = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        self.documents: List[Dict] = []
+        self.positions: Dict[str, int] = {}
+        self.term_freq: Dict[str, int] = {}  # term -> number of documents containing it
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.lists: List[np.ndarray] = []
+        self.trained_size = 0
+        # Kept up to date as documents are added, for stats()
+        self.tags: set = set()
+        self.since_year: Optional[int] = None
+        self.write_lock = threading.Lock()
+        self.read_only = False  # set on follower workers, which reload what the leader writes
+        self.signature = None   # files as of the last load, see reload()
+        self.load_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.documents)
+
+    def load(self):
+        """Memory-map persisted vectors and rebuild in-memory lookups
+        Blocking, once: concurrent callers wait for the first one (keep it off the event loop)"""
+        if self.loaded:
+            return
+        with self.load_lock:
+            if not self.loaded:
+                self._load()
+                self.loaded = True
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.signature = self._signature()
+        documents = []
+        if os.path.exists(self.documents_path):
+            with open(self.documents_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        documents.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+        rows = os.path.getsize(self.vectors_path) // (4 * VECTOR_DIM) if os.path.exists(self.vectors_path) else 0
+        # A crash between the two appends leaves one file longer than the other
+        count = min(len(documents), rows)
+        if rows > count and not self.read_only:
+            os.truncate(self.vectors_path, count * 4 * VECTOR_DIM)
+        if len(documents) > count and not self.read_only:
+            with open(self.documents_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(doc, ensure_ascii=False) + "\n" for doc in documents[:count])
+        self.documents = documents[:count]
+        self.positions = {doc["id"]: i for i, doc in enumerate(self.documents)}
+        self._count(self.documents)
+        self.matrix = self._map(count)
+        if count and os.path.exists(self.terms_path):
+            self.term_freq = read_json_file(self.terms_path)
+
+        if os.path.exists(self.ivf_path):
+            ivf = np.load(self.ivf_path)
+            self.centroids = ivf["centroids"]
+            self.trained_size = int(ivf["trained_size"])
+            self.assignments = self._assign(self.matrix) if count else self.assignments
+            self._build_lists()
+        print(f"Vector index: {count} documents loaded")
+
+    def _signature(self) -> tuple:
+        return file_signature(self.documents_path), file_signature(self.ivf_path)
+
+    def reload(self) -> bool:
+        """Re-read the index after another process (the scheduler leader) changed it; returns whether it did"""
+        if self.loaded and self._signature() == self.signature:
+            return False
+        fresh = VectorIndex(self.directory)
+        fresh.read_only = self.read_only
+        fresh.load()
+        # Swapped in one step: searches keep the previous state until the new one is complete
+        vars(self).update(vars(fresh))
+        return True
+
+    def _count(self, documents):
+        """Fold documents into the stats counters"""
+        for doc in documents:
+            self.tags.update(doc.get("tags", ()))
+            year = doc.get("date", "")[:4]
+            if year.isdigit() and (self.since_year is None or int(year) < self.since_year):
+                self.since_year = int(year)
+
+    def _map(self, count: int) -> np.ndarray:
+        if not count:
+            return np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, VECTOR_DIM))
+
+    def add(self, items: List[Tuple[Dict, str]]) -> int:
+        """Embed and append (document, text) pairs not indexed yet; returns how many were added"""
+        self.load()
+        with self.write_lock:
+            items = [(doc, text) for doc, text in items if doc["id"] not in self.positions]
+            if not items:
+                return 0
+            vectors = np.vstack([embed(text) for _, text in items]).astype(np.float32)
+            term_freq = dict(self.term_freq)
+            for _, text in items:
+                for term in set(text_features(text)):
+                    term_freq[term] = term_freq.get(term, 0) + 1
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.documents_path, "a", encoding="utf-8") as f:
+                for doc, _ in items:
+                    f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+
+            start = len(self.documents)
+            for i, (doc, _) in enumerate(items):
+                self.positions[doc["id"]] = start + i
+            self.documents = self.documents + [doc for doc, _ in items]
+            self._count(doc for doc, _ in items)
+            self.term_freq = term_freq
+            write_atomic(self.terms_path, encode_json(term_freq))
+            matrix = self._map(len(self.documents))
+
+            if len(self.documents) >= IVF_MIN_DOCS and len(self.documents) >= 2 * self.trained_size:
+                self.matrix = matrix
+                self._train()
+            elif self.centroids is not None:
+                self.assignments = np.concatenate([self.assignments, self._assign(vectors)])
+                self.matrix = matrix
+                self._build_lists()
+            else:
+                self.matrix = matrix
+            return len(items)
+
+    # ------------------------------------------
+    # IVF
+    # ------------------------------------------
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk])
+            out[start:start + chunk] = np.argmax(block @ self.centroids.T, axis=1)
+        return out
+
+    def _train(self):
+        """Spherical k-means on a sample, then assign every vector to its nearest centroid"""
+        n = len(self.matrix)
+        nlist = max(16, int(math.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(self.matrix[np.sort(rng.choice(n, size=min(n, KMEANS_SAMPLE), replace=False))])
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        self.assignments = self._assign(self.matrix)
+        self.trained_size = n
+        self._build_lists()
+        buffer = io.BytesIO()
+        np.savez(buffer, centroids=self.centroids, trained_size=np.int64(n))
+        write_atomic(self.ivf_path, buffer.getvalue())
+        print(f"Vector index: trained IVF with {nlist} lists over {n} documents")
+
+    def _build_lists(self):
+        order = np.argsort(self.assignments, kind="stable")
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    # ------------------------------------------
+    # SEARCH
+    # ------------------------------------------
+
+    def query_vector(self, text: str) -> np.ndarray:
+        """Query embedding weighted by IDF; terms absent from the archive are ignored"""
+        vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+        total = len(self.documents)
+        for term in set(text_features(text)):
+            df = self.term_freq.get(term, 0)
+            if df:
+                weight = math.log((total + 1) / (df + 1)) + 1.0
+                for idx, sign in _buckets(term):
+                    vector[idx] += sign * weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def search(self, text: str, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[float, Dict]]:
+        """Top-k documents by cosine similarity (approximate once the IVF index is trained)"""
+        self.load()
+        matrix, lists, centroids = self.matrix, self.lists, self.centroids
+        if not len(matrix) or k <= 0:
+            return []
+        query = self.query_vector(text)
+        if not query.any():
+            return []
+
+        if centroids is not None and lists:
+            nprobe = nprobe or max(IVF_NPROBE, len(centroids) // 8)
+            probes = np.argsort(centroids @ query)[::-1][:nprobe]
+            candidates = np.concatenate([lists[p] for p in probes])
+            candidates = candidates[candidates < len(matrix)]
+            candidates.sort()
+            scores = np.asarray(matrix[candidates]) @ query
+        else:
+            candidates = None
+            scores = np.asarray(matrix) @ query
+
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        return [(float(scores[i]), self.documents[row]) for i, row in zip(top, rows) if scores[i] > 0]
+
+    def stats(self) -> Dict:
+        self.load()
+        return {
+            "total_articles": len(self.documents),
+            "since_year": self.since_year,
+            "unique_tags": len(self.tags),
+            "dimensions": VECTOR_DIM,
+            "index": "ivf" if self.centroids is not None else "flat",
+            "ivf_lists": len(self.centroids) if self.centroids is not None else 0,
+        }
+
+
+# Global index instance
+vector_index = VectorIndex(os.path.join(DATA_DIR, "vector_index"))